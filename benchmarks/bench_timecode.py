@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark timecode conversion
+Compares the original split/int converter with the scanner in TimecodeParser
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.timecode_parser import TimecodeParser, _scan_timecode
+
+
+def legacy_timecode_to_seconds(timecode: str) -> float:
+    """Converter as it was before frame and fraction support"""
+    parts = timecode.split(':')
+    
+    if len(parts) == 3:
+        hours, minutes, seconds = map(int, parts)
+        return hours * 3600 + minutes * 60 + seconds
+    elif len(parts) == 2:
+        minutes, seconds = map(int, parts)
+        return minutes * 60 + seconds
+    else:
+        raise ValueError(f"Invalid timecode format: {timecode}")
+
+
+def main():
+    rng = random.Random(0)
+    # Transcripts reuse a small vocabulary of timecodes
+    vocabulary = [f"{rng.randrange(3):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+                  for _ in range(2000)]
+    timecodes = [rng.choice(vocabulary) for _ in range(200000)]
+    parser = TimecodeParser()
+    
+    def run_legacy():
+        for timecode in timecodes:
+            legacy_timecode_to_seconds(timecode)
+    
+    def run_uncached():
+        for timecode in timecodes:
+            _scan_timecode.__wrapped__(timecode, 30.0)
+    
+    def run_cached():
+        for timecode in timecodes:
+            parser.timecode_to_seconds(timecode)
+    
+    for name, func in (("legacy split/int", run_legacy),
+                       ("scanner, uncached", run_uncached),
+                       ("scanner, memoized", run_cached)):
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:20s} {best * 1000:8.1f} ms  ({len(timecodes) / best / 1e6:.2f} M timecodes/s)")
+
+
+if __name__ == "__main__":
+    main()
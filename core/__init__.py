@@ -5,5 +5,13 @@ Core functionality for FCPXML generation
 from .fcpxml_generator import FCPXMLBuilder
 from .timecode_parser import TimecodeParser
 from .video_analyzer import VideoAnalyzer
+from .cut_normalizer import CutNormalizer
+from .clip_ids import ClipIdGenerator
+from .fcpxml_importer import FCPXMLImporter
+from .probe_cache import ProbeCache
+from .preflight import PreflightChecker
+from .ingest import IngestRegistry, IngestPlugin, CutSource, ingest_registry
 
-__all__ = ['FCPXMLBuilder', 'TimecodeParser', 'VideoAnalyzer']
\ No newline at end of file
+__all__ = ['FCPXMLBuilder', 'TimecodeParser', 'VideoAnalyzer', 'CutNormalizer', 'ClipIdGenerator', 'FCPXMLImporter',
+           'ProbeCache', 'PreflightChecker',
+           'IngestRegistry', 'IngestPlugin', 'CutSource', 'ingest_registry']
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Audio decoding
+Streams low-rate mono PCM from media files in fixed-size blocks
+"""
+
+import os
+import subprocess
+import wave
+from typing import Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is required for audio analysis only
+    np = None
+
+
+class AudioDecoder:
+    """
+    Decodes the first audio stream of a file to mono float32 samples in [-1, 1]
+    Media files are decoded by ffmpeg and read from its stdout block by block; PCM
+    WAV files are read directly, so nothing larger than one block is ever held
+    """
+
+    def __init__(self, sample_rate: int = 8000, block_size: int = 65536):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+
+    def iter_blocks(self, file_path: str, start: float = 0.0,
+                    duration: Optional[float] = None) -> Iterator["np.ndarray"]:
+        """Yield blocks of up to block_size samples at sample_rate"""
+        if np is None:
+            raise RuntimeError("Audio analysis requires NumPy (pip install numpy)")
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Media file not found: {file_path}")
+
+        if file_path.lower().endswith('.wav'):
+            try:
+                return self._iter_wav(file_path, start, duration)
+            except (wave.Error, EOFError):
+                pass  # Compressed or extensible WAV; let ffmpeg handle it
+        return self._iter_ffmpeg(file_path, start, duration)
+
+    def read(self, file_path: str, start: float = 0.0, duration: Optional[float] = None) -> "np.ndarray":
+        """Decode a whole range into one array; only use with a bounded duration"""
+        blocks = list(self.iter_blocks(file_path, start, duration))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    def _iter_ffmpeg(self, file_path: str, start: float,
+                     duration: Optional[float]) -> Iterator["np.ndarray"]:
+        """Pipe signed 16-bit mono PCM out of ffmpeg"""
+        cmd = ['ffmpeg', '-v', 'error', '-nostdin']
+        if start:
+            cmd += ['-ss', f"{start:.6f}"]
+        cmd += ['-i', file_path]
+        if duration is not None:
+            cmd += ['-t', f"{duration:.6f}"]
+        cmd += ['-vn', '-ac', '1', '-ar', str(self.sample_rate), '-f', 's16le', '-']
+
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg not found; install ffmpeg to analyze audio")
+
+        def blocks():
+            try:
+                pending = b''
+                while True:
+                    data = process.stdout.read(self.block_size * 2)
+                    if not data:
+                        break
+                    data = pending + data
+                    # Keep an odd trailing byte for the next read
+                    usable = len(data) - len(data) % 2
+                    pending = data[usable:]
+                    yield np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+            finally:
+                process.stdout.close()
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+
+        return blocks()
+
+    def _iter_wav(self, file_path: str, start: float,
+                  duration: Optional[float]) -> Iterator["np.ndarray"]:
+        """Read integer PCM WAV, mixing to mono and decimating to sample_rate"""
+        reader = wave.open(file_path, 'rb')
+        channels = reader.getnchannels()
+        width = reader.getsampwidth()
+        rate = reader.getframerate()
+        if width not in (1, 2, 3, 4):
+            reader.close()
+            raise wave.Error(f"Unsupported sample width: {width}")
+
+        # Average groups of samples; good enough for the low rates analysis uses
+        factor = max(1, int(round(rate / self.sample_rate)))
+        if abs(rate / factor - self.sample_rate) > 1:
+            reader.close()
+            raise wave.Error(f"Cannot decimate {rate} Hz to {self.sample_rate} Hz")
+
+        first = int(start * rate)
+        remaining = reader.getnframes() - first
+        if duration is not None:
+            remaining = min(remaining, int(duration * rate))
+
+        def blocks():
+            nonlocal remaining
+            try:
+                reader.setpos(min(first, reader.getnframes()))
+                carry = np.zeros(0, dtype=np.float32)
+                while remaining > 0:
+                    count = min(self.block_size * factor, remaining)
+                    data = reader.readframes(count)
+                    if not data:
+                        break
+                    remaining -= count
+                    samples = np.concatenate((carry, self._wav_to_mono(data, channels, width)))
+                    usable = len(samples) - len(samples) % factor
+                    carry = samples[usable:]
+                    if usable:
+                        yield samples[:usable].reshape(-1, factor).mean(axis=1)
+            finally:
+                reader.close()
+
+        return blocks()
+
+    def _wav_to_mono(self, data: bytes, channels: int, width: int) -> "np.ndarray":
+        """Convert interleaved integer PCM bytes to mono float32"""
+        if width == 1:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            values = np.where(values >= 1 << 23, values - (1 << 24), values)
+            samples = values.astype(np.float32) / float(1 << 23)
+        else:
+            dtype = '<i2' if width == 2 else '<i4'
+            samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / float(1 << (8 * width - 1))
+
+        if channels > 1:
+            samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+        return samples.astype(np.float32, copy=False)
@@ -0,0 +1,441 @@
+"""
+Batch processing
+Runs manifests of (cut list x video set) jobs with shared probing and a resumable ledger
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable, Optional, Callable
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11, only JSON manifests are supported
+    tomllib = None
+
+from utils.file_helpers import FileManager
+from .fcpxml_generator import FCPXMLBuilder
+from .cut_normalizer import CutNormalizer
+from .cut_store import FrameCutStore
+from .ingest import ingest_registry
+from .preflight import PreflightChecker
+from .audio_sync import AudioSync
+from .keyframe_index import KeyframeIndex
+from .media_library import MediaLibrary
+from .timeline import Timeline, ChunkLimits
+from .timeline_export import TimelineExporter, EMITTERS
+from .transcript_index import TranscriptSearch
+from .video_analyzer import VideoAnalyzer
+
+
+# Settings a job inherits from the manifest's "defaults" table
+JOB_DEFAULTS = {
+    'input_type': 'auto',
+    'fps': 'auto',
+    'include_audio': True,
+    'normalize': False,
+    'sync_audio': False,
+    'keyframes': 'off',
+    'id_strategy': 'uuid4',
+    'formats': ['fcpxml'],
+    'chunking': 'off',
+    'chunk_clips': 5000,
+    'chunk_minutes': None,
+    'query': None,
+    'query_padding': 0.25,
+    'query_merge_gap': 0.0,
+    'memory_budget_mb': None,
+    'on_out_of_range': 'warn',
+    'output_dir': None,
+    'output_name': None,
+}
+
+
+class BatchJobRunner:
+    """Runs a single job: load cuts, check bounds, build and save the timeline in each format"""
+
+    def __init__(self):
+        self.file_manager = FileManager()
+        self.normalizer = CutNormalizer()
+        self.preflight = PreflightChecker()
+        self.exporter = TimelineExporter()
+        self.transcripts = None
+
+    def run(self, job: Dict[str, Any], media: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+        """
+        Run a job and return a result dict (id, status, outputs, warnings, elapsed)
+        media holds probe metadata for the job's videos so they are not probed again
+        """
+        started = time.time()
+        media = media or {}
+        videos = job['videos']
+        result = {'id': job['id'], 'status': 'done', 'outputs': [], 'warnings': [], 'error': None}
+        # Out-of-core cut lists whose scratch files are deleted when the job ends
+        stores = []
+
+        try:
+            fps = self._resolve_fps(job, media, result['warnings'])
+            input_type = None if job['input_type'] == 'auto' else job['input_type']
+            if job['query']:
+                cuts = self._search_transcript(job)
+            elif job['memory_budget_mb']:
+                cuts = ingest_registry.spill(job['cuts'], input_type, fps,
+                                             int(job['memory_budget_mb'] * 1024 * 1024))
+                stores.append(cuts)
+            elif job['normalize'] or job['keyframes'] != 'off':
+                cuts = ingest_registry.load(job['cuts'], input_type, fps)
+            else:
+                # Nothing needs the whole list, so cuts are read from the file as they are used
+                cuts = ingest_registry.stream(job['cuts'], input_type, fps)
+            if job['normalize']:
+                if isinstance(cuts, FrameCutStore):
+                    cuts = cuts.normalized(self.normalizer.merge_tolerance, self.normalizer.min_duration)
+                    stores.append(cuts)
+                else:
+                    cuts = self.normalizer.normalize(cuts, fps)
+
+            if job['keyframes'] in ('report', 'snap'):
+                cuts = self._check_keyframes(job, cuts, fps, result['warnings'])
+
+            builder = FCPXMLBuilder(job['id_strategy'])
+            offsets = {}
+            if len(videos) > 1 and job['sync_audio']:
+                for path, sync in AudioSync().compute_offsets(videos).items():
+                    if sync['reliable']:
+                        offsets[path] = sync['offset']
+                    else:
+                        result['warnings'].append(
+                            f"{os.path.basename(path)}: no clear audio match, not shifted"
+                        )
+            angles = []
+            for video_path in videos:
+                angle_cuts = builder.shift_cuts(cuts, offsets.get(video_path))
+                if isinstance(angle_cuts, FrameCutStore) and angle_cuts is not cuts:
+                    stores.append(angle_cuts)
+                angles.append((angle_cuts, video_path))
+
+            # Each angle is checked with the cuts it will actually use, after shifting
+            known_durations = {path: media[path].get('duration') for path in videos if path in media}
+            report = self.preflight.check_angles(angles, fps, known_durations)
+            if report['out_of_range']:
+                summary = self.preflight.format_report(report)
+                if job['on_out_of_range'] == 'fail':
+                    raise ValueError(f"Cuts past end of source:\n{summary}")
+                result['warnings'].append(summary)
+
+            output_dir = job['output_dir']
+            os.makedirs(output_dir, exist_ok=True)
+            reference_file = os.path.join(output_dir, os.path.basename(job['cuts']))
+
+            if len(videos) > 1:
+                for angle_cuts, video_path in angles:
+                    base_name = os.path.splitext(os.path.basename(video_path))[0]
+                    timeline = builder.build_timeline(
+                        angle_cuts, video_path, fps, job['include_audio'], f"{base_name}_Timeline",
+                        source_duration=report['durations'].get(video_path)
+                    )
+                    result['outputs'] += self._export(
+                        job, timeline, os.path.join(output_dir, f"{base_name}_timeline")
+                    )
+            else:
+                base_name = os.path.splitext(os.path.basename(job['cuts']))[0]
+                timeline = builder.build_timeline(
+                    cuts, videos[0], fps, job['include_audio'],
+                    job['output_name'] or f"{base_name}_Timeline",
+                    source_duration=report['durations'].get(videos[0])
+                )
+                fcpxml_path = self.file_manager.get_single_fcpxml_path(reference_file, job['output_name'])
+                # Every format is written in the same pass over the timeline
+                result['outputs'] = self._export(job, timeline, os.path.splitext(fcpxml_path)[0])
+
+            # The debug file lists every cut, so it is left out for cut lists kept on disk
+            if not stores:
+                debug_content = builder.create_debug_info(
+                    cuts, videos, fps, job['include_audio'], len(videos) > 1
+                )
+                self.file_manager.save_debug_file(debug_content, reference_file)
+
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        finally:
+            for store in stores:
+                store.close()
+
+        result['elapsed'] = round(time.time() - started, 3)
+        return result
+
+    def _export(self, job: Dict[str, Any], timeline: Timeline, base_path: str) -> List[str]:
+        """Write a timeline in the job's formats, flat, split into parts or nested"""
+        limits = ChunkLimits(job['chunk_clips'], job['chunk_minutes'] and job['chunk_minutes'] * 60)
+        chunking = job['chunking']
+        if chunking == 'auto':
+            # Only timelines too long for one spine are nested
+            chunking = 'compound' if job['chunk_clips'] and timeline.clip_count > job['chunk_clips'] else 'off'
+
+        if chunking == 'split':
+            return self.exporter.export_parts(timeline, job['formats'], base_path, limits, job['id_strategy'])
+        compound = limits if chunking == 'compound' else None
+        return self.exporter.export_files(timeline, job['formats'], base_path, job['id_strategy'], compound)
+
+    def _search_transcript(self, job: Dict[str, Any]) -> List[Dict]:
+        """Cuts around the places where the job's query is spoken in its transcript"""
+        if self.transcripts is None:
+            self.transcripts = TranscriptSearch(workers=1)
+        cuts = self.transcripts.cuts(job['query'], job['cuts'], job['query_padding'], job['query_merge_gap'])
+        if not cuts:
+            raise ValueError(f"No matches for {job['query']!r} in {os.path.basename(job['cuts'])}")
+        return cuts
+
+    def _check_keyframes(self, job: Dict[str, Any], cuts: List[Dict], fps: float,
+                         warnings: List[str]) -> List[Dict]:
+        """Report cuts that start mid-GOP, and snap them for single-video jobs"""
+        for video_path in job['videos']:
+            index = KeyframeIndex.for_video(video_path, self.preflight.video_analyzer)
+            if index is None:
+                warnings.append(f"{os.path.basename(video_path)}: keyframes unknown, not checked")
+                continue
+            # Angles have their own GOPs, so snapping to one would throw the others out of sync
+            if job['keyframes'] == 'snap' and len(job['videos']) == 1:
+                cuts = index.snap_cuts(cuts)
+            entries = index.report(cuts, fps)
+            if entries:
+                warnings.append(index.format_report(entries, video_path))
+        return cuts
+
+    def _resolve_fps(self, job: Dict[str, Any], media: Dict[str, Dict], warnings: List[str]) -> float:
+        """
+        Use the job's fps, or the detected fps of its first video
+        A variable frame rate source uses its measured average rate, with a warning
+        The detection normally comes from the scheduler's shared probe in media
+        """
+        if job['fps'] != 'auto':
+            return float(job['fps'])
+
+        video_path = job['videos'][0]
+        detection = media.get(video_path, {}).get('frame_rate')
+        if detection is None:
+            detection = self.preflight.video_analyzer.detect_frame_rate(video_path)
+        if detection['warning']:
+            warnings.append(detection['warning'])
+        detected = detection['fps'] or media.get(video_path, {}).get('fps')
+        return float(detected) if detected else 30.0
+
+
+def run_batch_job(job: Dict[str, Any], media: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+    """Module-level entry point so jobs can be sent to worker processes"""
+    return BatchJobRunner().run(job, media)
+
+
+class BatchLedger:
+    """Append-only JSON Lines record of finished jobs, used to resume batches"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed(self) -> Dict[str, str]:
+        """Map of job id to the signature it completed with"""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Truncated last line of an interrupted run
+                if entry.get('status') == 'done':
+                    done[entry['id']] = entry.get('signature')
+                else:
+                    done.pop(entry.get('id'), None)
+        return done
+
+    def record(self, result: Dict[str, Any]):
+        """Append a job result and flush it to disk"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BatchScheduler:
+    """Plans and runs a manifest of jobs across a worker pool"""
+
+    def __init__(self, workers: Optional[int] = None, probe_workers: int = 8,
+                 video_analyzer: Optional[VideoAnalyzer] = None,
+                 media_library: Optional[MediaLibrary] = None):
+        self.workers = workers
+        self.probe_workers = probe_workers
+        self.video_analyzer = video_analyzer or VideoAnalyzer()
+        self.media_library = media_library
+
+    def load_manifest(self, manifest_path: str) -> List[Dict[str, Any]]:
+        """
+        Read a JSON or TOML manifest: {"defaults": {...}, "jobs": [{...}, ...]}
+        Relative paths are resolved against the manifest's directory
+        """
+        if manifest_path.lower().endswith('.toml'):
+            if tomllib is None:
+                raise ValueError("TOML manifests require Python 3.11 or newer")
+            with open(manifest_path, 'rb') as f:
+                manifest = tomllib.load(f)
+        else:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        if not isinstance(manifest.get('jobs'), list) or not manifest['jobs']:
+            raise ValueError("Manifest must contain a non-empty 'jobs' list")
+
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        defaults = dict(JOB_DEFAULTS)
+        defaults.update(manifest.get('defaults', {}))
+
+        jobs = []
+        seen_ids = set()
+        for number, entry in enumerate(manifest['jobs'], 1):
+            job = dict(defaults)
+            job.update(entry)
+            job['id'] = str(job.get('id') or f"job-{number}")
+            if job['id'] in seen_ids:
+                raise ValueError(f"Duplicate job id in manifest: {job['id']}")
+            seen_ids.add(job['id'])
+
+            if 'cuts' not in job:
+                raise ValueError(f"Job {job['id']}: missing 'cuts'")
+            videos = job.pop('video', None)
+            job['videos'] = job.get('videos') or ([videos] if videos else [])
+            if not job['videos']:
+                raise ValueError(f"Job {job['id']}: no videos listed")
+
+            if isinstance(job['formats'], str):
+                job['formats'] = [job['formats']]
+            unknown = [name for name in job['formats'] if name not in EMITTERS]
+            if unknown or not job['formats']:
+                raise ValueError(f"Job {job['id']}: unknown export format(s) {unknown}, "
+                                 f"expected some of {', '.join(EMITTERS)}")
+
+            if job['chunking'] not in ('off', 'auto', 'split', 'compound'):
+                raise ValueError(f"Job {job['id']}: chunking must be off, auto, split or compound")
+
+            if job['memory_budget_mb'] and job['keyframes'] != 'off':
+                raise ValueError(f"Job {job['id']}: keyframe checks need the cut list in memory, "
+                                 f"they cannot be combined with memory_budget_mb")
+
+            job['cuts'] = os.path.join(base_dir, job['cuts'])
+            job['videos'] = [self._find_source(job) if path == 'auto' else os.path.join(base_dir, path)
+                             for path in job['videos']]
+            # A job's own output_dir is used as is; a shared default gets a folder per job
+            output_dir = os.path.join(base_dir, job['output_dir'] or 'output')
+            if 'output_dir' not in entry:
+                output_dir = os.path.join(output_dir, job['id'])
+            job['output_dir'] = output_dir
+            jobs.append(job)
+
+        return jobs
+
+    def _find_source(self, job: Dict[str, Any]) -> str:
+        """Resolve a "video": "auto" entry with the media library index"""
+        if self.media_library is None:
+            self.media_library = MediaLibrary(video_analyzer=self.video_analyzer)
+
+        matches = self.media_library.find_source(job['cuts'], limit=2)
+        if not matches:
+            raise ValueError(f"Job {job['id']}: no source found in the media library for {job['cuts']}")
+        if len(matches) > 1 and matches[0]['score'] == matches[1]['score']:
+            raise ValueError(f"Job {job['id']}: ambiguous source, both {matches[0]['path']} "
+                             f"and {matches[1]['path']} match")
+        return matches[0]['path']
+
+    def job_signature(self, job: Dict[str, Any]) -> str:
+        """Fingerprint of a job's settings and cut list, so edited jobs rerun"""
+        try:
+            stat = os.stat(job['cuts'])
+            cuts_state = f"{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            cuts_state = "missing"
+
+        payload = json.dumps(job, sort_keys=True) + cuts_state
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def plan(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order jobs so those sharing media run next to each other"""
+        return sorted(jobs, key=lambda job: (sorted(job['videos']), job['id']))
+
+    def probe_media(self, video_paths: List[str],
+                    progress: Optional[Callable[[str], None]] = None,
+                    frame_rate_paths: Iterable[str] = ()) -> Dict[str, Dict]:
+        """
+        Probe every distinct file once, in parallel (ffprobe runs as a subprocess)
+        Files in frame_rate_paths also get their frame rate detected, including the
+        variable frame rate scan, stored as media[path]['frame_rate']
+        """
+        unique_paths = list(dict.fromkeys(video_paths))
+        frame_rate_paths = set(frame_rate_paths)
+        media = {}
+
+        def probe(path):
+            metadata = dict(self.video_analyzer.probe(path))
+            if path in frame_rate_paths:
+                # {'fps', 'vfr', 'warning'}
+                metadata['frame_rate'] = self.video_analyzer.detect_frame_rate(path)
+            return metadata
+
+        with ThreadPoolExecutor(max_workers=self.probe_workers) as executor:
+            futures = {executor.submit(probe, path): path for path in unique_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    media[path] = future.result()
+                except Exception:
+                    media[path] = {'fps': None, 'duration': None}
+                if progress:
+                    progress(f"Probed {os.path.basename(path)}")
+
+        return media
+
+    def run(self, manifest_path: str, ledger_path: Optional[str] = None,
+            progress: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Run all jobs that are not yet recorded as done in the ledger
+        Returns the results of the jobs run in this call
+        """
+        jobs = self.load_manifest(manifest_path)
+        ledger = BatchLedger(ledger_path or f"{os.path.splitext(manifest_path)[0]}.ledger.jsonl")
+        completed = ledger.completed()
+
+        pending = []
+        for job in self.plan(jobs):
+            signature = self.job_signature(job)
+            if completed.get(job['id']) == signature:
+                continue
+            pending.append((job, signature))
+
+        if progress:
+            progress(f"{len(pending)} of {len(jobs)} jobs to run")
+        if not pending:
+            return []
+
+        # Jobs that detect their fps do it from the shared probe, once per file
+        media = self.probe_media([path for job, _ in pending for path in job['videos']], progress,
+                                 [job['videos'][0] for job, _ in pending if job['fps'] == 'auto'])
+
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for job, signature in pending:
+                job_media = {path: media[path] for path in job['videos']}
+                futures[executor.submit(run_batch_job, job, job_media)] = signature
+
+            for future in as_completed(futures):
+                result = future.result()
+                result['signature'] = futures[future]
+                ledger.record(result)
+                results.append(result)
+                if progress:
+                    progress(f"[{result['status']}] {result['id']} ({result['elapsed']}s)"
+                             + (f": {result['error']}" if result['error'] else ""))
+
+        return results
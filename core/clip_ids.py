@@ -0,0 +1,61 @@
+"""
+Identifier strategies for FCPXML resources and clips
+Random, content-hashed or counter based IDs in the usual UUID layout
+"""
+
+import hashlib
+import uuid
+
+
+class ClipIdGenerator:
+    """Generates the IDs written into a single FCPXML document"""
+
+    STRATEGIES = ("uuid4", "hash", "counter")
+
+    def __init__(self, strategy: str = "uuid4", source: str = "", document: str = ""):
+        """
+        strategy: "uuid4" (random), "hash" (stable per source/document/cut) or "counter"
+        source: identifies the source media
+        document: identifies the document (such as its project name); with source it
+                  seeds the hash and the counter's namespace, so documents imported
+                  together do not collide
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown ID strategy: {strategy}")
+
+        self.strategy = strategy
+        self.source = source
+        self._counter = 0
+        # Counter IDs keep the hashed document in their high groups and count in the last one
+        seed = f"{source}\0{document}".encode('utf-8')
+        namespace = hashlib.blake2b(seed, digest_size=10).hexdigest().upper()
+        self._counter_prefix = f"{namespace[:8]}-{namespace[8:12]}-{namespace[12:16]}-{namespace[16:20]}"
+        # Seeded once so each ID only hashes its own key
+        self._document_hash = hashlib.blake2b(seed + b'\0', digest_size=16)
+
+    def document_id(self, role: str) -> str:
+        """ID for a document-level element such as the asset, project or event"""
+        if self.strategy == "hash":
+            return self._hashed(role)
+        return self._next()
+
+    def clip_id(self, index: int, start, end) -> str:
+        """ID for the clip made from cut number `index` spanning start..end"""
+        if self.strategy == "hash":
+            return self._hashed(f"{index}\0{start}\0{end}")
+        return self._next()
+
+    def _next(self) -> str:
+        """Random UUID, or the next value of the document's counter"""
+        if self.strategy == "uuid4":
+            return str(uuid.uuid4()).upper()
+
+        self._counter += 1
+        return f"{self._counter_prefix}-{self._counter:012X}"
+
+    def _hashed(self, key: str) -> str:
+        """UUID-shaped digest of the source and document followed by key"""
+        hasher = self._document_hash.copy()
+        hasher.update(key.encode('utf-8'))
+        digest = hasher.hexdigest().upper()
+        return f"{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:]}"
@@ -0,0 +1,118 @@
+"""
+Cut list normalization
+Cleans up noisy cut lists before they are handed to the FCPXML builder
+"""
+
+from typing import List, Dict, Tuple, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure-Python path is used instead
+    np = None
+
+
+class CutNormalizer:
+    """Snaps cuts to the frame grid, merges overlaps and drops tiny cuts"""
+
+    def __init__(self, merge_tolerance: float = 0.0, min_duration: float = 0.0,
+                 use_numpy: bool = True):
+        """
+        merge_tolerance: gap in seconds below which neighbouring cuts are merged
+        min_duration: cuts shorter than this (after merging) are dropped
+        use_numpy: use the vectorized path when NumPy is installed
+        """
+        self.merge_tolerance = merge_tolerance
+        self.min_duration = min_duration
+        self.use_numpy = use_numpy
+
+    def normalize(self, cuts: List[Dict], fps: float) -> List[Dict]:
+        """
+        Normalize a cut list for the given frame rate
+        Returns a new list of {"start", "end"} dicts sorted by start time
+        """
+        if not cuts:
+            return []
+
+        starts = [cut['start'] for cut in cuts]
+        ends = [cut['end'] for cut in cuts]
+        start_frames, end_frames = self.normalize_frames(starts, ends, fps)
+
+        return [{"start": s / fps, "end": e / fps}
+                for s, e in zip(start_frames, end_frames)]
+
+    def normalize_frames(self, starts: Sequence[float], ends: Sequence[float],
+                         fps: float) -> Tuple[List[int], List[int]]:
+        """
+        Normalize parallel start/end sequences given in seconds
+        Returns (start_frames, end_frames) as lists of frame numbers
+        """
+        if fps <= 0:
+            raise ValueError(f"Invalid frame rate: {fps}")
+
+        tolerance_frames = int(round(self.merge_tolerance * fps))
+        min_frames = max(1, int(round(self.min_duration * fps)))
+
+        if self.use_numpy and np is not None:
+            return self._normalize_numpy(starts, ends, fps, tolerance_frames, min_frames)
+        return self._normalize_python(starts, ends, fps, tolerance_frames, min_frames)
+
+    def _normalize_numpy(self, starts, ends, fps: float, tolerance_frames: int,
+                         min_frames: int) -> Tuple[List[int], List[int]]:
+        """Vectorized normalization using NumPy"""
+        start_frames = np.rint(np.asarray(starts, dtype=np.float64) * fps).astype(np.int64)
+        end_frames = np.rint(np.asarray(ends, dtype=np.float64) * fps).astype(np.int64)
+
+        # Drop cuts that collapse to nothing on the frame grid
+        keep = end_frames > start_frames
+        start_frames = start_frames[keep]
+        end_frames = end_frames[keep]
+        if start_frames.size == 0:
+            return [], []
+
+        order = np.argsort(start_frames, kind='stable')
+        start_frames = start_frames[order]
+        end_frames = end_frames[order]
+
+        # A cut opens a new group when it starts after everything before it has ended
+        running_end = np.maximum.accumulate(end_frames)
+        new_group = np.empty(start_frames.size, dtype=bool)
+        new_group[0] = True
+        new_group[1:] = start_frames[1:] > running_end[:-1] + tolerance_frames
+
+        group_index = np.flatnonzero(new_group)
+        merged_starts = start_frames[group_index]
+        merged_ends = np.maximum.reduceat(end_frames, group_index)
+
+        long_enough = (merged_ends - merged_starts) >= min_frames
+        return merged_starts[long_enough].tolist(), merged_ends[long_enough].tolist()
+
+    def _normalize_python(self, starts, ends, fps: float, tolerance_frames: int,
+                          min_frames: int) -> Tuple[List[int], List[int]]:
+        """Pure-Python fallback used when NumPy is unavailable"""
+        frames = []
+        for start, end in zip(starts, ends):
+            start_frame = int(round(start * fps))
+            end_frame = int(round(end * fps))
+            if end_frame > start_frame:
+                frames.append((start_frame, end_frame))
+
+        frames.sort(key=lambda pair: pair[0])
+
+        merged_starts = []
+        merged_ends = []
+        for start_frame, end_frame in frames:
+            if merged_ends and start_frame <= merged_ends[-1] + tolerance_frames:
+                if end_frame > merged_ends[-1]:
+                    merged_ends[-1] = end_frame
+            else:
+                merged_starts.append(start_frame)
+                merged_ends.append(end_frame)
+
+        result_starts = []
+        result_ends = []
+        for start_frame, end_frame in zip(merged_starts, merged_ends):
+            if end_frame - start_frame >= min_frames:
+                result_starts.append(start_frame)
+                result_ends.append(end_frame)
+
+        return result_starts, result_ends
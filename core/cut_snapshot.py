@@ -0,0 +1,151 @@
+"""
+Cut list snapshots
+Binary copies of parsed cut lists, so unchanged inputs are not parsed again
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import List, Dict, Optional
+
+from utils.file_helpers import FileManager, CacheBudget
+
+
+# magic, snapshot version, parser version, format name, fps, cut count, source key, column flags
+HEADER = struct.Struct('<8sHH16sdQ16sI')
+MAGIC = b'FCPXCUTS'
+SNAPSHOT_VERSION = 2
+
+# Column flags: the parser produced ints for every start / every end
+INT_STARTS = 1
+INT_ENDS = 2
+
+
+class CutSnapshotCache:
+    """
+    Stores cut lists as a fixed header plus one packed float64 array of start/end pairs
+    Snapshots are keyed by the source file's path, size and mtime together with
+    the format and fps it was parsed with; a header mismatch (other parser
+    version, changed file) is treated as a miss. Files are memory-mapped and the
+    cuts are built straight from the mapped pairs, and the least recently used
+    ones are removed past max_bytes
+    The header records which columns were parsed as ints, so a snapshot gives back
+    the same types as parsing the file
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.file_manager = FileManager()
+        self._cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._budget = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> str:
+        """Directory holding the snapshots, created on first use"""
+        if self._cache_dir is None:
+            self._cache_dir = self.file_manager.get_cache_directory('snapshots')
+        return self._cache_dir
+
+    @property
+    def budget(self) -> CacheBudget:
+        """Size limit of the snapshot directory, set up on first use"""
+        with self._lock:
+            if self._budget is None:
+                self._budget = CacheBudget(self.cache_dir, '.cuts', self.max_bytes)
+            return self._budget
+
+    def get(self, file_path: str, format_name: str, parser_version: int, fps: float) -> Optional[List[Dict]]:
+        """Return the cached cuts for a file, or None"""
+        source_key = self.file_manager.get_cache_key(file_path)
+        if source_key is None:
+            return None
+
+        path = self._snapshot_path(file_path, format_name, fps)
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if len(data) < HEADER.size:
+                    return None
+                magic, version, stored_parser, stored_format, stored_fps, count, stored_key, flags = \
+                    HEADER.unpack_from(data, 0)
+                if (magic, version, stored_parser, stored_key) != (MAGIC, SNAPSHOT_VERSION, parser_version, source_key):
+                    return None
+                if stored_format.rstrip(b'\0').decode('ascii') != format_name or stored_fps != fps:
+                    return None
+                if len(data) != HEADER.size + count * 16:
+                    return None  # Truncated
+
+                with memoryview(data) as raw, raw[HEADER.size:].cast('d') as values:
+                    if sys.byteorder != 'little':
+                        # Stored little-endian, so big-endian hosts read a swapped copy
+                        swapped = array('d', values)
+                        swapped.byteswap()
+                        cuts = self._decode(swapped, flags)
+                    else:
+                        cuts = self._decode(values, flags)
+        except (OSError, ValueError):
+            return None
+
+        self.budget.touch(path)
+        return cuts
+
+    def put(self, file_path: str, format_name: str, parser_version: int, fps: float, cuts: List[Dict]) -> bool:
+        """
+        Save a snapshot of parsed cuts
+        Only plain {"start", "end"} cuts whose columns are all ints or all floats are
+        stored, since anything else would not load back as it was parsed; returns False
+        if nothing was saved
+        """
+        source_key = self.file_manager.get_cache_key(file_path)
+        if source_key is None or any(len(cut) != 2 for cut in cuts):
+            return False
+
+        flags = 0
+        for column, flag in (('start', INT_STARTS), ('end', INT_ENDS)):
+            kinds = {type(cut[column]) for cut in cuts}
+            if kinds == {int}:
+                # Larger ints do not survive the round trip through a double
+                if any(abs(cut[column]) > 2 ** 53 for cut in cuts):
+                    return False
+                flags |= flag
+            elif kinds - {float}:
+                return False
+
+        values = array('d')
+        for cut in cuts:
+            values.append(float(cut['start']))
+            values.append(float(cut['end']))
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, parser_version,
+                             format_name.encode('ascii')[:16], fps, len(cuts), source_key, flags)
+        path = self._snapshot_path(file_path, format_name, fps)
+        try:
+            with self.file_manager.atomic_write(path) as f:
+                f.write(header)
+                values.tofile(f)
+        except OSError:
+            return False  # The cache is an optimization
+
+        self.budget.added(HEADER.size + len(values) * 8)
+        return True
+
+    def _decode(self, values, flags: int) -> List[Dict]:
+        """Cuts from interleaved start/end doubles, restoring int columns"""
+        with memoryview(values) as view, view[0::2] as starts, view[1::2] as ends:
+            start_values = map(int, starts) if flags & INT_STARTS else starts
+            end_values = map(int, ends) if flags & INT_ENDS else ends
+            return [{'start': start, 'end': end} for start, end in zip(start_values, end_values)]
+
+    def _snapshot_path(self, file_path: str, format_name: str, fps: float) -> str:
+        # One file per source and parse settings; a new version of the source overwrites it
+        identity = f"{os.path.abspath(file_path)}\0{format_name}\0{fps!r}"
+        name = hashlib.blake2b(identity.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.cuts")
@@ -0,0 +1,339 @@
+"""
+Out-of-core cut storage
+Cut lists kept as frame numbers in a memory-mapped scratch file, for lists larger than memory
+"""
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, runs are sorted with list.sort instead
+    np = None
+
+from utils.file_helpers import FileManager
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken
+
+
+# start frame, end frame
+PAIR = struct.Struct('=qq')
+
+
+class FrameCutStore:
+    """
+    Append-only cut list stored as (start_frame, end_frame) int64 pairs on disk
+    Appended cuts are buffered, spilled to a scratch file and read back through a
+    memory map one block at a time. Reading, sorting and merging never hold more
+    than memory_budget bytes of cuts, whatever the length of the list.
+    Iterating yields {"start", "end"} dicts in seconds like an in-memory cut list;
+    cuts that collapse to nothing on the frame grid are dropped when appended.
+    """
+
+    def __init__(self, fps: float, memory_budget: int = 64 * 1024 * 1024,
+                 directory: Optional[str] = None):
+        if fps <= 0:
+            raise ValueError(f"Invalid frame rate: {fps}")
+        if memory_budget < 1024 * 1024:
+            raise ValueError("memory_budget must be at least 1 MiB")
+        self.fps = fps
+        self.memory_budget = memory_budget
+        self.directory = directory or FileManager().get_cache_directory('spill')
+        os.makedirs(self.directory, exist_ok=True)
+        # Cuts per block read or written; blocks are copied and unpacked, so they take
+        # an eighth of the budget to leave room for the other buffers of a pass
+        self.block_pairs = max(1024, memory_budget // (PAIR.size * 8))
+
+        fd, self.path = tempfile.mkstemp(suffix='.frames', dir=self.directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._buffer = array('q')
+        self._stored = 0
+        self._map = None
+
+    @classmethod
+    def from_cuts(cls, cuts: Iterable[Dict], fps: float, memory_budget: int = 64 * 1024 * 1024,
+                  directory: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                  cancel: Optional[CancellationToken] = None) -> 'FrameCutStore':
+        """
+        Spill a stream of cuts (such as an ingest CutSource) to a new store
+        progress receives (cuts read, None)
+        """
+        store = cls(fps, memory_budget, directory)
+        reporter = ProgressReporter(progress, cancel)
+        try:
+            for count, cut in enumerate(cuts):
+                if not count % 10000:
+                    reporter.update(count)
+                store.append(cut['start'], cut['end'])
+        except BaseException:
+            store.close()
+            raise
+        reporter.finish(len(store))
+        return store
+
+    def __enter__(self) -> 'FrameCutStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._stored + len(self._buffer) // 2
+
+    def __iter__(self) -> Iterator[Dict]:
+        fps = self.fps
+        for block in self.iter_blocks():
+            for start, end in zip(block[0::2], block[1::2]):
+                yield {'start': start / fps, 'end': end / fps}
+
+    def __getitem__(self, index: int) -> Dict:
+        start, end = self.frames(index)
+        return {'start': start / self.fps, 'end': end / self.fps}
+
+    def frames(self, index: int) -> Tuple[int, int]:
+        """(start_frame, end_frame) of one cut"""
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("cut index out of range")
+
+        if index >= self._stored:
+            position = (index - self._stored) * 2
+            return self._buffer[position], self._buffer[position + 1]
+        if self._map is None:
+            self._map = mmap.mmap(self._file.fileno(), self._stored * PAIR.size, access=mmap.ACCESS_READ)
+        return PAIR.unpack_from(self._map, index * PAIR.size)
+
+    def append(self, start: float, end: float):
+        """Add a cut given in seconds, snapped to the frame grid"""
+        self.append_frames(int(round(start * self.fps)), int(round(end * self.fps)))
+
+    def append_frames(self, start_frame: int, end_frame: int):
+        """Add a cut given in frames"""
+        if end_frame <= start_frame:
+            return
+        self._buffer.append(start_frame)
+        self._buffer.append(end_frame)
+        if len(self._buffer) >= self.block_pairs * 2:
+            self.flush()
+
+    def extend(self, cuts: Iterable[Dict]):
+        for cut in cuts:
+            self.append(cut['start'], cut['end'])
+
+    def flush(self):
+        """Write buffered cuts to the scratch file"""
+        if not self._buffer:
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.seek(self._stored * PAIR.size)
+        self._buffer.tofile(self._file)
+        self._file.flush()
+        self._stored += len(self._buffer) // 2
+        self._buffer = array('q')
+
+    def close(self):
+        """Delete the scratch file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not self._file.closed:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def iter_blocks(self) -> Iterator[array]:
+        """Interleaved start/end frames in order, block_pairs cuts at a time"""
+        self.flush()
+        if not self._stored:
+            return
+        size = self._stored * PAIR.size
+        step = self.block_pairs * PAIR.size
+        with mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) as data:
+            for position in range(0, size, step):
+                block = array('q')
+                block.frombytes(data[position:position + step])
+                yield block
+
+    def frame_totals(self) -> Tuple[int, int]:
+        """(total frames, cut count) of the cuts laid end to end"""
+        total = 0
+        for block in self.iter_blocks():
+            total += sum(block[1::2]) - sum(block[0::2])
+        return total, len(self)
+
+    def spine_frames(self) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        (cut_index, offset, start, duration) in frames for every cut, read sequentially
+        Same layout as FCPXMLBuilder.spine_frames, without rounding seconds again
+        """
+        index = 0
+        offset = 0
+        for block in self.iter_blocks():
+            for start, end in zip(block[0::2], block[1::2]):
+                yield index, offset, start, end - start
+                index += 1
+                offset += end - start
+
+    def shifted(self, offset: float) -> 'FrameCutStore':
+        """
+        New store with the cuts moved offset seconds earlier, as FCPXMLBuilder.shift_cuts
+        Cuts are trimmed at frame 0, and those that end before it are dropped
+        """
+        shift = int(round(offset * self.fps))
+        store = self._empty()
+        for block in self.iter_blocks():
+            for start, end in zip(block[0::2], block[1::2]):
+                store.append_frames(max(0, start - shift), end - shift)
+        return store
+
+    def sorted(self, unique: bool = True, progress: Optional[ProgressCallback] = None,
+               cancel: Optional[CancellationToken] = None) -> 'FrameCutStore':
+        """
+        New store with the cuts ordered by start (then end) frame, using an external merge sort
+        unique drops exact duplicates; progress receives (cuts sorted, cut count)
+        """
+        store = self._empty()
+        previous = None
+        try:
+            for pair in self._sorted_pairs(progress, cancel):
+                if not unique or pair != previous:
+                    store.append_frames(*pair)
+                    previous = pair
+        except BaseException:
+            store.close()
+            raise
+        return store
+
+    def normalized(self, merge_tolerance: float = 0.0, min_duration: float = 0.0,
+                   progress: Optional[ProgressCallback] = None,
+                   cancel: Optional[CancellationToken] = None) -> 'FrameCutStore':
+        """
+        Out-of-core counterpart of CutNormalizer: sorts, merges cuts that overlap or are
+        less than merge_tolerance seconds apart and drops those shorter than min_duration
+        """
+        tolerance_frames = int(round(merge_tolerance * self.fps))
+        min_frames = max(1, int(round(min_duration * self.fps)))
+        store = self._empty()
+        group = None
+        try:
+            for start, end in self._sorted_pairs(progress, cancel):
+                if group and start <= group[1] + tolerance_frames:
+                    if end > group[1]:
+                        group[1] = end
+                    continue
+                if group and group[1] - group[0] >= min_frames:
+                    store.append_frames(*group)
+                group = [start, end]
+            if group and group[1] - group[0] >= min_frames:
+                store.append_frames(*group)
+        except BaseException:
+            store.close()
+            raise
+        return store
+
+    def _empty(self) -> 'FrameCutStore':
+        return FrameCutStore(self.fps, self.memory_budget, self.directory)
+
+    def _sorted_pairs(self, progress: Optional[ProgressCallback],
+                      cancel: Optional[CancellationToken]) -> Iterator[Tuple[int, int]]:
+        """
+        All cuts as (start, end) in order
+        Sorted runs that fit the budget are written to temporary files, then merged
+        with a bounded number of open runs per pass
+        """
+        reporter = ProgressReporter(progress, cancel, len(self))
+        # The runs and intermediate passes only check for cancellation
+        checker = ProgressReporter(cancel=cancel)
+        runs = self._write_runs(checker)
+        try:
+            # Each open run reads through its own buffer, plus one for the merged output
+            fan_in = max(2, self.memory_budget // (PAIR.size * 4 * 1024) - 1)
+            while len(runs) > fan_in:
+                merged = []
+                for i in range(0, len(runs), fan_in):
+                    group = runs[i:i + fan_in]
+                    output = tempfile.TemporaryFile(dir=self.directory)
+                    merged.append(output)
+                    buffer = array('q')
+                    for pair in heapq.merge(*(self._read_run(run, len(group)) for run in group)):
+                        buffer.extend(pair)
+                        if len(buffer) >= self.block_pairs:
+                            buffer.tofile(output)
+                            buffer = array('q')
+                    buffer.tofile(output)
+                    for run in group:
+                        run.close()
+                    checker.update(0)
+                runs = merged
+
+            for count, pair in enumerate(heapq.merge(*(self._read_run(run, len(runs)) for run in runs))):
+                if not count % 10000:
+                    reporter.update(count)
+                yield pair
+            reporter.finish(len(self))
+        finally:
+            for run in runs:
+                run.close()
+
+    def _write_runs(self, checker: ProgressReporter) -> List:
+        """Sort the store in pieces that fit the budget, one temporary file per piece"""
+        if np is not None:
+            # Pairs, the sort order and the sorted copy: about two and a half times a run
+            run_pairs = self.memory_budget // (PAIR.size * 4)
+        else:
+            # Python tuples of two ints take about ten times their packed size
+            run_pairs = self.memory_budget // (PAIR.size * 10)
+        run_pairs = max(self.block_pairs, run_pairs)
+
+        runs = []
+        pending = array('q')
+        try:
+            for block in self.iter_blocks():
+                pending.extend(block)
+                if len(pending) >= run_pairs * 2:
+                    runs.append(self._write_run(pending))
+                    pending = array('q')
+                    checker.update(0)
+        except BaseException:
+            for run in runs:
+                run.close()
+            raise
+        if pending:
+            runs.append(self._write_run(pending))
+        return runs
+
+    def _write_run(self, values: array):
+        run = tempfile.TemporaryFile(dir=self.directory)
+        if np is not None:
+            pairs = np.frombuffer(values, dtype=np.int64).reshape(-1, 2)
+            order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+            run.write(pairs[order].tobytes())
+        else:
+            pairs = sorted(zip(values[0::2], values[1::2]))
+            array('q', (value for pair in pairs for value in pair)).tofile(run)
+        run.flush()
+        return run
+
+    def _read_run(self, run, open_runs: int) -> Iterator[Tuple[int, int]]:
+        """Read a sorted run back sequentially with its share of the budget"""
+        block_values = max(2048, self.memory_budget // (PAIR.size * 4 * (open_runs + 1))) * 2
+        run.seek(0)
+        while True:
+            block = array('q')
+            try:
+                block.fromfile(run, block_values)
+            except EOFError:
+                pass  # The items that were there are still read
+            if not block:
+                return
+            yield from zip(block[0::2], block[1::2])
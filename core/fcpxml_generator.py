@@ -4,15 +4,31 @@ Handles the creation of FCPXML files from cut data
 """
 
 import os
-import uuid
-from typing import List, Dict, Tuple
+from concurrent.futures import Executor
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the scalar spine path is used instead
+    np = None
+
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken, run_blocking
+from .timeline import Timeline, ChunkLimits
+from .cut_store import FrameCutStore
+from .timeline_export import FcpxmlEmitter, CompoundFcpxmlEmitter, TimelineExporter
 
 
 class FCPXMLBuilder:
     """Builds FCPXML files from cut data"""
     
-    def __init__(self):
+    def __init__(self, id_strategy: str = "uuid4"):
         self.version = "1.10"
+        # How asset, project, event and clip IDs are generated (see ClipIdGenerator)
+        self.id_strategy = id_strategy
+        # Cut count from which the "auto" engine switches to the NumPy batch path
+        self.batch_threshold = 2000
+        # Number of clip elements joined into each chunk of streamed output
+        self.chunk_clips = 1000
     
     def seconds_to_fcpxml_time(self, seconds: float, fps: float) -> str:
         """Convert seconds to FCPXML time format"""
@@ -20,106 +36,233 @@ class FCPXMLBuilder:
         return f"{total_frames}/{int(fps)}s"
     
     def generate_single_fcpxml(self, cuts: List[Dict], video_path: str, fps: float, 
-                              include_audio: bool = True, project_name: str = "Timeline") -> str:
-        """Generate FCPXML content for a single video"""
-        
-        source_filename = os.path.basename(video_path)
-        
-        # Generate unique IDs
-        asset_id = str(uuid.uuid4()).upper()
-        project_id = str(uuid.uuid4()).upper()
-        event_id = str(uuid.uuid4()).upper()
-        
-        # Calculate total timeline duration
-        total_duration = sum(cut['end'] - cut['start'] for cut in cuts)
-        total_duration_fcpxml = self.seconds_to_fcpxml_time(total_duration, fps)
-        
-        # Build audio attributes
-        audio_attrs = 'hasAudio="1" audioSources="1" audioChannels="2"' if include_audio else ''
-        
-        # Start building FCPXML
-        fcpxml_content = f'''<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE fcpxml>
-<fcpxml version="{self.version}">
-    <resources>
-        <format id="r1" name="FFVideoFormat{int(fps)}p" frameDuration="1/{int(fps)}s" width="1920" height="1080" colorSpace="1-1-1 (Rec. 709)"/>
-        <asset id="{asset_id}" name="{os.path.splitext(source_filename)[0]}" uid="{asset_id}" src="file://{video_path.replace(' ', '%20')}" start="0s" hasVideo="1" {audio_attrs} format="r1" duration="{self.seconds_to_fcpxml_time(9999, fps)}"/>
-    </resources>
-    <library>
-        <event id="{event_id}" name="Auto Generated Timeline">
-            <project id="{project_id}" name="{project_name}">
-                <sequence format="r1" duration="{total_duration_fcpxml}">
-                    <spine>'''
-        
-        # Add cuts to timeline
-        timeline_position = 0
+                              include_audio: bool = True, project_name: str = "Timeline",
+                              engine: str = "auto", id_strategy: Optional[str] = None,
+                              source_duration: Optional[float] = None,
+                              compound: Optional[ChunkLimits] = None,
+                              progress: Optional[ProgressCallback] = None,
+                              cancel: Optional[CancellationToken] = None) -> str:
+        """
+        Generate FCPXML content for a single video
+        engine selects how spine timing is computed: "scalar", "batch" or "auto"
+        id_strategy overrides the builder's ID strategy for this document
+        source_duration is the real length of the video, written as the asset duration
+        compound nests the spine as compound clips within those limits
+        progress receives (clips written, total clips); cancel is checked between blocks of clips
+        """
+        return ''.join(self.iter_single_fcpxml(
+            cuts, video_path, fps, include_audio, project_name, engine, id_strategy,
+            source_duration, compound, progress, cancel
+        ))
+    
+    async def generate_single_fcpxml_async(self, *args, progress: Optional[ProgressCallback] = None,
+                                           cancel: Optional[CancellationToken] = None,
+                                           executor: Optional[Executor] = None, **kwargs) -> str:
+        """generate_single_fcpxml() run in an executor, taking the same arguments"""
+        return await run_blocking(self.generate_single_fcpxml, *args, progress=progress,
+                                  cancel=cancel, executor=executor, **kwargs)
+    
+    def iter_single_fcpxml(self, cuts: Iterable[Dict], video_path: str, fps: float, 
+                           include_audio: bool = True, project_name: str = "Timeline",
+                           engine: str = "auto", id_strategy: Optional[str] = None,
+                           source_duration: Optional[float] = None,
+                           compound: Optional[ChunkLimits] = None,
+                           progress: Optional[ProgressCallback] = None,
+                           cancel: Optional[CancellationToken] = None) -> Iterator[str]:
+        """
+        Generate FCPXML content for a single video as a sequence of text chunks
+        cuts may be any re-iterable (such as an ingest CutSource), see build_timeline
+        """
+        timeline = self.build_timeline(
+            cuts, video_path, fps, include_audio, project_name, engine, source_duration
+        )
+        if compound:
+            emitter = CompoundFcpxmlEmitter(compound, self.version, id_strategy or self.id_strategy)
+        else:
+            emitter = FcpxmlEmitter(self.version, id_strategy or self.id_strategy)
+        yield from TimelineExporter(self.chunk_clips).iter_chunks(timeline, emitter, progress, cancel)
+    
+    def build_timeline(self, cuts: Iterable[Dict], video_path: str, fps: float,
+                       include_audio: bool = True, project_name: str = "Timeline",
+                       engine: str = "auto", source_duration: Optional[float] = None) -> Timeline:
+        """
+        Lay out cuts as a frame-quantized timeline shared by all export formats
+        cuts is read twice, once here for the total duration and once when the
+        timeline's clips are traversed
+        An out-of-core FrameCutStore is read sequentially from disk, using its frames as they are
+        """
+        if isinstance(cuts, FrameCutStore) and cuts.fps == fps:
+            total_frames, clip_count = cuts.frame_totals()
+            return Timeline(video_path, fps, cuts.spine_frames(), total_frames,
+                            project_name, include_audio, source_duration, clip_count=clip_count)
+        
+        if iter(cuts) is cuts:
+            # One-shot iterators cannot be read twice
+            cuts = list(cuts)
+        
+        # Clips are placed end to end in whole frames, so the total is the sum of rounded durations
+        total_frames = 0
+        clip_count = 0
+        for cut in cuts:
+            duration = cut['end'] - cut['start']
+            if duration > 0:
+                total_frames += int(round(duration * fps))
+                clip_count += 1
+        
+        return Timeline(video_path, fps, self.spine_frames(cuts, fps, engine), total_frames,
+                        project_name, include_audio, source_duration, clip_count=clip_count)
+    
+    def spine_frames(self, cuts: Iterable[Dict], fps: float,
+                     engine: str = "auto") -> Iterable[Tuple[int, int, int, int]]:
+        """
+        Compute frame-rounded timing for every clip on the spine
+        Yields (cut_index, offset, start, duration) in frames, skipping empty cuts;
+        each clip starts on the frame where the previous one ends
+        """
+        if engine == "auto":
+            batchable = np is not None and isinstance(cuts, list)
+            engine = "batch" if batchable and len(cuts) >= self.batch_threshold else "scalar"
+        
+        if engine == "batch":
+            return self._spine_frames_batch(cuts, fps)
+        elif engine == "scalar":
+            return self._spine_frames_scalar(cuts, fps)
+        else:
+            raise ValueError(f"Unknown spine engine: {engine}")
+    
+    def _spine_frames_scalar(self, cuts: Iterable[Dict], fps: float) -> Iterator[Tuple[int, int, int, int]]:
+        """Compute spine timing one cut at a time"""
+        timeline_frames = 0
         for i, cut in enumerate(cuts):
             start_sec = cut['start']
-            end_sec = cut['end']
-            duration = end_sec - start_sec
+            duration = cut['end'] - start_sec
             
             if duration <= 0:
                 continue
             
-            start_fcpxml = self.seconds_to_fcpxml_time(start_sec, fps)
-            duration_fcpxml = self.seconds_to_fcpxml_time(duration, fps)
-            offset_fcpxml = self.seconds_to_fcpxml_time(timeline_position, fps)
-            
-            clip_id = str(uuid.uuid4()).upper()
-            
-            fcpxml_content += f'''
-                        <asset-clip id="{clip_id}" name="{source_filename}_cut_{i+1}" ref="{asset_id}" offset="{offset_fcpxml}" start="{start_fcpxml}" duration="{duration_fcpxml}"/>'''
+            duration_frames = int(round(duration * fps))
+            yield (
+                i,
+                timeline_frames,
+                int(round(start_sec * fps)),
+                duration_frames,
+            )
             
-            timeline_position += duration
+            timeline_frames += duration_frames
+    
+    def _spine_frames_batch(self, cuts: List[Dict], fps: float) -> Iterable[Tuple[int, int, int, int]]:
+        """
+        Compute spine timing for all cuts with a few vectorized operations
+        Rounding and summation order match the scalar path, so output is identical
+        """
+        if np is None:
+            raise RuntimeError("The batch spine engine requires NumPy")
+        
+        count = len(cuts)
+        starts = np.fromiter((cut['start'] for cut in cuts), dtype=np.float64, count=count)
+        ends = np.fromiter((cut['end'] for cut in cuts), dtype=np.float64, count=count)
+        durations = ends - starts
+        
+        indices = np.flatnonzero(durations > 0)
+        starts = starts[indices]
+        duration_frames = np.rint(durations[indices] * fps).astype(np.int64)
         
-        fcpxml_content += '''
-                    </spine>
-                </sequence>
-            </project>
-        </event>
-    </library>
-</fcpxml>'''
+        # Integer running total of the rounded durations, exactly as in the scalar path
+        offsets = np.zeros(duration_frames.size, dtype=np.int64)
+        if duration_frames.size > 1:
+            offsets[1:] = np.cumsum(duration_frames[:-1])
         
-        return fcpxml_content
+        return zip(
+            indices.tolist(),
+            offsets.tolist(),
+            np.rint(starts * fps).astype(np.int64).tolist(),
+            duration_frames.tolist(),
+        )
     
     def generate_multi_fcpxml(self, cuts: List[Dict], video_paths: List[str], fps: float, 
-                             include_audio: bool = True) -> List[Tuple[str, str]]:
-        """Generate multiple FCPXML files for multi-camera workflow"""
+                             include_audio: bool = True, engine: str = "auto",
+                             id_strategy: Optional[str] = None,
+                             source_durations: Optional[Dict[str, float]] = None,
+                             offsets: Optional[Dict[str, float]] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             cancel: Optional[CancellationToken] = None) -> List[Tuple[str, str]]:
+        """
+        Generate multiple FCPXML files for multi-camera workflow
+        source_durations maps video paths to their probed durations
+        offsets maps video paths to how many seconds after the first angle they started
+        progress receives (angles done, number of angles)
+        """
         
         results = []
+        reporter = ProgressReporter(progress, cancel, len(video_paths), interval=0)
         
-        for video_path in video_paths:
+        for number, video_path in enumerate(video_paths):
+            reporter.update(number)
             source_filename = os.path.basename(video_path)
             base_name = os.path.splitext(source_filename)[0]
             project_name = f"{base_name}_Timeline"
             
+            angle_cuts = self.shift_cuts(cuts, (offsets or {}).get(video_path))
+            
             fcpxml_content = self.generate_single_fcpxml(
-                cuts, video_path, fps, include_audio, project_name
+                angle_cuts, video_path, fps, include_audio, project_name, engine, id_strategy,
+                (source_durations or {}).get(video_path), cancel=cancel
             )
             
             results.append((fcpxml_content, source_filename))
         
+        reporter.finish(len(video_paths))
         return results
     
-    def create_debug_info(self, cuts: List[Dict], video_paths: List[str], fps: float, 
+    async def generate_multi_fcpxml_async(self, *args, progress: Optional[ProgressCallback] = None,
+                                          cancel: Optional[CancellationToken] = None,
+                                          executor: Optional[Executor] = None, **kwargs) -> List[Tuple[str, str]]:
+        """generate_multi_fcpxml() run in an executor, taking the same arguments"""
+        return await run_blocking(self.generate_multi_fcpxml, *args, progress=progress,
+                                  cancel=cancel, executor=executor, **kwargs)
+    
+    def shift_cuts(self, cuts: List[Dict], offset: Optional[float]) -> List[Dict]:
+        """
+        Move cuts onto an angle that started offset seconds after the first one
+        Cuts are trimmed to the angle's first frame; those that end before the angle
+        started become empty, so they are skipped while the cut numbers stay the same
+        """
+        if not offset:
+            return cuts
+        if isinstance(cuts, FrameCutStore):
+            # Written to a new store the caller closes
+            return cuts.shifted(offset)
+        
+        return [{'start': max(0.0, cut['start'] - offset), 'end': max(0.0, cut['end'] - offset)}
+                for cut in cuts]
+    
+    def create_debug_info(self, cuts: Iterable[Dict], video_paths: List[str], fps: float, 
                          include_audio: bool, is_multi_cam: bool) -> str:
-        """Create debug information for troubleshooting"""
+        """
+        Create debug information for troubleshooting
+        cuts is read once, so it may be streamed from a file
+        """
+        
+        cut_lines = []
+        total_duration = 0.0
+        for i, cut in enumerate(cuts, 1):
+            duration = cut['end'] - cut['start']
+            total_duration += duration
+            cut_lines.append(f"Cut {i}: {cut['start']}s - {cut['end']}s ({duration:.1f}s)\n")
         
         debug_content = "=== FCPXML DEBUG INFO ===\n"
         debug_content += f"Mode: {'Multi-camera' if is_multi_cam else 'Single camera'}\n"
         debug_content += f"Number of Videos: {len(video_paths)}\n"
         debug_content += f"Include Audio: {include_audio}\n"
-        debug_content += f"Number of Cuts: {len(cuts)}\n"
+        debug_content += f"Number of Cuts: {len(cut_lines)}\n"
         debug_content += f"Frame Rate: {fps}\n"
-        debug_content += f"Total Duration: {sum(cut['end'] - cut['start'] for cut in cuts):.1f} seconds\n"
+        debug_content += f"Total Duration: {total_duration:.1f} seconds\n"
         
         debug_content += "\n=== VIDEO SOURCES ===\n"
         for i, video_path in enumerate(video_paths, 1):
             debug_content += f"{i}. {os.path.basename(video_path)}\n"
         
         debug_content += "\n=== CUT LIST ===\n"
-        for i, cut in enumerate(cuts, 1):
-            duration = cut['end'] - cut['start']
-            debug_content += f"Cut {i}: {cut['start']}s - {cut['end']}s ({duration:.1f}s)\n"
+        debug_content += ''.join(cut_lines)
         
         return debug_content
\ No newline at end of file
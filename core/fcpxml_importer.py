@@ -0,0 +1,213 @@
+"""
+FCPXML import
+Streams existing FCPXML timelines back into cut lists
+"""
+
+import xml.etree.ElementTree as ET
+from fractions import Fraction
+from typing import List, Dict, Tuple, Iterator, Optional, Union, IO
+from urllib.parse import urlparse, unquote
+
+
+class FCPXMLImporter:
+    """Reads the spine of an FCPXML timeline as a cut list"""
+
+    # Elements on a storyline that yield cuts, and those that hold a storyline of their own
+    STORYLINE = ('asset-clip', 'clip', 'sync-clip', 'ref-clip', 'video', 'audio')
+    CONTAINERS = ('clip', 'sync-clip')
+    UNSUPPORTED = ('mc-clip', 'audition')
+    DISCARDED = ('asset-clip', 'asset', 'format', 'gap', 'clip', 'sync-clip', 'ref-clip',
+                 'video', 'audio', 'media', 'title')
+
+    def parse_time(self, value: Optional[str]) -> Fraction:
+        """Parse an FCPXML time value such as '1001/30000s', '5s' or '0s' exactly"""
+        return Fraction(*self.parse_rational(value))
+
+    def parse_rational(self, value: Optional[str]) -> Tuple[int, int]:
+        """Parse an FCPXML time value into an integer (numerator, denominator) pair"""
+        if not value:
+            return 0, 1
+
+        try:
+            if value[-1] != 's':
+                raise ValueError
+            numerator, _, denominator = value[:-1].partition('/')
+            denominator = int(denominator) if denominator else 1
+            if denominator <= 0:
+                raise ValueError
+            return int(numerator), denominator
+        except ValueError:
+            raise ValueError(f"Invalid FCPXML time: {value}")
+
+    def src_to_path(self, src: str) -> str:
+        """Convert an asset src URL to a local file path"""
+        parsed = urlparse(src)
+        if parsed.scheme != 'file':
+            return src
+
+        path = unquote(parsed.path)
+        # file://C:/... puts the drive letter in the network location
+        if parsed.netloc and parsed.netloc != 'localhost':
+            path = unquote(parsed.netloc) + path
+        return path
+
+    def iter_cuts(self, source: Union[str, IO],
+                  references: Optional[Dict[str, Dict]] = None) -> Iterator[Dict]:
+        """
+        Yield cuts for the clips on the project's primary storyline, in timeline order
+        Clips inside clip, sync-clip and ref-clip (compound clips, resolved through their
+        <media> resource) are expanded and trimmed to the range the container shows.
+        Connected clips and storylines (those with a lane) are not part of the cut list.
+        source is a path or an open file; references, if given, is filled with
+        the timeline's formats and assets as they are encountered
+        Elements are discarded once read, so memory does not grow with the timeline
+        """
+        if references is None:
+            references = {}
+        formats = {}
+        # Segments of compound clips, and of containers whose children are still being read
+        media_segments = {}
+        nested = {}
+        open_elements = []
+
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(elem)
+                continue
+
+            open_elements.pop()
+            parent = open_elements[-1] if open_elements else None
+
+            if elem.tag == 'format':
+                frame_duration = self.parse_time(elem.get('frameDuration'))
+                formats[elem.get('id')] = {
+                    'fps': float(1 / frame_duration) if frame_duration else None,
+                    'width': elem.get('width'),
+                    'height': elem.get('height'),
+                }
+            elif elem.tag == 'asset':
+                src = elem.get('src')
+                if src is None:
+                    # FCPXML 1.9+ keeps the location in a media-rep child
+                    media_rep = elem.find('media-rep')
+                    src = media_rep.get('src') if media_rep is not None else None
+                references[elem.get('id')] = {
+                    'name': elem.get('name'),
+                    'src': src,
+                    'path': self.src_to_path(src) if src else None,
+                    'start': self.parse_time(elem.get('start')),
+                    'duration': self.parse_time(elem.get('duration')),
+                    'fps': formats.get(elem.get('format'), {}).get('fps'),
+                }
+            elif elem.tag == 'spine':
+                # The primary spine of a compound or container clip; the project's own
+                # spine has already yielded its clips
+                if elem.get('lane') is None and parent is not None and parent.tag in ('sequence',) + self.CONTAINERS:
+                    shift = self.parse_time(elem.get('offset'))
+                    nested.setdefault(parent, []).extend(
+                        (offset + shift, start, duration, media, name)
+                        for offset, start, duration, media, name in nested.pop(elem, []))
+                else:
+                    nested.pop(elem, None)
+            elif self._in_storyline(elem, parent):
+                if elem.tag in self.UNSUPPORTED:
+                    raise ValueError(f"Cannot import <{elem.tag}> clips; flatten them before importing")
+                top_level = self._in_project_spine(open_elements)
+                if elem.tag == 'asset-clip' and top_level:
+                    cut = self._asset_clip_cut(elem, references)
+                    if cut:
+                        yield cut
+                elif elem.tag in self.STORYLINE:
+                    segments = self._segments(elem, references, media_segments, nested.pop(elem, []))
+                    if top_level:
+                        for offset, start, duration, media, name in segments:
+                            yield {'start': float(start), 'end': float(start + duration),
+                                   'media': media, 'name': name}
+                    else:
+                        nested.setdefault(parent, []).extend(segments)
+                else:
+                    nested.pop(elem, None)
+            elif elem.tag == 'sequence' and parent is not None and parent.tag == 'media':
+                nested[parent] = nested.pop(elem, [])
+            elif elem.tag == 'media':
+                media_segments[elem.get('id')] = nested.pop(elem, [])
+
+            if elem.tag in self.DISCARDED:
+                nested.pop(elem, None)
+                elem.clear()
+                if parent is not None and len(parent) and parent[-1] is elem:
+                    del parent[-1]
+
+    def _in_storyline(self, elem: ET.Element, parent: Optional[ET.Element]) -> bool:
+        """True for elements on a primary storyline rather than connected to it"""
+        return (parent is not None and parent.tag in ('spine',) + self.CONTAINERS
+                and parent.get('lane') is None and elem.get('lane') is None)
+
+    def _in_project_spine(self, open_elements: List[ET.Element]) -> bool:
+        """True when the innermost open element is the project's own spine"""
+        return ([elem.tag for elem in open_elements[-3:]] == ['project', 'sequence', 'spine']
+                and open_elements[-1].get('lane') is None)
+
+    def _asset_clip_cut(self, elem: ET.Element, references: Dict[str, Dict]) -> Optional[Dict]:
+        """Cut for an asset-clip on the project spine, or None if it has no duration"""
+        asset = references.get(elem.get('ref'), {})
+        asset_start = asset.get('start', Fraction(0))
+        clip_start, clip_den = self.parse_rational(elem.get('start'))
+        duration, duration_den = self.parse_rational(elem.get('duration'))
+        if duration <= 0:
+            return None
+
+        # Exact integer arithmetic, rounded to float only once per value
+        den = clip_den * duration_den * asset_start.denominator
+        start = (clip_start * duration_den * asset_start.denominator
+                 - asset_start.numerator * clip_den * duration_den)
+        end = start + duration * clip_den * asset_start.denominator
+        return {
+            'start': start / den,
+            'end': end / den,
+            'media': asset.get('path'),
+            'name': elem.get('name'),
+        }
+
+    def _segments(self, elem: ET.Element, references: Dict[str, Dict],
+                  media_segments: Dict[str, List[Tuple]], children: List[Tuple]) -> List[Tuple]:
+        """
+        (offset, source start, duration, media path, name) for each piece of media an
+        element shows, with offsets in its parent's time
+        Containers trim their contents to start..start + duration of their own time, and
+        lend their name to unnamed contents such as <video>
+        """
+        offset = self.parse_time(elem.get('offset'))
+        start = self.parse_time(elem.get('start'))
+        duration = self.parse_time(elem.get('duration'))
+        if duration <= 0:
+            return []
+
+        if elem.tag in ('asset-clip', 'video', 'audio'):
+            asset = references.get(elem.get('ref'), {})
+            source_start = start - asset.get('start', Fraction(0))
+            return [(offset, source_start, duration, asset.get('path'), elem.get('name'))]
+
+        if elem.tag == 'ref-clip':
+            children = media_segments.get(elem.get('ref'))
+            if children is None:
+                raise ValueError(f"ref-clip refers to unknown media: {elem.get('ref')}")
+
+        segments = []
+        end = start + duration
+        for child_offset, child_start, child_duration, media, name in children:
+            visible_start = max(child_offset, start)
+            visible_end = min(child_offset + child_duration, end)
+            if visible_end > visible_start:
+                segments.append((offset + visible_start - start, child_start + visible_start - child_offset,
+                                 visible_end - visible_start, media, name or elem.get('name')))
+        return segments
+
+    def load(self, file_path: str) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """
+        Read a whole timeline
+        Returns (cuts, references) where references maps asset IDs to media info
+        """
+        references = {}
+        cuts = list(self.iter_cuts(file_path, references))
+        return cuts, references
@@ -0,0 +1,359 @@
+"""
+Local HTTP service
+Serves FCPXML on demand with asyncio from the standard library only
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from utils.progress import CancellationToken
+from .clip_ids import ClipIdGenerator
+from .fcpxml_generator import FCPXMLBuilder
+from .cut_normalizer import CutNormalizer
+from .video_analyzer import VideoAnalyzer
+
+
+class HTTPError(Exception):
+    """Error that maps directly to an HTTP response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FCPXMLService:
+    """
+    Minimal HTTP/1.1 server:
+        GET  /health  -> JSON with load information
+        POST /fcpxml  -> FCPXML for {"cuts": [...], "video_path": "...", "fps": 25 or "auto",
+                         "include_audio": true, "project_name": "...", "id_strategy": "...",
+                         "normalize": false}
+    Documents are streamed with chunked transfer encoding while the builder produces
+    them. Rendering runs on a bounded thread pool, and when every slot plus the
+    waiting room is taken new requests get 503 instead of queueing without limit.
+    A render that fails after the 200 head was sent drops the connection, so the
+    client sees a truncated body instead of an error inside the document.
+    """
+
+    REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, workers: Optional[int] = None,
+                 max_pending: int = 16, max_body_size: int = 256 * 1024 * 1024,
+                 video_analyzer: Optional[VideoAnalyzer] = None):
+        self.host = host
+        self.port = port
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.max_body_size = max_body_size
+        self.video_analyzer = video_analyzer or VideoAnalyzer()
+        self.builder = FCPXMLBuilder()
+        self.normalizer = CutNormalizer()
+        # Parsing, probing and normalizing; streaming renders have their own pool so
+        # they cannot hold up the requests that are still being validated
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.render_executor = ThreadPoolExecutor(max_workers=self.workers)
+        # Chunks buffered per response before the renderer waits for the client
+        self.stream_buffer = 8
+        # Clients that stop reading for this long are dropped so they cannot hold a worker
+        self.write_timeout = 60.0
+        self.server = None
+        self._render_slots = None
+        self._admitted = 0
+        self._probes = {}
+
+    async def start(self):
+        """Start listening; returns once the socket is bound"""
+        self._render_slots = asyncio.Semaphore(self.workers)
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start the server and run until cancelled"""
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        """Stop accepting connections and release the worker pools"""
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+        self.render_executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        request_id = uuid.uuid4().hex[:12]
+        try:
+            method, path, body = await self._read_request(reader)
+
+            if path == '/health':
+                if method != 'GET':
+                    raise HTTPError(405, "Use GET")
+                await self._send_json(writer, 200, self._health(), request_id)
+            elif path == '/fcpxml':
+                if method != 'POST':
+                    raise HTTPError(405, "Use POST")
+                await self._handle_fcpxml(writer, body, request_id)
+            else:
+                raise HTTPError(404, f"Unknown path: {path}")
+
+        except HTTPError as e:
+            await self._send_error(writer, e.status, e.message, request_id)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass  # Client went away or stopped reading
+        except Exception as e:
+            await self._send_error(writer, 500, str(e), request_id)
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """Read the request line, headers and body"""
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, path = parts[0].upper(), parts[1].split('?', 1)[0]
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body_size:
+            raise HTTPError(413, f"Request body larger than {self.max_body_size} bytes")
+
+        body = await reader.readexactly(length) if length else b''
+        return method, path, body
+
+    async def _handle_fcpxml(self, writer: asyncio.StreamWriter, body: bytes, request_id: str):
+        """Validate a render request, then stream the document"""
+        if self._admitted >= self.workers + self.max_pending:
+            raise HTTPError(503, "Server busy, retry later")
+
+        self._admitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+            timings = {}
+            started = time.perf_counter()
+            # Large bodies take a while to decode, so keep that off the event loop
+            request = await loop.run_in_executor(self.executor, self._parse_render_request, body)
+            timings['parse'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            metadata = await self._probe(request['video_path'])
+            timings['probe'] = time.perf_counter() - started
+
+            fps = request['fps']
+            if fps == 'auto':
+                fps = float(metadata.get('fps') or 30)
+            cuts = request['cuts']
+            if request['normalize']:
+                cuts = await loop.run_in_executor(self.executor, self.normalizer.normalize, cuts, fps)
+
+            if not 0 < fps < math.inf:
+                raise HTTPError(400, f"Invalid frame rate: {fps}")
+
+            started = time.perf_counter()
+            async with self._render_slots:
+                timings['queue'] = time.perf_counter() - started
+                cancel = CancellationToken()
+                chunks = self.builder.iter_single_fcpxml(
+                    cuts, request['video_path'], fps, request['include_audio'],
+                    request['project_name'], id_strategy=request['id_strategy'],
+                    source_duration=metadata.get('duration'), cancel=cancel
+                )
+
+                def write_head():
+                    headers = {
+                        'Content-Type': 'application/xml; charset=utf-8',
+                        'Transfer-Encoding': 'chunked',
+                        'Server-Timing': ', '.join(f"{name};dur={seconds * 1000:.2f}"
+                                                   for name, seconds in timings.items()),
+                        'X-Cut-Count': str(len(cuts)),
+                    }
+                    self._write_head(writer, 200, headers, request_id)
+
+                await self._stream_chunks(writer, chunks, write_head, cancel)
+        finally:
+            self._admitted -= 1
+
+    def _parse_render_request(self, body: bytes) -> Dict[str, Any]:
+        """Decode and validate the JSON body of a render request"""
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+
+        if not isinstance(request, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        cuts = request.get('cuts')
+        if not isinstance(cuts, list) or not all(
+                isinstance(cut, dict) and 'start' in cut and 'end' in cut for cut in cuts):
+            raise HTTPError(400, "'cuts' must be a list of objects with 'start' and 'end'")
+        for number, cut in enumerate(cuts, 1):
+            start, end = cut['start'], cut['end']
+            if not (self._is_finite_number(start) and self._is_finite_number(end)):
+                raise HTTPError(400, f"Cut {number}: 'start' and 'end' must be finite numbers")
+            if end <= start:
+                raise HTTPError(400, f"Cut {number}: 'end' must be after 'start'")
+        if not isinstance(request.get('video_path'), str) or not request['video_path']:
+            raise HTTPError(400, "'video_path' is required")
+        if not os.path.isfile(request['video_path']):
+            raise HTTPError(404, f"Video not found: {request['video_path']}")
+
+        fps = request.get('fps', 'auto')
+        if fps != 'auto' and not (self._is_finite_number(fps) and fps > 0):
+            raise HTTPError(400, "'fps' must be a positive number or \"auto\"")
+
+        id_strategy = request.get('id_strategy')
+        if id_strategy is not None and id_strategy not in ClipIdGenerator.STRATEGIES:
+            raise HTTPError(400, f"'id_strategy' must be one of {', '.join(ClipIdGenerator.STRATEGIES)}")
+
+        video_name = os.path.splitext(os.path.basename(request['video_path']))[0]
+        return {
+            'cuts': cuts,
+            'video_path': request['video_path'],
+            'fps': fps,
+            'include_audio': bool(request.get('include_audio', True)),
+            'project_name': str(request.get('project_name') or f"{video_name}_Timeline"),
+            'id_strategy': id_strategy,
+            'normalize': bool(request.get('normalize', False)),
+        }
+
+    @staticmethod
+    def _is_finite_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+    async def _probe(self, video_path: str) -> Dict[str, Any]:
+        """Probe a source once, sharing in-flight probes between concurrent requests"""
+        probe = self._probes.get(video_path)
+        if probe is None:
+            loop = asyncio.get_running_loop()
+            probe = loop.run_in_executor(self.executor, self.video_analyzer.probe, video_path)
+            self._probes[video_path] = probe
+            probe.add_done_callback(lambda _: self._probes.pop(video_path, None))
+        return await asyncio.shield(probe)
+
+    async def _stream_chunks(self, writer: asyncio.StreamWriter, chunks, write_head,
+                             cancel: CancellationToken):
+        """
+        Pull chunks from the builder on a render thread and write them as they come
+        write_head is called once the first chunk exists, so a render that fails before
+        producing anything still gets a proper error response. After that, a failure
+        aborts the connection. The queue is bounded, so a slow client pauses rendering
+        instead of buffering it all
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.stream_buffer)
+        done = object()
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    if cancel.cancelled:
+                        return
+                    if chunk:
+                        put(chunk)
+            except Exception as e:
+                if not cancel.cancelled:
+                    put(e)
+                return
+            put(done)
+
+        producer = loop.run_in_executor(self.render_executor, produce)
+        head_sent = False
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    if head_sent:
+                        writer.transport.abort()
+                        raise ConnectionAbortedError(f"Render failed after the response started: {item}")
+                    raise item
+                if not head_sent:
+                    write_head()
+                    head_sent = True
+                if item is done:
+                    break
+                data = item.encode('utf-8')
+                writer.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                await asyncio.wait_for(writer.drain(), self.write_timeout)
+            writer.write(b"0\r\n\r\n")
+            await asyncio.wait_for(writer.drain(), self.write_timeout)
+        finally:
+            cancel.cancel()
+            # The producer puts at most one more item once it sees the token, so emptying
+            # the queue once is enough to let it finish
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
+
+    def _health(self) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'admitted': self._admitted,
+            'capacity': self.workers + self.max_pending,
+        }
+
+    def _write_head(self, writer: asyncio.StreamWriter, status: int,
+                    headers: Dict[str, str], request_id: str):
+        lines = [f"HTTP/1.1 {status} {self.REASONS.get(status, '')}"]
+        headers = dict(headers, **{'X-Request-Id': request_id, 'Connection': 'close'})
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int,
+                         payload: Dict[str, Any], request_id: str, extra_headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(data))}
+        headers.update(extra_headers or {})
+        self._write_head(writer, status, headers, request_id)
+        writer.write(data)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: int,
+                          message: str, request_id: str):
+        extra_headers = {'Retry-After': '1'} if status == 503 else None
+        try:
+            await self._send_json(writer, status, {'error': message}, request_id, extra_headers)
+        except Exception:
+            pass  # Headers may already be sent, or the client is gone
+
+
+def run_service(host: str = '127.0.0.1', port: int = 8765, workers: Optional[int] = None):
+    """Run the service in the foreground until interrupted"""
+    service = FCPXMLService(host, port, workers)
+
+    async def main():
+        await service.start()
+        print(f"Serving FCPXML on http://{service.host}:{service.port}")
+        async with service.server:
+            await service.server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,434 @@
+"""
+Streaming cut list ingest
+Registry of format plugins that read cuts from files one record at a time
+"""
+
+import csv
+import json
+import os
+import re
+from typing import List, Dict, Iterable, Iterator, Optional, TextIO
+
+from utils.progress import ProgressCallback, CancellationToken
+from .timecode_parser import TimecodeParser
+from .fcpxml_importer import FCPXMLImporter
+from .cut_snapshot import CutSnapshotCache
+from .cut_store import FrameCutStore
+
+
+class CutSource:
+    """
+    Re-iterable stream of cuts read from a file by an ingest plugin
+    Every iteration reopens the file, so memory use does not grow with its size
+    """
+
+    def __init__(self, plugin: 'IngestPlugin', file_path: str, fps: float = 30.0):
+        self.plugin = plugin
+        self.file_path = file_path
+        self.fps = fps
+
+    def __iter__(self) -> Iterator[Dict]:
+        with open(self.file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from self.plugin.iter_cuts(f, self.fps)
+
+
+class IngestPlugin:
+    """Base class for cut list formats"""
+
+    # Short identifier, also used as the GUI input type value
+    name = ""
+    # Human readable description
+    label = ""
+    # File extensions, used when sniffing the content is inconclusive
+    extensions = ()
+    # Fallback plugins are only chosen when nothing else matches
+    fallback = False
+    # Bump when parsing changes, so cached snapshots of old results are not used
+    version = 1
+    # Whether cuts can be used as they are read; False when finalize needs the whole list
+    streamable = True
+    # Shared converter, memoizes repeated timecodes across plugins
+    timecode_parser = TimecodeParser()
+
+    def sniff(self, head: str) -> bool:
+        """Return True if the first characters of a file look like this format"""
+        return False
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        """Yield {"start", "end"} dicts in seconds from an open text stream"""
+        raise NotImplementedError
+
+    def finalize(self, cuts: List[Dict]) -> List[Dict]:
+        """Post-process a fully loaded cut list (not applied when streaming)"""
+        return cuts
+
+    def finalize_store(self, store: FrameCutStore) -> FrameCutStore:
+        """Out-of-core counterpart of finalize, for cut lists spilled to a FrameCutStore"""
+        return store
+
+    def load(self, file_path: str, fps: float) -> List[Dict]:
+        """Read a whole file into a cut list"""
+        return self.finalize(list(CutSource(self, file_path, fps)))
+
+    def clock_to_seconds(self, value: str, fps: float) -> float:
+        """Convert a timecode (see TimecodeParser) or plain seconds to seconds"""
+        if ':' in value or ';' in value:
+            return self.timecode_parser.timecode_to_seconds(value, fps)
+        return float(value.strip().replace(',', '.'))
+
+
+class FcpxmlIngest(IngestPlugin):
+    """Existing FCPXML timeline, one cut per spine clip"""
+
+    name = "fcpxml"
+    label = "FCPXML timeline"
+    extensions = ('.fcpxml',)
+
+    def __init__(self):
+        self.importer = FCPXMLImporter()
+
+    def sniff(self, head: str) -> bool:
+        return '<fcpxml' in head
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        return self.importer.iter_cuts(stream)
+
+
+class JsonIngest(IngestPlugin):
+    """JSON list of {"start": ..., "end": ...} objects, decoded one object at a time"""
+
+    name = "json"
+    label = "JSON file"
+    extensions = ('.json',)
+    read_size = 64 * 1024
+
+    def sniff(self, head: str) -> bool:
+        return head.lstrip().startswith('[')
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        decoder = json.JSONDecoder()
+        buffer = ''
+        pos = 0
+        started = False
+        eof = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+
+            if pos < len(buffer):
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError("JSON must be a list of cuts")
+                    started = True
+                    pos += 1
+                    continue
+
+                if buffer[pos] == ']':
+                    return
+
+                try:
+                    cut, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    if not isinstance(cut, dict) or 'start' not in cut or 'end' not in cut:
+                        raise ValueError("JSON cuts must have 'start' and 'end' fields")
+                    pos = end
+                    yield cut
+                    continue
+            elif eof:
+                raise ValueError("Unexpected end of JSON cut list")
+
+            # Need more input: keep only the unconsumed tail of the buffer
+            chunk = stream.read(self.read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+    def finalize(self, cuts: List[Dict]) -> List[Dict]:
+        if not cuts:
+            raise ValueError("JSON must be a list of cuts")
+        return cuts
+
+    def finalize_store(self, store: FrameCutStore) -> FrameCutStore:
+        if not len(store):
+            store.close()
+            raise ValueError("JSON must be a list of cuts")
+        return store
+
+
+class TextIngest(IngestPlugin):
+    """Free text containing MM:SS-MM:SS or HH:MM:SS-HH:MM:SS ranges"""
+
+    name = "text"
+    label = "Text file with timecodes"
+    extensions = ('.txt', '.md', '.log')
+    fallback = True
+    # finalize sorts and removes duplicates
+    streamable = False
+
+    def sniff(self, head: str) -> bool:
+        return True
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        for line in stream:
+            yield from self.timecode_parser.parse_timecodes_from_text(line, fps)
+
+    def load(self, file_path: str, fps: float) -> List[Dict]:
+        # Very large logs are scanned in parallel straight from a memory map
+        if os.path.getsize(file_path) > self.timecode_parser.parallel_chunk_size:
+            return self.timecode_parser.load_from_text_parallel(file_path, fps)
+        return super().load(file_path, fps)
+
+    def finalize(self, cuts: List[Dict]) -> List[Dict]:
+        # Same semantics as TimecodeParser.load_from_text: dedupe and sort
+        cuts = list({(cut['start'], cut['end']): cut for cut in cuts}.values())
+        cuts.sort(key=lambda x: x['start'])
+        return cuts
+
+    def finalize_store(self, store: FrameCutStore) -> FrameCutStore:
+        # Sorted and deduplicated on disk
+        with store:
+            return store.sorted(unique=True)
+
+
+class EdlIngest(IngestPlugin):
+    """CMX3600 edit decision list, using each event's source in/out"""
+
+    name = "edl"
+    label = "CMX3600 EDL"
+    extensions = ('.edl',)
+    event_pattern = re.compile(r'^\s*(\d{3,6})\s+\S+\s+\S+\s+\S+')
+    timecode_pattern = re.compile(r'\d{2}:\d{2}:\d{2}[:;]\d{2}')
+
+    def sniff(self, head: str) -> bool:
+        for line in head.splitlines()[:20]:
+            if line.startswith('TITLE:') or line.startswith('FCM:'):
+                return True
+            if self.event_pattern.match(line) and len(self.timecode_pattern.findall(line)) >= 4:
+                return True
+        return False
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        last_event = None
+        for line in stream:
+            match = self.event_pattern.match(line)
+            if not match:
+                continue
+
+            timecodes = self.timecode_pattern.findall(line)
+            if len(timecodes) < 4:
+                continue
+
+            # Audio and video lines of one event share the same source range
+            event = (match.group(1), timecodes[-4], timecodes[-3])
+            if event == last_event:
+                continue
+            last_event = event
+
+            start = self.clock_to_seconds(timecodes[-4], fps)
+            end = self.clock_to_seconds(timecodes[-3], fps)
+            if start < end:
+                yield {"start": start, "end": end}
+
+
+class SrtIngest(IngestPlugin):
+    """SubRip subtitles, one cut per cue"""
+
+    name = "srt"
+    label = "SRT subtitles"
+    extensions = ('.srt',)
+
+    def sniff(self, head: str) -> bool:
+        return bool(re.search(r'\d{2}:\d{2}:\d{2},\d{3}\s*-->', head))
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        for line in stream:
+            if '-->' not in line:
+                continue
+
+            start_text, end_text = line.split('-->', 1)
+            end_fields = end_text.split()
+            if not end_fields:
+                continue
+
+            try:
+                start = self.clock_to_seconds(start_text, fps)
+                # WebVTT cue settings may follow the end time
+                end = self.clock_to_seconds(end_fields[0], fps)
+            except ValueError:
+                continue
+
+            if start < end:
+                yield {"start": start, "end": end}
+
+
+class VttIngest(SrtIngest):
+    """WebVTT subtitles, one cut per cue"""
+
+    name = "vtt"
+    label = "WebVTT subtitles"
+    extensions = ('.vtt',)
+
+    def sniff(self, head: str) -> bool:
+        return head.lstrip().startswith('WEBVTT')
+
+
+class CsvIngest(IngestPlugin):
+    """CSV export with start/end columns in seconds or timecodes"""
+
+    name = "csv"
+    label = "CSV export"
+    extensions = ('.csv',)
+    start_columns = ('start', 'in', 'start_time', 'start time', 'source in', 'source_in')
+    end_columns = ('end', 'out', 'end_time', 'end time', 'source out', 'source_out')
+
+    def sniff(self, head: str) -> bool:
+        first_line = head.lstrip().split('\n', 1)[0].lower()
+        if ',' not in first_line:
+            return False
+
+        cells = [cell.strip().strip('"') for cell in first_line.split(',')]
+        return (any(cell in self.start_columns for cell in cells)
+                and any(cell in self.end_columns for cell in cells))
+
+    def iter_cuts(self, stream: TextIO, fps: float) -> Iterator[Dict]:
+        start_column, end_column = 0, 1
+        header_checked = False
+
+        for row in csv.reader(stream):
+            if not row:
+                continue
+
+            if not header_checked:
+                header_checked = True
+                cells = [cell.strip().lower() for cell in row]
+                start_matches = [i for i, cell in enumerate(cells) if cell in self.start_columns]
+                end_matches = [i for i, cell in enumerate(cells) if cell in self.end_columns]
+                if start_matches and end_matches:
+                    start_column, end_column = start_matches[0], end_matches[0]
+                    continue
+
+            try:
+                start = self.clock_to_seconds(row[start_column], fps)
+                end = self.clock_to_seconds(row[end_column], fps)
+            except (IndexError, ValueError):
+                continue
+
+            if start < end:
+                yield {"start": start, "end": end}
+
+
+class IngestRegistry:
+    """Keeps the available ingest plugins and picks one for a file"""
+
+    sniff_size = 4096
+
+    def __init__(self, snapshots: Optional[CutSnapshotCache] = None):
+        self._plugins = []
+        # Parsed cut lists are kept as binary snapshots; None disables them
+        self.snapshots = snapshots
+
+    def register(self, plugin: IngestPlugin):
+        """Add a plugin; plugins registered earlier are sniffed first"""
+        if self.get(plugin.name):
+            raise ValueError(f"Ingest plugin already registered: {plugin.name}")
+        self._plugins.append(plugin)
+
+    def get(self, name: str) -> Optional[IngestPlugin]:
+        """Return the plugin with the given name, or None"""
+        for plugin in self._plugins:
+            if plugin.name == name:
+                return plugin
+        return None
+
+    def plugins(self) -> List[IngestPlugin]:
+        """Return registered plugins in sniffing order"""
+        return list(self._plugins)
+
+    def get_extensions(self) -> List[str]:
+        """Return every extension claimed by a plugin"""
+        return [ext for plugin in self._plugins for ext in plugin.extensions]
+
+    def detect(self, file_path: str) -> IngestPlugin:
+        """Pick a plugin from the first bytes of the file, then its extension"""
+        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+            head = f.read(self.sniff_size)
+
+        for plugin in self._plugins:
+            if not plugin.fallback and plugin.sniff(head):
+                return plugin
+
+        ext = os.path.splitext(file_path)[1].lower()
+        for plugin in self._plugins:
+            if ext in plugin.extensions:
+                return plugin
+
+        for plugin in self._plugins:
+            if plugin.fallback:
+                return plugin
+
+        raise ValueError(f"Unrecognized cut list format: {os.path.basename(file_path)}")
+
+    def open(self, file_path: str, name: Optional[str] = None, fps: float = 30.0) -> CutSource:
+        """
+        Return a streaming CutSource for the file
+        name forces a plugin; otherwise the format is detected
+        """
+        if name:
+            plugin = self.get(name)
+            if plugin is None:
+                raise ValueError(f"Unknown input type: {name}")
+        else:
+            plugin = self.detect(file_path)
+
+        return CutSource(plugin, file_path, fps)
+
+    def load(self, file_path: str, name: Optional[str] = None, fps: float = 30.0) -> List[Dict]:
+        """
+        Read the whole cut list into memory
+        An unchanged file loaded with the same format and fps comes from its snapshot
+        """
+        plugin = self.open(file_path, name, fps).plugin
+        if self.snapshots is None:
+            return plugin.load(file_path, fps)
+
+        cuts = self.snapshots.get(file_path, plugin.name, plugin.version, fps)
+        if cuts is None:
+            cuts = plugin.load(file_path, fps)
+            self.snapshots.put(file_path, plugin.name, plugin.version, fps, cuts)
+        return cuts
+
+    def stream(self, file_path: str, name: Optional[str] = None, fps: float = 30.0) -> Iterable[Dict]:
+        """
+        Cuts for the builder without holding the list in memory where the format allows it
+        Returns a CutSource, or the loaded list for formats that post-process the whole list
+        """
+        source = self.open(file_path, name, fps)
+        if source.plugin.streamable:
+            return source
+        return self.load(file_path, source.plugin.name, fps)
+
+    def spill(self, file_path: str, name: Optional[str] = None, fps: float = 30.0,
+              memory_budget: int = 64 * 1024 * 1024, progress: Optional[ProgressCallback] = None,
+              cancel: Optional[CancellationToken] = None) -> FrameCutStore:
+        """
+        Stream the cut list into an out-of-core FrameCutStore for lists larger than memory
+        The caller closes the store to delete its scratch file
+        """
+        source = self.open(file_path, name, fps)
+        store = FrameCutStore.from_cuts(source, fps, memory_budget, progress=progress, cancel=cancel)
+        return source.plugin.finalize_store(store)
+
+
+def create_default_registry() -> IngestRegistry:
+    """Registry with the built-in formats"""
+    registry = IngestRegistry(CutSnapshotCache())
+    for plugin in (FcpxmlIngest(), JsonIngest(), VttIngest(), SrtIngest(), EdlIngest(), CsvIngest(), TextIngest()):
+        registry.register(plugin)
+    return registry
+
+
+ingest_registry = create_default_registry()
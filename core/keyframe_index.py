@@ -0,0 +1,83 @@
+"""
+Keyframe index
+Relates cut points to the GOP structure of long-GOP sources
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional
+
+from .video_analyzer import VideoAnalyzer
+
+
+class KeyframeIndex:
+    """Sorted keyframe times of one source, searched with bisection"""
+
+    def __init__(self, keyframes: List[float]):
+        self.keyframes = keyframes
+
+    @classmethod
+    def for_video(cls, video_path: str,
+                  video_analyzer: Optional[VideoAnalyzer] = None) -> Optional['KeyframeIndex']:
+        """Load (or build and cache) the index of a video; None if ffprobe is unavailable"""
+        keyframes = (video_analyzer or VideoAnalyzer()).get_keyframes(video_path)
+        return cls(keyframes) if keyframes else None
+
+    def previous(self, time: float) -> Optional[float]:
+        """Last keyframe at or before a time"""
+        position = bisect_right(self.keyframes, time)
+        return self.keyframes[position - 1] if position else None
+
+    def nearest(self, time: float) -> float:
+        """Keyframe closest to a time"""
+        position = bisect_left(self.keyframes, time)
+        candidates = self.keyframes[max(0, position - 1):position + 1]
+        return min(candidates, key=lambda keyframe: abs(keyframe - time))
+
+    def snap_cuts(self, cuts: List[Dict], max_shift: float = 0.5) -> List[Dict]:
+        """
+        Move each cut's start to the nearest keyframe when one is within max_shift seconds
+        Ends are left alone; they do not affect how much has to be decoded
+        """
+        snapped = []
+        for cut in cuts:
+            keyframe = self.nearest(cut['start'])
+            if abs(keyframe - cut['start']) <= max_shift and keyframe < cut['end']:
+                cut = dict(cut, start=keyframe)
+            snapped.append(cut)
+        return snapped
+
+    def report(self, cuts: List[Dict], fps: float) -> List[Dict[str, Any]]:
+        """
+        List cuts that start mid-GOP, with how many frames must be decoded before
+        their first frame can be shown
+        """
+        half_frame = 0.5 / fps
+        entries = []
+        for number, cut in enumerate(cuts, 1):
+            keyframe = self.previous(cut['start'] + half_frame)
+            if keyframe is None or cut['start'] - keyframe <= half_frame:
+                continue
+            entries.append({
+                'cut': number,
+                'start': cut['start'],
+                'keyframe': keyframe,
+                'frames_to_decode': int(round((cut['start'] - keyframe) * fps)),
+                'nearest': self.nearest(cut['start']),
+            })
+        return entries
+
+    def format_report(self, entries: List[Dict[str, Any]], video_path: str, max_listed: int = 5) -> str:
+        """Readable summary of cuts that start mid-GOP"""
+        if not entries:
+            return f"{os.path.basename(video_path)}: every cut starts on a keyframe"
+
+        worst = max(entry['frames_to_decode'] for entry in entries)
+        lines = [f"{os.path.basename(video_path)}: {len(entries)} cut(s) start mid-GOP "
+                 f"(up to {worst} frames decoded before the first frame)"]
+        for entry in entries[:max_listed]:
+            lines.append(f"  Cut {entry['cut']}: {entry['start']}s, keyframe at {entry['keyframe']}s, "
+                         f"nearest {entry['nearest']}s")
+        if len(entries) > max_listed:
+            lines.append(f"  ... and {len(entries) - max_listed} more")
+        return "\n".join(lines)
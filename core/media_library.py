@@ -0,0 +1,307 @@
+"""
+Media library index
+Remembers where source media lives so cut lists can be matched to it without
+walking directories on every run
+"""
+
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from utils.file_helpers import FileManager
+from .video_analyzer import VideoAnalyzer
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE INDEX IF NOT EXISTS directories_root ON directories (root);
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fps TEXT,
+    duration REAL,
+    probed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS media_directory ON media (directory);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    media_id INTEGER NOT NULL,
+    PRIMARY KEY (token, media_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tokens_media ON tokens (media_id);
+"""
+
+# Words in cut list names that say nothing about which source they belong to
+CUT_LIST_WORDS = {'cuts', 'cut', 'list', 'timeline', 'edit', 'edl', 'selects', 'final', 'v1', 'v2', 'v3'}
+
+
+def _list_directory(path: str) -> Optional[Tuple[List[str], List[Tuple[str, int, int]]]]:
+    """Worker: subdirectories and (name, size, mtime_ns) of the files in a directory"""
+    subdirectories = []
+    files = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    return subdirectories, files
+
+
+class MediaLibrary:
+    """
+    SQLite index of the media files under a set of root folders
+    Each file's name and folder names are split into tokens, so searches are
+    index lookups rather than directory walks. Rescans only list directories
+    whose mtime changed, since adding, removing or renaming a file updates the
+    mtime of its directory; unchanged folders cost one stat each
+    """
+
+    def __init__(self, db_path: Optional[str] = None, workers: int = 16,
+                 video_analyzer: Optional[VideoAnalyzer] = None):
+        self.db_path = db_path or os.path.join(FileManager().get_cache_directory('library'), 'media.sqlite3')
+        self.workers = workers
+        self.video_analyzer = video_analyzer or VideoAnalyzer()
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_root(self, path: str):
+        """Add a folder to index on the next scan"""
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (os.path.abspath(path),))
+
+    def remove_root(self, path: str):
+        """Stop indexing a folder and forget its media"""
+        path = os.path.abspath(path)
+        with self.connection:
+            self.connection.execute("DELETE FROM roots WHERE path = ?", (path,))
+            self._forget_directories([row[0] for row in self.connection.execute(
+                "SELECT path FROM directories WHERE root = ?", (path,))])
+
+    def roots(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT path FROM roots ORDER BY path")]
+
+    def scan(self, probe: bool = False, progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the disk
+        With probe, new and changed videos also get their fps and duration stored
+        Returns counts of directories listed/skipped and media added/removed
+        """
+        stats = {'listed': 0, 'unchanged': 0, 'added': 0, 'removed': 0, 'probed': 0}
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for root in self.roots():
+                self._scan_root(root, executor, stats)
+                if progress:
+                    progress(f"Scanned {root}")
+
+            if probe:
+                stats['probed'] = self._probe_pending(executor)
+
+        if progress:
+            progress(f"Listed {stats['listed']} folder(s), {stats['unchanged']} unchanged; "
+                     f"{stats['added']} added, {stats['removed']} removed in {time.time() - started:.1f}s")
+        return stats
+
+    def search(self, query: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Media whose name or folders contain every word of the query"""
+        tokens = sorted(set(self.tokenize(query)))
+        if not tokens:
+            return []
+
+        # Start from the rarest word so the intersection stays small
+        tokens.sort(key=self._token_frequency)
+        intersection = " INTERSECT ".join(["SELECT media_id FROM tokens WHERE token = ?"] * len(tokens))
+        rows = self.connection.execute(
+            f"SELECT path, size, fps, duration FROM media WHERE id IN ({intersection}) "
+            f"ORDER BY path LIMIT ?", (*tokens, limit))
+        return [self._media_row(row) for row in rows]
+
+    def find_source(self, cut_list_path: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Most likely source videos for a cut list, best first
+        Media sharing the most words with the cut list's file name rank highest
+        """
+        stem = os.path.splitext(os.path.basename(cut_list_path))[0]
+        tokens = [token for token in dict.fromkeys(self.tokenize(stem)) if token not in CUT_LIST_WORDS]
+        if not tokens:
+            return []
+
+        # Candidates come from the two rarest words; common words like "interview"
+        # only count towards the score, so the query does not touch every file
+        rare = sorted(tokens, key=self._token_frequency)[:2]
+        placeholders = ", ".join("?" * len(tokens))
+        rows = self.connection.execute(
+            f"WITH candidates AS (SELECT DISTINCT media_id FROM tokens WHERE token IN ({', '.join('?' * len(rare))}) "
+            f"LIMIT 5000) "
+            f"SELECT m.path, m.name, m.size, m.fps, m.duration, COUNT(*) AS hits "
+            f"FROM candidates c JOIN tokens t ON t.media_id = c.media_id AND t.token IN ({placeholders}) "
+            f"JOIN media m ON m.id = c.media_id GROUP BY m.id",
+            (*rare, *tokens))
+
+        stem = stem.lower()
+        results = []
+        for path, name, size, fps, duration, hits in rows:
+            entry = self._media_row((path, size, fps, duration))
+            entry['score'] = hits / len(tokens)
+            # A cut list named after its source (A001C003_cuts for A001C003.mov) wins outright
+            media_stem = os.path.splitext(name)[0].lower()
+            if media_stem in stem or stem in media_stem:
+                entry['score'] += 1.0
+            results.append(entry)
+
+        results.sort(key=lambda entry: (-entry['score'], entry['path']))
+        return results[:limit]
+
+    def find_angles(self, shoot: str) -> Dict[str, List[Dict[str, Any]]]:
+        """All videos of a shoot, grouped by folder (usually one folder per camera)"""
+        angles = {}
+        for entry in self.search(shoot, limit=100000):
+            if self.video_analyzer.is_supported_format(entry['path']):
+                angles.setdefault(os.path.dirname(entry['path']), []).append(entry)
+        return angles
+
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercase words and numbers, with camelCase and letter/digit runs split apart"""
+        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+        return re.findall(r'[a-z]+|\d+', text.lower())
+
+    def _scan_root(self, root: str, executor: ThreadPoolExecutor, stats: Dict[str, int]):
+        """Walk one root level by level, listing the directories of a level in parallel"""
+        known = {path: mtime for path, mtime in self.connection.execute(
+            "SELECT path, mtime_ns FROM directories WHERE root = ?", (root,))}
+        seen = set()
+        level = [(root, None)]
+
+        while level:
+            # A stat per directory decides whether it has to be listed again
+            mtimes = list(executor.map(self._directory_mtime, [path for path, _ in level]))
+            changed = [(path, parent) for (path, parent), mtime in zip(level, mtimes)
+                       if mtime is not None and known.get(path) != mtime]
+            listings = dict(zip([path for path, _ in changed],
+                                executor.map(_list_directory, [path for path, _ in changed])))
+
+            next_level = []
+            with self.connection:
+                for (path, parent), mtime in zip(level, mtimes):
+                    if mtime is None:
+                        continue
+                    seen.add(path)
+                    if path in listings and listings[path] is not None:
+                        subdirectories, files = listings[path]
+                        self._store_directory(path, parent, root, mtime, files, stats)
+                        stats['listed'] += 1
+                    else:
+                        subdirectories = [row[0] for row in self.connection.execute(
+                            "SELECT path FROM directories WHERE parent = ?", (path,))]
+                        stats['unchanged'] += 1
+                    next_level.extend((subdirectory, path) for subdirectory in subdirectories)
+            level = next_level
+
+        with self.connection:
+            stats['removed'] += self._forget_directories([path for path in known if path not in seen])
+
+    def _token_frequency(self, token: str) -> int:
+        """How many files contain a word, counted up to a cap to keep it cheap"""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM tokens WHERE token = ? LIMIT 10000)", (token,)).fetchone()[0]
+
+    def _directory_mtime(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _store_directory(self, path: str, parent: Optional[str], root: str, mtime: int,
+                         files: List[Tuple[str, int, int]], stats: Dict[str, int]):
+        """Replace the stored contents of a directory with a fresh listing"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO directories (path, parent, root, mtime_ns) VALUES (?, ?, ?, ?)",
+            (path, parent, root, mtime))
+
+        stored = {name: (media_id, size, mtime_ns) for media_id, name, size, mtime_ns in self.connection.execute(
+            "SELECT id, name, size, mtime_ns FROM media WHERE directory = ?", (path,))}
+        folder_tokens = self.tokenize(os.path.relpath(path, os.path.dirname(root)))
+
+        for name, size, mtime_ns in files:
+            if not self.video_analyzer.is_supported_format(name):
+                continue
+            previous = stored.pop(name, None)
+            if previous is not None:
+                if previous[1:] == (size, mtime_ns):
+                    continue
+                self._delete_media([previous[0]])
+
+            cursor = self.connection.execute(
+                "INSERT INTO media (path, directory, name, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (os.path.join(path, name), path, name, size, mtime_ns))
+            tokens = set(self.tokenize(os.path.splitext(name)[0])) | set(folder_tokens)
+            self.connection.executemany("INSERT OR IGNORE INTO tokens (token, media_id) VALUES (?, ?)",
+                                        [(token, cursor.lastrowid) for token in tokens])
+            stats['added'] += 1
+
+        # Whatever was not in the listing has been deleted or renamed
+        if stored:
+            self._delete_media([media_id for media_id, _, _ in stored.values()])
+            stats['removed'] += len(stored)
+
+    def _forget_directories(self, paths: List[str]) -> int:
+        """Remove directories and their media from the index; returns media removed"""
+        removed = 0
+        for path in paths:
+            media_ids = [row[0] for row in self.connection.execute(
+                "SELECT id FROM media WHERE directory = ?", (path,))]
+            self._delete_media(media_ids)
+            removed += len(media_ids)
+            self.connection.execute("DELETE FROM directories WHERE path = ?", (path,))
+        return removed
+
+    def _delete_media(self, media_ids: List[int]):
+        self.connection.executemany("DELETE FROM tokens WHERE media_id = ?", [(i,) for i in media_ids])
+        self.connection.executemany("DELETE FROM media WHERE id = ?", [(i,) for i in media_ids])
+
+    def _probe_pending(self, executor: ThreadPoolExecutor) -> int:
+        """Store fps and duration for media that have not been probed yet"""
+        pending = self.connection.execute("SELECT id, path FROM media WHERE probed = 0").fetchall()
+        probed = 0
+        with self.connection:
+            for (media_id, _), metadata in zip(pending, executor.map(
+                    self.video_analyzer.probe, [path for _, path in pending])):
+                self.connection.execute(
+                    "UPDATE media SET fps = ?, duration = ?, probed = 1 WHERE id = ?",
+                    (metadata.get('fps'), metadata.get('duration'), media_id))
+                probed += 1
+        return probed
+
+    def _media_row(self, row: Tuple) -> Dict[str, Any]:
+        path, size, fps, duration = row
+        return {'path': path, 'size': size, 'fps': fps, 'duration': duration}
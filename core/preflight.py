@@ -0,0 +1,186 @@
+"""
+Pre-flight checks
+Validates cut bounds against the real duration of every source video
+"""
+
+import os
+from typing import List, Dict, Tuple, Iterable, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, a pure-Python comparison is used instead
+    np = None
+
+from .cut_store import FrameCutStore
+from .video_analyzer import VideoAnalyzer
+
+
+class PreflightChecker:
+    """Checks a cut list against source media before any output is written"""
+
+    def __init__(self, video_analyzer: Optional[VideoAnalyzer] = None):
+        self.video_analyzer = video_analyzer or VideoAnalyzer()
+        # Offenders listed per source for cut lists kept on disk; the rest are only counted
+        self.max_listed = 100
+
+    def check(self, cuts: List[Dict], video_paths: List[str], fps: float,
+              durations: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Any]:
+        """
+        Probe each source once and find cuts that end past it
+        durations can supply already known source durations to skip probing
+        Returns a dict with:
+            durations: {video_path: duration in seconds or None}
+            out_of_range: {video_path: [(cut_number, start, end), ...]}
+            out_of_range_counts: {video_path: number of cuts past the end}
+            unknown: video paths whose duration could not be determined
+        For cuts streamed from a file or kept in an out-of-core FrameCutStore only the
+        first max_listed offenders are listed
+        """
+        report = {'durations': {}, 'out_of_range': {}, 'out_of_range_counts': {}, 'unknown': []}
+
+        for video_path in dict.fromkeys(video_paths):
+            if durations is not None and video_path in durations:
+                report['durations'][video_path] = durations[video_path]
+            else:
+                report['durations'][video_path] = self.video_analyzer.probe(video_path).get('duration')
+
+        known = {path: duration for path, duration in report['durations'].items()
+                 if duration is not None}
+        report['unknown'] = [path for path, duration in report['durations'].items()
+                             if duration is None]
+
+        # Anything within half a frame of the end still lands on the last frame
+        tolerance = 0.5 / fps
+        if isinstance(cuts, FrameCutStore):
+            scanned = self._find_out_of_range_store(cuts, known, tolerance)
+        elif not isinstance(cuts, list):
+            scanned = self._find_out_of_range_stream(cuts, known, tolerance)
+        else:
+            scanned = None
+        if scanned is not None:
+            for video_path, (count, listed) in scanned.items():
+                if count:
+                    report['out_of_range'][video_path] = listed
+                    report['out_of_range_counts'][video_path] = count
+            return report
+
+        if np is not None:
+            offenders = self._find_out_of_range_numpy(cuts, known, tolerance)
+        else:
+            offenders = self._find_out_of_range_python(cuts, known, tolerance)
+
+        for video_path, indices in offenders.items():
+            if indices:
+                report['out_of_range'][video_path] = [
+                    (i + 1, cuts[i]['start'], cuts[i]['end']) for i in indices
+                ]
+                report['out_of_range_counts'][video_path] = len(indices)
+
+        return report
+
+    def check_angles(self, angles: Iterable[Tuple[List[Dict], str]], fps: float,
+                     durations: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Any]:
+        """
+        Check each source against its own cut list, such as the cuts shifted onto a synced angle
+        angles holds (cuts, video_path) pairs; returns one report in the form of check()
+        """
+        report = {'durations': {}, 'out_of_range': {}, 'out_of_range_counts': {}, 'unknown': []}
+        for cuts, video_path in angles:
+            angle = self.check(cuts, [video_path], fps, durations)
+            for key in ('durations', 'out_of_range', 'out_of_range_counts'):
+                report[key].update(angle[key])
+            report['unknown'] += angle['unknown']
+        return report
+
+    def _find_out_of_range_numpy(self, cuts: List[Dict], durations: Dict[str, float],
+                                 tolerance: float) -> Dict[str, List[int]]:
+        """Sort cut ends once, then a binary search per source finds every offender"""
+        ends = np.fromiter((cut['end'] for cut in cuts), dtype=np.float64, count=len(cuts))
+        order = np.argsort(ends, kind='stable')
+        sorted_ends = ends[order]
+
+        offenders = {}
+        for video_path, duration in durations.items():
+            first_bad = np.searchsorted(sorted_ends, duration + tolerance, side='right')
+            offenders[video_path] = np.sort(order[first_bad:]).tolist()
+        return offenders
+
+    def _find_out_of_range_python(self, cuts: List[Dict], durations: Dict[str, float],
+                                  tolerance: float) -> Dict[str, List[int]]:
+        """Fallback comparison used when NumPy is unavailable"""
+        max_end = max((cut['end'] for cut in cuts), default=0)
+
+        offenders = {}
+        for video_path, duration in durations.items():
+            limit = duration + tolerance
+            if max_end <= limit:
+                offenders[video_path] = []
+            else:
+                offenders[video_path] = [i for i, cut in enumerate(cuts) if cut['end'] > limit]
+        return offenders
+
+    def _find_out_of_range_stream(self, cuts: Iterable[Dict], durations: Dict[str, float],
+                                  tolerance: float) -> Dict[str, Tuple[int, List[Tuple[int, float, float]]]]:
+        """One pass over cuts streamed from a file, counting offenders like the store scan"""
+        if not durations:
+            return {}
+        found = {path: [0, []] for path in durations}
+        limits = {path: duration + tolerance for path, duration in durations.items()}
+        lowest = min(limits.values())
+        for number, cut in enumerate(cuts, 1):
+            end = cut['end']
+            if end <= lowest:
+                continue
+            for video_path, limit in limits.items():
+                if end > limit:
+                    entry = found[video_path]
+                    entry[0] += 1
+                    if len(entry[1]) < self.max_listed:
+                        entry[1].append((number, cut['start'], end))
+        return {path: (count, listed) for path, (count, listed) in found.items()}
+
+    def _find_out_of_range_store(self, cuts: FrameCutStore, durations: Dict[str, float],
+                                 tolerance: float) -> Dict[str, Tuple[int, List[Tuple[int, float, float]]]]:
+        """
+        One sequential pass over an out-of-core cut list
+        Returns {video_path: (offender count, first max_listed offenders)}, so a list that
+        is mostly out of range is counted rather than gathered in memory
+        """
+        fps = cuts.fps
+        limits = {path: (duration + tolerance) * fps for path, duration in durations.items()}
+        found = {path: [0, []] for path in durations}
+        index = 0
+        for block in cuts.iter_blocks():
+            ends = block[1::2]
+            last = max(ends)
+            for video_path, limit in limits.items():
+                if last <= limit:
+                    continue
+                entry = found[video_path]
+                listed = entry[1]
+                for i, end in enumerate(ends):
+                    if end > limit:
+                        entry[0] += 1
+                        if len(listed) < self.max_listed:
+                            listed.append((index + i + 1, block[2 * i] / fps, end / fps))
+            index += len(ends)
+        return {path: (count, listed) for path, (count, listed) in found.items()}
+
+    def format_report(self, report: Dict[str, Any], max_listed: int = 5) -> str:
+        """Create a readable summary of out-of-range cuts per angle"""
+        lines = []
+
+        for video_path, bad_cuts in report['out_of_range'].items():
+            duration = report['durations'][video_path]
+            count = report.get('out_of_range_counts', {}).get(video_path, len(bad_cuts))
+            lines.append(f"{os.path.basename(video_path)} ({duration:.1f}s): "
+                         f"{count} cut(s) past the end")
+            for cut_number, start, end in bad_cuts[:max_listed]:
+                lines.append(f"  Cut {cut_number}: {start}s - {end}s")
+            if count > max_listed:
+                lines.append(f"  ... and {count - max_listed} more")
+
+        for video_path in report['unknown']:
+            lines.append(f"{os.path.basename(video_path)}: duration unknown, not checked")
+
+        return "\n".join(lines)
@@ -0,0 +1,114 @@
+"""
+Probe metadata cache
+Persists per-file media metadata so each source is only probed once
+"""
+
+import json
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, Optional, Any
+
+from utils.file_helpers import FileManager
+
+
+class ProbeCache:
+    """
+    Stores probe results as small JSON files keyed by path, size and mtime
+    A file that changes on disk gets a new key, so stale entries are never read
+    Long series such as keyframe times are kept in packed files of doubles next to
+    the JSON entry, so reading a file's metadata does not load them
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.file_manager = FileManager()
+        self._cache_dir = cache_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> str:
+        """Directory holding the cache files, created on first use"""
+        if self._cache_dir is None:
+            self._cache_dir = self.file_manager.get_cache_directory('probes')
+        elif not os.path.isdir(self._cache_dir):
+            os.makedirs(self._cache_dir, exist_ok=True)
+        return self._cache_dir
+
+    def get_key(self, file_path: str) -> Optional[str]:
+        """Cache key for the current state of a file, or None if it does not exist"""
+        key = self.file_manager.get_cache_key(file_path)
+        return key.hex() if key else None
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Return the cached metadata for a file, or None"""
+        key = self.get_key(file_path)
+        if key is None:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                return dict(self._entries[key])
+
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._entries[key] = entry
+        return dict(entry)
+
+    def update(self, file_path: str, **fields) -> Dict[str, Any]:
+        """Merge fields into the file's cached metadata and persist it"""
+        key = self.get_key(file_path)
+        if key is None:
+            return dict(fields)
+
+        entry = self.get(file_path) or {'path': os.path.abspath(file_path)}
+        entry.update(fields)
+
+        with self._lock:
+            self._entries[key] = entry
+            try:
+                with self.file_manager.atomic_write(self._entry_path(key), 'w', encoding='utf-8') as f:
+                    json.dump(entry, f)
+            except OSError:
+                pass  # The cache is an optimization; keep the in-memory entry
+
+        return dict(entry)
+
+    def get_array(self, file_path: str, name: str) -> Optional[array]:
+        """Return a series stored with put_array for the current state of a file, or None"""
+        key = self.get_key(file_path)
+        if key is None:
+            return None
+
+        values = array('d')
+        try:
+            with open(self._array_path(key, name), 'rb') as f:
+                values.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        return values
+
+    def put_array(self, file_path: str, name: str, values: Iterable[float]):
+        """Persist a series of floats under name for the current state of a file"""
+        key = self.get_key(file_path)
+        if key is None:
+            return
+
+        try:
+            with self.file_manager.atomic_write(self._array_path(key, name)) as f:
+                array('d', values).tofile(f)
+        except OSError:
+            pass  # The cache is an optimization
+
+    def _array_path(self, key: str, name: str) -> str:
+        """File holding a named series for a key"""
+        return os.path.join(self.cache_dir, f"{key}.{name}.f64")
+
+    def _entry_path(self, key: str) -> str:
+        """File holding the entry for a key"""
+        return os.path.join(self.cache_dir, f"{key}.json")
@@ -0,0 +1,128 @@
+"""
+Scene change detection
+Splits a source into segments and scores them for scene changes in parallel
+"""
+
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from .video_analyzer import VideoAnalyzer
+
+
+def _detect_segment(task: Tuple[str, float, float, float, float, int]) -> List[Tuple[float, float]]:
+    """
+    Worker: run ffmpeg's scene filter over one segment
+    Decoding starts lead_in seconds before the segment so its first frame has a
+    predecessor to be compared with; only changes inside the segment are returned
+    as (time, score) pairs in source seconds
+    """
+    video_path, start, end, lead_in, threshold, threads = task
+    decode_start = max(0.0, start - lead_in)
+
+    cmd = ['ffmpeg', '-v', 'error', '-nostdin', '-threads', str(threads)]
+    if decode_start:
+        cmd += ['-ss', f"{decode_start:.6f}"]
+    cmd += [
+        '-t', f"{end - decode_start:.6f}", '-i', video_path, '-an', '-sn', '-dn',
+        # Scoring small frames is much faster and barely changes the scores
+        '-vf', f"scale=320:-2,select='gt(scene,{threshold})',metadata=print:file=-",
+        '-f', 'null', '-'
+    ]
+
+    changes = []
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        time = None
+        for line in process.stdout:
+            if 'pts_time:' in line:
+                time = decode_start + float(line.rsplit('pts_time:', 1)[1].split()[0])
+            elif line.startswith('lavfi.scene_score=') and time is not None:
+                if start <= time < end:
+                    changes.append((round(time, 6), float(line.split('=', 1)[1])))
+                time = None
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {os.path.basename(video_path)} "
+                           f"({start:.1f}s - {end:.1f}s)")
+    return changes
+
+
+class SceneDetector:
+    """
+    Finds scene changes with ffmpeg, one process per segment
+    The source is split into equal segments that are decoded in parallel, and
+    the per-segment boundaries are stitched back into one ordered list
+    """
+
+    def __init__(self, threshold: float = 0.3, min_scene: float = 1.0,
+                 segments: Optional[int] = None, workers: Optional[int] = None,
+                 video_analyzer: Optional[VideoAnalyzer] = None):
+        self.threshold = threshold
+        self.min_scene = min_scene
+        self.workers = workers or os.cpu_count() or 1
+        self.segments = segments
+        self.video_analyzer = video_analyzer or VideoAnalyzer()
+        # Segments shorter than this are not worth a process of their own
+        self.min_segment = 60.0
+        # Seconds decoded before each segment, so a change right at a seam is still scored
+        self.lead_in = 1.0
+
+    def detect_changes(self, video_path: str) -> List[float]:
+        """Return the times in seconds where a new scene starts"""
+        duration = self.video_analyzer.probe(video_path).get('duration')
+        if not duration:
+            raise ValueError(f"Could not determine the duration of {os.path.basename(video_path)}")
+
+        segments = self.plan_segments(duration)
+        # Leave cores for ffmpeg's own decoding threads when there are few segments
+        threads = max(1, (os.cpu_count() or 1) // min(self.workers, len(segments)))
+        tasks = [(video_path, start, end, self.lead_in, self.threshold, threads)
+                 for start, end in segments]
+
+        if len(tasks) == 1:
+            partials = [_detect_segment(tasks[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                partials = list(executor.map(_detect_segment, tasks))
+
+        return self.stitch(partials)
+
+    def detect_cuts(self, video_path: str) -> List[Dict]:
+        """Return one {"start", "end"} cut per scene"""
+        duration = self.video_analyzer.probe(video_path).get('duration')
+        changes = self.detect_changes(video_path)
+
+        bounds = [0.0] + changes + [duration]
+        return [{'start': round(start, 3), 'end': round(end, 3)}
+                for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    def plan_segments(self, duration: float) -> List[Tuple[float, float]]:
+        """Split the source into equal (start, end) segments"""
+        count = self.segments or self.workers
+        count = max(1, min(count, int(duration // self.min_segment) or 1))
+        size = duration / count
+        return [(i * size, duration if i == count - 1 else (i + 1) * size) for i in range(count)]
+
+    def stitch(self, partials: List[List[Tuple[float, float]]]) -> List[float]:
+        """
+        Join per-segment changes into one list
+        Segments never overlap in what they report, but a flash or fade can still
+        trigger on both sides of a seam; changes closer than min_scene are merged,
+        keeping the one with the higher score
+        """
+        changes = []
+        for time, score in sorted(change for partial in partials for change in partial):
+            if time < self.min_scene:
+                continue  # A "scene" this short at the very start is a fade-in, not a cut
+            if changes and time - changes[-1][0] < self.min_scene:
+                if score > changes[-1][1]:
+                    changes[-1] = (time, score)
+                continue
+            changes.append((time, score))
+
+        return [time for time, _ in changes]
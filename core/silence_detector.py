@@ -0,0 +1,144 @@
+"""
+Silence detection
+Builds cut lists that keep the audible parts of a recording
+"""
+
+from typing import List, Dict, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is required for audio analysis only
+    np = None
+
+from .audio_decoder import AudioDecoder
+
+
+class SilenceDetector:
+    """
+    Streams audio through windowed RMS and a hysteresis gate
+    Audio becomes silent below threshold_db and audible again above
+    threshold_db + hysteresis_db, so levels hovering at the threshold do not flicker.
+    Silences shorter than min_silence are ignored, and every kept range is widened
+    by padding on both sides. Memory use is one decoder block regardless of length.
+    """
+
+    def __init__(self, threshold_db: float = -40.0, hysteresis_db: float = 4.0,
+                 min_silence: float = 0.5, padding: float = 0.1, window: float = 0.02,
+                 decoder: Optional[AudioDecoder] = None):
+        self.threshold_db = threshold_db
+        self.hysteresis_db = hysteresis_db
+        self.min_silence = min_silence
+        self.padding = padding
+        self.window = window
+        self.decoder = decoder or AudioDecoder()
+
+    def detect_cuts(self, media_path: str) -> List[Dict]:
+        """Return {"start", "end"} cuts covering everything that is not silence"""
+        return list(self.iter_cuts(media_path))
+
+    def iter_cuts(self, media_path: str) -> Iterator[Dict]:
+        """Yield cuts as soon as the silence that ends each one has been found"""
+        cut_start = 0.0
+        pending = None
+
+        for silence_start, silence_end in self._iter_silences(media_path):
+            if pending is not None:
+                # The last silence only skips the end padding if it runs to the end of the audio
+                trailing = silence_start is None and pending[1] >= silence_end
+                cut, cut_start = self._cut_before(cut_start, pending, trailing)
+                if cut:
+                    yield cut
+            pending = (silence_start, silence_end)
+
+        audio_end = pending[1]
+        if audio_end > cut_start:
+            yield {'start': round(cut_start, 3), 'end': round(audio_end, 3)}
+
+    def iter_silences(self, media_path: str) -> Iterator[Tuple[float, float]]:
+        """Yield (start, end) in seconds of every silence at least min_silence long"""
+        for silence_start, silence_end in self._iter_silences(media_path):
+            if silence_start is not None:
+                yield silence_start, silence_end
+
+    def _cut_before(self, cut_start: float, silence: Tuple[float, float],
+                    trailing: bool) -> Tuple[Optional[Dict], float]:
+        """The padded cut that ends at a silence, and where the next cut starts"""
+        silence_start, silence_end = silence
+        cut_end = silence_start + self.padding if silence_start > 0 else cut_start
+        next_start = silence_end if trailing else silence_end - self.padding
+        if next_start <= cut_end:
+            return None, cut_start  # Padding covers the whole silence; the cut continues
+
+        cut = {'start': round(cut_start, 3), 'end': round(cut_end, 3)} if cut_end > cut_start else None
+        return cut, next_start
+
+    def _iter_silences(self, media_path: str) -> Iterator[Tuple[Optional[float], float]]:
+        """
+        Yield (start, end) for qualifying silences, then a final (None, end_of_audio)
+        marker so callers learn the length of the audio
+        """
+        if np is None:
+            raise RuntimeError("Silence detection requires NumPy (pip install numpy)")
+
+        rate = self.decoder.sample_rate
+        window_size = max(1, int(round(self.window * rate)))
+        window_seconds = window_size / rate
+        # Gate thresholds on mean square power, which skips a sqrt and log per window
+        enter_power = 10.0 ** (self.threshold_db / 10.0)
+        leave_power = 10.0 ** ((self.threshold_db + self.hysteresis_db) / 10.0)
+
+        carry = np.zeros(0, dtype=np.float32)
+        windows_seen = 0
+        silent = False
+        silence_started = 0
+        samples_seen = 0
+
+        for block in self.decoder.iter_blocks(media_path):
+            samples_seen += len(block)
+            samples = np.concatenate((carry, block)) if len(carry) else block
+            count = len(samples) // window_size
+            carry = samples[count * window_size:]
+            if not count:
+                continue
+
+            frames = samples[:count * window_size].reshape(count, window_size).astype(np.float64)
+            power = np.einsum('ij,ij->i', frames, frames) / window_size
+
+            # Windows that decide the gate state; the rest inherit the last decision
+            decided = np.full(count, -1, dtype=np.int8)
+            decided[power < enter_power] = 1
+            decided[power > leave_power] = 0
+            positions = np.where(decided >= 0, np.arange(count), -1)
+            np.maximum.accumulate(positions, out=positions)
+            state = np.where(positions >= 0, decided[np.maximum(positions, 0)], int(silent)).astype(np.int8)
+
+            # Transitions relative to the state carried over from the previous block
+            edges = np.flatnonzero(np.diff(state, prepend=np.int8(silent)))
+            for edge in edges:
+                index = windows_seen + int(edge)
+                if state[edge]:
+                    silence_started = index
+                else:
+                    silence = self._qualify(silence_started, index, window_seconds)
+                    if silence:
+                        yield silence
+
+            silent = bool(state[-1])
+            windows_seen += count
+
+        audio_end = samples_seen / rate
+        if silent:
+            silence = self._qualify(silence_started, windows_seen, window_seconds)
+            if silence:
+                # Trailing silence runs to the end of the audio, not just the last full window
+                yield silence[0], audio_end
+        yield None, audio_end
+
+    def _qualify(self, first_window: int, end_window: int,
+                 window_seconds: float) -> Optional[Tuple[float, float]]:
+        """Convert a silent window range to seconds if it is long enough"""
+        start = first_window * window_seconds
+        end = end_window * window_seconds
+        if end - start < self.min_silence:
+            return None
+        return round(start, 3), round(end, 3)
@@ -0,0 +1,96 @@
+"""
+Thumbnail extraction
+Grabs single frames with ffmpeg on a small pool of worker threads
+"""
+
+import queue
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Optional, Iterable, Tuple
+
+from utils.thumbnail_cache import ThumbnailCache
+
+
+class Thumbnailer:
+    """
+    Extracts thumbnails on demand, newest requests first
+    Results are delivered through the results queue as (video_path, time, png_path or None),
+    so a GUI can pick them up from its own thread. Requests that are no longer
+    wanted (rows scrolled out of view) can be dropped before any work is done.
+    """
+
+    def __init__(self, cache: Optional[ThumbnailCache] = None, workers: int = 2, width: int = 96):
+        self.cache = cache or ThumbnailCache()
+        self.workers = workers
+        self.width = width
+        self.results = queue.Queue()
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def request(self, video_path: str, time: float):
+        """Ask for a thumbnail; cached ones are delivered right away"""
+        key = self.cache.get_key(video_path, time, self.width)
+        if key is None:
+            self.results.put((video_path, time, None))
+            return
+
+        path = self.cache.get(key)
+        if path:
+            self.results.put((video_path, time, path))
+            return
+
+        with self._condition:
+            self._pending[(video_path, time)] = key
+            self._pending.move_to_end((video_path, time))
+            self._start_workers()
+            self._condition.notify()
+
+    def retain(self, wanted: Iterable[Tuple[str, float]]):
+        """Drop queued requests that are not in wanted"""
+        wanted = set(wanted)
+        with self._condition:
+            for request in [request for request in self._pending if request not in wanted]:
+                del self._pending[request]
+
+    def close(self):
+        """Stop the workers once their current extraction finishes"""
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify_all()
+
+    def extract(self, video_path: str, time: float) -> Optional[bytes]:
+        """Run ffmpeg for one frame and return it as PNG bytes"""
+        cmd = [
+            'ffmpeg', '-v', 'error', '-nostdin', '-ss', f"{max(0.0, time):.3f}", '-i', video_path,
+            '-frames:v', '1', '-vf', f"scale={self.width}:-2", '-f', 'image2pipe', '-vcodec', 'png', '-'
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout if result.returncode == 0 and result.stdout else None
+
+    def _start_workers(self):
+        """Start worker threads the first time they are needed"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                # Newest first: the rows the user is looking at right now
+                request, key = self._pending.popitem(last=True)
+
+            data = self.extract(*request)
+            path = self.cache.put(key, data) if data else None
+            self.results.put((request[0], request[1], path))
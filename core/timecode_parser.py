@@ -4,28 +4,154 @@ Handles extraction of timecodes from text files and JSON files
 """
 
 import json
+import mmap
+import os
 import re
-from typing import List, Dict
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Union
+
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken, run_blocking
+
+# A single timecode: MM:SS or HH:MM:SS, optionally with .mmm fractional seconds,
+# or SMPTE HH:MM:SS:FF (HH:MM:SS;FF for drop-frame)
+# A decimal comma is only taken when it does not start the next timecode, so
+# ranges listed as "00:10-00:20,00:30-00:40" keep their separator
+_FRACTION = r'(?:\.|,(?!\d{1,2}:))\d{1,3}'
+TIMECODE = rf'\d{{1,2}}:\d{{2}}(?::\d{{2}}(?:[:;]\d{{2}}|{_FRACTION})?|{_FRACTION})?'
+
+# Range pattern for scanning raw UTF-8 bytes; en and em dashes are multi-byte
+_RANGE_BYTES_PATTERN = re.compile(
+    rb'(' + TIMECODE.encode('ascii') + rb')\s*(?:-|\xe2\x80\x93|\xe2\x80\x94)\s*('
+    + TIMECODE.encode('ascii') + rb')'
+)
+
+
+@lru_cache(maxsize=65536)
+def _scan_timecode(timecode: str, fps: float) -> Union[int, float]:
+    """
+    Convert a timecode to seconds with a single pass over its characters
+    Memoized because logged transcripts repeat the same timecodes constantly
+    """
+    fields = []
+    value = 0
+    digits = 0
+    fraction = 0
+    fraction_digits = 0
+    in_fraction = False
+    drop_frame = False
+    
+    for char in timecode.strip():
+        if '0' <= char <= '9':
+            if in_fraction:
+                fraction = fraction * 10 + ord(char) - 48
+                fraction_digits += 1
+            else:
+                value = value * 10 + ord(char) - 48
+                digits += 1
+        elif char == ':' or char == ';':
+            if digits == 0 or in_fraction:
+                raise ValueError(f"Invalid timecode format: {timecode}")
+            drop_frame = drop_frame or char == ';'
+            fields.append(value)
+            value = 0
+            digits = 0
+        elif char == '.' or char == ',':
+            if digits == 0 or in_fraction:
+                raise ValueError(f"Invalid timecode format: {timecode}")
+            in_fraction = True
+        else:
+            raise ValueError(f"Invalid timecode format: {timecode}")
+    
+    if digits == 0 or (in_fraction and fraction_digits == 0):
+        raise ValueError(f"Invalid timecode format: {timecode}")
+    fields.append(value)
+    
+    if len(fields) == 4:  # HH:MM:SS:FF
+        if in_fraction:
+            raise ValueError(f"Invalid timecode format: {timecode}")
+        hours, minutes, seconds, frames = fields
+        if drop_frame:
+            return _drop_frame_to_seconds(hours, minutes, seconds, frames, fps)
+        return hours * 3600 + minutes * 60 + seconds + frames / fps
+    
+    if drop_frame:
+        raise ValueError(f"Invalid timecode format: {timecode}")
+    
+    if len(fields) == 3:  # HH:MM:SS
+        hours, minutes, seconds = fields
+        whole_seconds = hours * 3600 + minutes * 60 + seconds
+    elif len(fields) == 2:  # MM:SS
+        minutes, seconds = fields
+        whole_seconds = minutes * 60 + seconds
+    else:
+        raise ValueError(f"Invalid timecode format: {timecode}")
+    
+    if in_fraction:
+        return whole_seconds + fraction / 10 ** fraction_digits
+    return whole_seconds
+
+
+def _drop_frame_to_seconds(hours: int, minutes: int, seconds: int, frames: int, fps: float) -> float:
+    """Convert 29.97/59.94 drop-frame timecode fields to real seconds"""
+    nominal_fps = 60 if fps > 45 else 30
+    dropped_per_minute = nominal_fps // 15
+    total_minutes = hours * 60 + minutes
+    
+    # Frame labels are skipped at the start of every minute except each tenth
+    frame_number = ((hours * 3600 + minutes * 60 + seconds) * nominal_fps + frames
+                    - dropped_per_minute * (total_minutes - total_minutes // 10))
+    return frame_number * 1001 / (nominal_fps * 1000)
+
+
+def _scan_text_chunk(task: Tuple[str, int, int, float]) -> List[Tuple[float, float]]:
+    """
+    Find timecode ranges in bytes [start, end) of a file
+    Runs in worker processes; the file is memory-mapped, so the chunk is never copied
+    """
+    file_path, start, end, fps = task
+    ranges = []
+    
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for match in _RANGE_BYTES_PATTERN.finditer(mapped, start, end):
+                try:
+                    start_seconds = _scan_timecode(match.group(1).decode('ascii'), fps)
+                    end_seconds = _scan_timecode(match.group(2).decode('ascii'), fps)
+                except ValueError:
+                    continue
+                if start_seconds < end_seconds:  # Valid range
+                    ranges.append((start_seconds, end_seconds))
+    
+    return ranges
 
 
 class TimecodeParser:
     """Parses timecodes from various input formats"""
     
-    def __init__(self):
-        # Patterns for HH:MM:SS or MM:SS format ranges
+    def __init__(self, fps: float = 30.0):
+        # Frame rate used to convert the frames field of SMPTE timecodes
+        self.fps = fps
+        # Patterns for timecode ranges, with or without spaces around the dash
         self.timecode_patterns = [
-            r'(\d{1,2}:\d{2}:\d{2})[-–—](\d{1,2}:\d{2}:\d{2})',  # HH:MM:SS-HH:MM:SS
-            r'(\d{1,2}:\d{2})[-–—](\d{1,2}:\d{2})',              # MM:SS-MM:SS
-            r'(\d{1,2}:\d{2}:\d{2})\s*[-–—]\s*(\d{1,2}:\d{2}:\d{2})',  # with spaces
-            r'(\d{1,2}:\d{2})\s*[-–—]\s*(\d{1,2}:\d{2})',        # MM:SS with spaces
+            rf'({TIMECODE})\s*[-–—]\s*({TIMECODE})',
         ]
+        # Files larger than this are scanned in chunks by load_from_text_parallel
+        self.parallel_chunk_size = 64 * 1024 * 1024
     
-    def load_from_json(self, file_path: str) -> List[Dict]:
-        """Load cuts from JSON file"""
+    def load_from_json(self, file_path: str, progress: Optional[ProgressCallback] = None,
+                       cancel: Optional[CancellationToken] = None) -> List[Dict]:
+        """
+        Load cuts from JSON file
+        The file is decoded in one call, so cancel is only checked before and after it
+        """
+        reporter = ProgressReporter(progress, cancel, os.path.getsize(file_path))
+        reporter.update(0)
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
         cuts = json.loads(content)
+        reporter.finish(reporter.total)
         
         # Validate JSON structure
         if not isinstance(cuts, list) or len(cuts) == 0:
@@ -36,46 +162,147 @@ class TimecodeParser:
         
         return cuts
     
-    def load_from_text(self, file_path: str) -> List[Dict]:
+    async def load_from_json_async(self, file_path: str, progress: Optional[ProgressCallback] = None,
+                                   cancel: Optional[CancellationToken] = None,
+                                   executor: Optional[Executor] = None) -> List[Dict]:
+        """load_from_json() run in an executor"""
+        return await run_blocking(self.load_from_json, file_path, progress=progress, cancel=cancel, executor=executor)
+    
+    def load_from_text(self, file_path: str, progress: Optional[ProgressCallback] = None,
+                       cancel: Optional[CancellationToken] = None) -> List[Dict]:
         """Load cuts from text file by parsing timecodes"""
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        return self.parse_timecodes_from_text(content)
+        return self.parse_timecodes_from_text(content, progress=progress, cancel=cancel)
+    
+    async def load_from_text_async(self, file_path: str, progress: Optional[ProgressCallback] = None,
+                                   cancel: Optional[CancellationToken] = None,
+                                   executor: Optional[Executor] = None) -> List[Dict]:
+        """load_from_text() run in an executor"""
+        return await run_blocking(self.load_from_text, file_path, progress=progress, cancel=cancel, executor=executor)
+    
+    def load_from_text_parallel(self, file_path: str, fps: Optional[float] = None,
+                                chunk_size: Optional[int] = None,
+                                workers: Optional[int] = None,
+                                progress: Optional[ProgressCallback] = None,
+                                cancel: Optional[CancellationToken] = None) -> List[Dict]:
+        """
+        Load cuts from a large text file using all cores
+        The file is memory-mapped and split at newlines into chunks that worker
+        processes scan as raw bytes; results are merged, deduplicated and sorted
+        like load_from_text. A range broken across a chunk boundary by a line
+        break is not found.
+        progress receives (bytes scanned, file size) as chunks finish; cancel stops
+        chunks that have not started yet
+        """
+        fps = fps or self.fps
+        chunk_size = chunk_size or self.parallel_chunk_size
+        tasks = [(file_path, start, end, fps)
+                 for start, end in self._split_at_newlines(file_path, chunk_size)]
+        reporter = ProgressReporter(progress, cancel, tasks[-1][2] if tasks else 0)
+        
+        chunk_results = []
+        scanned = 0
+        if len(tasks) <= 1 or workers == 1:
+            for task in tasks:
+                reporter.update(scanned)
+                chunk_results.append(_scan_text_chunk(task))
+                scanned += task[2] - task[1]
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            try:
+                futures = {executor.submit(_scan_text_chunk, task): task for task in tasks}
+                for future in as_completed(futures):
+                    chunk_results.append(future.result())
+                    task = futures[future]
+                    scanned += task[2] - task[1]
+                    reporter.update(scanned)
+            finally:
+                executor.shutdown(cancel_futures=True)
+        
+        reporter.finish(scanned)
+        return self._merge_ranges(chunk_results)
     
-    def parse_timecodes_from_text(self, text: str) -> List[Dict]:
-        """Extract timecodes from text content"""
+    async def load_from_text_parallel_async(self, file_path: str, fps: Optional[float] = None,
+                                            chunk_size: Optional[int] = None,
+                                            workers: Optional[int] = None,
+                                            progress: Optional[ProgressCallback] = None,
+                                            cancel: Optional[CancellationToken] = None,
+                                            executor: Optional[Executor] = None) -> List[Dict]:
+        """
+        load_from_text_parallel() driven from an executor
+        The scanning itself still runs in worker processes
+        """
+        return await run_blocking(self.load_from_text_parallel, file_path, fps, chunk_size, workers,
+                                  progress=progress, cancel=cancel, executor=executor)
+    
+    def _split_at_newlines(self, file_path: str, chunk_size: int) -> List[Tuple[int, int]]:
+        """Byte ranges of roughly chunk_size that end just after a newline"""
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return []
+        
+        chunks = []
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                start = 0
+                while start < size:
+                    end = min(start + chunk_size, size)
+                    if end < size:
+                        newline = mapped.find(b'\n', end)
+                        end = size if newline == -1 else newline + 1
+                    chunks.append((start, end))
+                    start = end
+        
+        return chunks
+    
+    def _merge_ranges(self, chunk_results) -> List[Dict]:
+        """Combine per-chunk (start, end) ranges into a sorted, deduplicated cut list"""
+        unique_ranges = set()
+        for ranges in chunk_results:
+            unique_ranges.update(ranges)
+        
+        return [{"start": start, "end": end} for start, end in sorted(unique_ranges)]
+    
+    def parse_timecodes_from_text(self, text: str, fps: Optional[float] = None,
+                                  progress: Optional[ProgressCallback] = None,
+                                  cancel: Optional[CancellationToken] = None) -> List[Dict]:
+        """
+        Extract timecodes from text content
+        progress receives (characters scanned, text length) for each pattern
+        """
         cuts = []
+        reporter = ProgressReporter(progress, cancel, len(text))
         
         for pattern in self.timecode_patterns:
-            matches = re.findall(pattern, text)
-            for start_tc, end_tc in matches:
+            for number, match in enumerate(re.finditer(pattern, text)):
+                if number % 10000 == 0:
+                    reporter.update(match.start())
+                start_tc, end_tc = match.groups()
                 try:
-                    start_seconds = self.timecode_to_seconds(start_tc)
-                    end_seconds = self.timecode_to_seconds(end_tc)
+                    start_seconds = self.timecode_to_seconds(start_tc, fps)
+                    end_seconds = self.timecode_to_seconds(end_tc, fps)
                     if start_seconds < end_seconds:  # Valid range
                         cuts.append({"start": start_seconds, "end": end_seconds})
                 except ValueError:
                     continue
         
+        reporter.finish(len(text))
+        
         # Remove duplicates and sort
         cuts = list({(cut['start'], cut['end']): cut for cut in cuts}.values())
         cuts.sort(key=lambda x: x['start'])
         
         return cuts
     
-    def timecode_to_seconds(self, timecode: str) -> float:
-        """Convert timecode string to seconds"""
-        parts = timecode.split(':')
-        
-        if len(parts) == 3:  # HH:MM:SS
-            hours, minutes, seconds = map(int, parts)
-            return hours * 3600 + minutes * 60 + seconds
-        elif len(parts) == 2:  # MM:SS
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        else:
-            raise ValueError(f"Invalid timecode format: {timecode}")
+    def timecode_to_seconds(self, timecode: str, fps: Optional[float] = None) -> float:
+        """
+        Convert timecode string to seconds
+        Accepts MM:SS, HH:MM:SS, fractional seconds (.mmm or ,mmm) and
+        SMPTE HH:MM:SS:FF, with HH:MM:SS;FF read as drop-frame
+        """
+        return _scan_timecode(timecode, fps or self.fps)
     
     def seconds_to_display_timecode(self, seconds: float) -> str:
         """Convert seconds to MM:SS format for display"""
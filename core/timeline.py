@@ -0,0 +1,96 @@
+"""
+Timeline model
+Frame-quantized clip layout shared by every export format
+"""
+
+import os
+from typing import Iterable, Iterator, Tuple, Optional
+
+
+class ChunkLimits:
+    """How large a chunk of a timeline may grow: a number of clips and/or a length in seconds"""
+
+    def __init__(self, max_clips: Optional[int] = None, max_seconds: Optional[float] = None):
+        self.max_clips = max_clips
+        self.max_seconds = max_seconds
+
+    def fits(self, clips: int, frames: int, duration: int, fps: float) -> bool:
+        """
+        Whether a clip of duration frames can join a chunk already holding clips/frames
+        A chunk always takes at least one clip, even one longer than max_seconds
+        """
+        if not clips:
+            return True
+        if self.max_clips and clips >= self.max_clips:
+            return False
+        if self.max_seconds and frames + duration > self.max_seconds * fps:
+            return False
+        return True
+
+
+class Timeline:
+    """
+    One source laid out as a sequence of clips, with all times in frames of timebase
+    clips yields (cut_index, offset, start, duration) and may only be traversed once,
+    so exporters that need several formats write them together in a single pass
+    """
+
+    def __init__(self, video_path: str, fps: float, clips: Iterable[Tuple[int, int, int, int]],
+                 duration: int, project_name: str = "Timeline", include_audio: bool = True,
+                 source_duration: Optional[float] = None, start: int = 0,
+                 clip_count: Optional[int] = None):
+        self.video_path = video_path
+        self.fps = fps
+        self.timebase = int(fps)
+        self.clips = clips
+        # First frame and total length; clips are contiguous, so the last one ends at start + duration
+        self.start = start
+        self.duration = duration
+        # Number of clips, when known up front; used as the total for progress reports
+        self.clip_count = clip_count
+        self.project_name = project_name
+        self.include_audio = include_audio
+        # Real length of the source in seconds, if it was probed
+        self.source_duration = source_duration
+
+    @property
+    def source_filename(self) -> str:
+        return os.path.basename(self.video_path)
+
+    @property
+    def source_name(self) -> str:
+        return os.path.splitext(self.source_filename)[0]
+
+    def asset_duration(self, fallback: float = 9999) -> int:
+        """Length of the source in frames; without a probed duration, one long enough for any clip"""
+        return int(round((self.source_duration or fallback) * self.fps))
+
+    def clip_name(self, cut_index: int) -> str:
+        return f"{self.source_filename}_cut_{cut_index + 1}"
+
+    def split(self, limits: ChunkLimits) -> Iterator['Timeline']:
+        """
+        Cut the timeline into consecutive parts within limits
+        Clips keep their offsets, and each part starts where the previous one ended,
+        so the parts line up end to end. Only one part's clips are held at a time.
+        """
+        clips = []
+        frames = 0
+        number = 0
+        for clip in self.clips:
+            duration = clip[3]
+            if not limits.fits(len(clips), frames, duration, self.fps):
+                number += 1
+                yield self._part(number, clips, frames)
+                clips = []
+                frames = 0
+            clips.append(clip)
+            frames += duration
+
+        if clips:
+            yield self._part(number + 1, clips, frames)
+
+    def _part(self, number: int, clips: list, frames: int) -> 'Timeline':
+        return Timeline(self.video_path, self.fps, clips, frames,
+                        f"{self.project_name} (part {number})", self.include_audio,
+                        self.source_duration, clips[0][1], len(clips))
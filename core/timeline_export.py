@@ -0,0 +1,519 @@
+"""
+Timeline export
+Writes a Timeline as FCPXML, CMX3600 EDL, OpenTimelineIO and Premiere XML in one pass
+"""
+
+import json
+import os
+import tempfile
+from typing import List, Dict, Tuple, Iterator, Iterable, TextIO, Optional
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from .clip_ids import ClipIdGenerator
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken, OperationCancelled
+from .timeline import Timeline, ChunkLimits
+
+
+class TimelineEmitter:
+    """
+    Base class for export formats
+    An emitter renders one document: header() once, clip() for every clip in
+    timeline order, then footer(). Emitters keep per-document state, so use a new
+    instance for each export.
+    """
+
+    # Short name used in job settings, e.g. "edl"
+    name = ""
+    # Output file extension, including the dot
+    extension = ""
+
+    def header(self, timeline: Timeline) -> str:
+        return ""
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        raise NotImplementedError
+
+    def footer(self, timeline: Timeline) -> Iterable[str]:
+        """Closing text, as chunks so spooled sections do not have to be held in memory"""
+        return ()
+
+
+class _Spool:
+    """Text that has to follow the current section, kept on disk once it gets large"""
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode='w+', encoding='utf-8')
+
+    def write(self, text: str):
+        self._file.write(text)
+
+    def drain(self, chunk_size: int = 1024 * 1024) -> Iterator[str]:
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self._file.close()
+
+
+class FcpxmlEmitter(TimelineEmitter):
+    """Final Cut Pro X XML with one asset and a spine of asset-clips"""
+
+    name = "fcpxml"
+    extension = ".fcpxml"
+    # Indentation of asset-clips inside the project's spine
+    clip_indent = 24
+
+    def __init__(self, version: str = "1.10", id_strategy: str = "uuid4"):
+        self.version = version
+        self.id_strategy = id_strategy
+        self.ids = None
+        self.asset_id = None
+        self.project_id = None
+        self.event_id = None
+
+    def header(self, timeline: Timeline) -> str:
+        return self._resources(timeline) + '''
+    </resources>''' + self._project(timeline)
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        timebase = timeline.timebase
+        clip_id = self.ids.clip_id(cut_index, start, start + duration)
+        return "\n" + " " * self.clip_indent + (
+            f'<asset-clip id="{clip_id}" name="{timeline.clip_name(cut_index)}" ref="{self.asset_id}" '
+            f'offset="{offset}/{timebase}s" start="{start}/{timebase}s" duration="{duration}/{timebase}s"/>'
+        )
+
+    def footer(self, timeline: Timeline) -> Iterable[str]:
+        yield '''
+                    </spine>
+                </sequence>
+            </project>
+        </event>
+    </library>
+</fcpxml>'''
+
+    def _resources(self, timeline: Timeline) -> str:
+        """Document start up to the last shared resource, leaving <resources> open"""
+        timebase = timeline.timebase
+        self.ids = ClipIdGenerator(self.id_strategy, timeline.video_path, timeline.project_name)
+        self.asset_id = self.ids.document_id("asset")
+        self.project_id = self.ids.document_id(f"project\0{timeline.project_name}")
+        self.event_id = self.ids.document_id("event")
+
+        audio_attrs = 'hasAudio="1" audioSources="1" audioChannels="2"' if timeline.include_audio else ''
+
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE fcpxml>
+<fcpxml version="{self.version}">
+    <resources>
+        <format id="r1" name="FFVideoFormat{timebase}p" frameDuration="1/{timebase}s" width="1920" height="1080" colorSpace="1-1-1 (Rec. 709)"/>
+        <asset id="{self.asset_id}" name="{timeline.source_name}" uid="{self.asset_id}" src="file://{timeline.video_path.replace(' ', '%20')}" start="0s" hasVideo="1" {audio_attrs} format="r1" duration="{timeline.asset_duration()}/{timebase}s"/>'''
+
+    def _project(self, timeline: Timeline) -> str:
+        """Library, event and project, leaving the project's <spine> open"""
+        timebase = timeline.timebase
+        # Parts of a split timeline keep their position through the sequence's start timecode
+        tc_start = f' tcStart="{timeline.start}/{timebase}s"' if timeline.start else ''
+        return f'''
+    <library>
+        <event id="{self.event_id}" name="Auto Generated Timeline">
+            <project id="{self.project_id}" name="{timeline.project_name}">
+                <sequence format="r1" duration="{timeline.duration}/{timebase}s"{tc_start}>
+                    <spine>'''
+
+
+class CompoundFcpxmlEmitter(FcpxmlEmitter):
+    """
+    FCPXML whose project spine holds one compound clip per chunk of the timeline
+    Each chunk is a <media> resource with its own short spine, which keeps every
+    spine small for applications that slow down on very long ones. Clips inside a
+    compound clip are offset from its start, and each compound clip sits where its
+    first clip was, so the nested timeline plays exactly like the flat one.
+    """
+
+    clip_indent = 20
+
+    def __init__(self, limits: ChunkLimits, version: str = "1.10", id_strategy: str = "uuid4"):
+        super().__init__(version, id_strategy)
+        self.limits = limits
+        self.chunk = []
+        self.chunk_start = 0
+        self.chunk_frames = 0
+        self.ref_clips = []
+
+    def header(self, timeline: Timeline) -> str:
+        # The project comes after the compound clips, which are resources
+        return self._resources(timeline)
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        media = ""
+        if not self.limits.fits(len(self.chunk), self.chunk_frames, duration, timeline.fps):
+            media = self._media(timeline)
+        if not self.chunk:
+            self.chunk_start = offset
+        self.chunk.append(super().clip(timeline, cut_index, offset - self.chunk_start, start, duration))
+        self.chunk_frames += duration
+        return media
+
+    def footer(self, timeline: Timeline) -> Iterable[str]:
+        if self.chunk:
+            yield self._media(timeline)
+        yield '''
+    </resources>'''
+        yield self._project(timeline)
+        yield ''.join(self.ref_clips)
+        yield from super().footer(timeline)
+
+    def _media(self, timeline: Timeline) -> str:
+        """Write the buffered chunk as a compound clip and remember where it goes in the project"""
+        timebase = timeline.timebase
+        number = len(self.ref_clips) + 1
+        media_id = self.ids.document_id(f"media\0{number}")
+        name = f"{timeline.project_name} {number}"
+
+        self.ref_clips.append(
+            f'''
+                        <ref-clip name="{name}" ref="{media_id}" offset="{self.chunk_start}/{timebase}s" duration="{self.chunk_frames}/{timebase}s"/>'''
+        )
+        media = f'''
+        <media id="{media_id}" name="{name}">
+            <sequence format="r1" duration="{self.chunk_frames}/{timebase}s">
+                <spine>{''.join(self.chunk)}
+                </spine>
+            </sequence>
+        </media>'''
+        self.chunk = []
+        self.chunk_frames = 0
+        return media
+
+
+class EdlEmitter(TimelineEmitter):
+    """CMX3600 edit decision list, one event per clip, non-drop-frame timecode"""
+
+    name = "edl"
+    extension = ".edl"
+    reel = "AX"
+
+    def __init__(self):
+        self.event = 0
+
+    def timecode(self, frames: int, timebase: int) -> str:
+        seconds, frame = divmod(frames, timebase)
+        minutes, second = divmod(seconds, 60)
+        hours, minute = divmod(minutes, 60)
+        return f"{hours:02d}:{minute:02d}:{second:02d}:{frame:02d}"
+
+    def header(self, timeline: Timeline) -> str:
+        return f"TITLE: {timeline.project_name}\nFCM: NON-DROP FRAME\n\n"
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        timebase = timeline.timebase
+        self.event += 1
+        track = "AA/V" if timeline.include_audio else "V"
+        return (
+            f"{self.event:03d}  {self.reel:<8} {track:<5} C        "
+            f"{self.timecode(start, timebase)} {self.timecode(start + duration, timebase)} "
+            f"{self.timecode(offset, timebase)} {self.timecode(offset + duration, timebase)}\n"
+            f"* FROM CLIP NAME: {timeline.source_filename}\n\n"
+        )
+
+
+class OtioEmitter(TimelineEmitter):
+    """OpenTimelineIO JSON with a video track and, with audio, a matching audio track"""
+
+    name = "otio"
+    extension = ".otio"
+
+    def __init__(self):
+        self.audio = None
+        self.count = 0
+
+    def _rational_time(self, value: int, rate: int) -> Dict:
+        return {"OTIO_SCHEMA": "RationalTime.1", "rate": float(rate), "value": float(value)}
+
+    def _time_range(self, start: int, duration: int, rate: int) -> Dict:
+        return {
+            "OTIO_SCHEMA": "TimeRange.1",
+            "duration": self._rational_time(duration, rate),
+            "start_time": self._rational_time(start, rate),
+        }
+
+    def _track_start(self, name: str, kind: str) -> str:
+        track = json.dumps({
+            "OTIO_SCHEMA": "Track.1", "metadata": {}, "name": name, "source_range": None,
+            "effects": [], "markers": [], "kind": kind, "children": [],
+        })
+        return track[:-2]  # Leave "children" open
+
+    def header(self, timeline: Timeline) -> str:
+        timeline_start = json.dumps({
+            "OTIO_SCHEMA": "Timeline.1", "metadata": {}, "name": timeline.project_name,
+            "global_start_time": self._rational_time(timeline.start, timeline.timebase),
+            "tracks": {
+                "OTIO_SCHEMA": "Stack.1", "metadata": {}, "name": "tracks", "source_range": None,
+                "effects": [], "markers": [], "children": [],
+            },
+        })
+        if timeline.include_audio:
+            self.audio = _Spool()
+            self.audio.write(self._track_start("A1", "Audio"))
+        return timeline_start[:-3] + self._track_start("V1", "Video")
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        rate = timeline.timebase
+        clip = json.dumps({
+            "OTIO_SCHEMA": "Clip.1", "metadata": {}, "name": timeline.clip_name(cut_index),
+            "source_range": self._time_range(start, duration, rate),
+            "effects": [], "markers": [],
+            "media_reference": {
+                "OTIO_SCHEMA": "ExternalReference.1", "metadata": {}, "name": timeline.source_name,
+                "available_range": self._time_range(0, timeline.asset_duration(), rate),
+                "target_url": "file://" + quote(timeline.video_path.replace(os.sep, '/')),
+            },
+        })
+        separator = ", " if self.count else ""
+        self.count += 1
+        if self.audio:
+            self.audio.write(separator + clip)
+        return separator + clip
+
+    def footer(self, timeline: Timeline) -> Iterable[str]:
+        yield "]}"
+        if self.audio:
+            yield ", "
+            yield from self.audio.drain()
+            yield "]}"
+        yield "]}}"
+
+
+class PremiereXmlEmitter(TimelineEmitter):
+    """Final Cut Pro 7 XML (xmeml), as imported by Premiere Pro and Resolve"""
+
+    name = "xml"
+    extension = ".xml"
+
+    def __init__(self):
+        self.audio = None
+        self.count = 0
+
+    def _rate(self, timebase: int) -> str:
+        return f"<rate><timebase>{timebase}</timebase><ntsc>FALSE</ntsc></rate>"
+
+    def header(self, timeline: Timeline) -> str:
+        if timeline.include_audio:
+            self.audio = _Spool()
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE xmeml>
+<xmeml version="4">
+    <sequence id="sequence-1">
+        <name>{escape(timeline.project_name)}</name>
+        <duration>{timeline.duration}</duration>
+        {self._rate(timeline.timebase)}
+        <timecode>{self._rate(timeline.timebase)}<frame>{timeline.start}</frame><displayformat>NDF</displayformat></timecode>
+        <media>
+            <video>
+                <format>
+                    <samplecharacteristics>
+                        {self._rate(timeline.timebase)}
+                        <width>1920</width>
+                        <height>1080</height>
+                    </samplecharacteristics>
+                </format>
+                <track>'''
+
+    def _file(self, timeline: Timeline) -> str:
+        """Full file definition on first use, a reference afterwards"""
+        if self.count > 1:
+            return '<file id="file-1"/>'
+
+        audio = '<audio><channelcount>2</channelcount></audio>' if timeline.include_audio else ''
+        return (
+            f'<file id="file-1"><name>{escape(timeline.source_filename)}</name>'
+            f'<pathurl>file://localhost{escape(quote(timeline.video_path.replace(os.sep, "/")))}</pathurl>'
+            f'{self._rate(timeline.timebase)}<duration>{timeline.asset_duration()}</duration>'
+            f'<media><video/>{audio}</media></file>'
+        )
+
+    def _clipitem(self, timeline: Timeline, item_id: str, name: str, offset: int, start: int,
+                  duration: int, file: str, extra: str = "") -> str:
+        return f'''
+                    <clipitem id="{item_id}">
+                        <name>{name}</name>
+                        <duration>{timeline.asset_duration()}</duration>
+                        {self._rate(timeline.timebase)}
+                        <start>{offset}</start>
+                        <end>{offset + duration}</end>
+                        <in>{start}</in>
+                        <out>{start + duration}</out>
+                        {file}{extra}
+                    </clipitem>'''
+
+    def clip(self, timeline: Timeline, cut_index: int, offset: int, start: int, duration: int) -> str:
+        self.count += 1
+        name = escape(timeline.clip_name(cut_index))
+        # Track positions count from the start of the sequence, which carries the start timecode
+        offset -= timeline.start
+        if self.audio:
+            self.audio.write(self._clipitem(
+                timeline, f"clipitem-a{self.count}", name, offset, start, duration,
+                '<file id="file-1"/>',
+                '<sourcetrack><mediatype>audio</mediatype><trackindex>1</trackindex></sourcetrack>'
+            ))
+        return self._clipitem(timeline, f"clipitem-{self.count}", name, offset, start, duration,
+                              self._file(timeline))
+
+    def footer(self, timeline: Timeline) -> Iterable[str]:
+        yield '''
+                </track>
+            </video>'''
+        if self.audio:
+            yield '''
+            <audio>
+                <track>'''
+            yield from self.audio.drain()
+            yield '''
+                </track>
+            </audio>'''
+        yield '''
+        </media>
+    </sequence>
+</xmeml>'''
+
+
+# Built-in formats by name
+EMITTERS = {emitter.name: emitter for emitter in (FcpxmlEmitter, EdlEmitter, OtioEmitter, PremiereXmlEmitter)}
+
+
+def create_emitter(name: str, id_strategy: str = "uuid4",
+                   compound: Optional[ChunkLimits] = None) -> TimelineEmitter:
+    """
+    New emitter for a format name
+    compound nests FCPXML output as compound clips of that size; formats without
+    nesting are written flat
+    """
+    if name not in EMITTERS:
+        raise ValueError(f"Unknown export format: {name} (available: {', '.join(EMITTERS)})")
+    if name == FcpxmlEmitter.name:
+        if compound:
+            return CompoundFcpxmlEmitter(compound, id_strategy=id_strategy)
+        return FcpxmlEmitter(id_strategy=id_strategy)
+    return EMITTERS[name]()
+
+
+class TimelineExporter:
+    """
+    Renders a timeline with any number of emitters in a single traversal of its clips
+    Output is written to each emitter's sink a block of clips at a time, so memory
+    use does not grow with the length of the timeline
+    """
+
+    def __init__(self, chunk_clips: int = 1000):
+        # Number of clips rendered between writes to the sinks
+        self.chunk_clips = chunk_clips
+
+    def export(self, timeline: Timeline, targets: List[Tuple[TimelineEmitter, TextIO]],
+               progress: Optional[ProgressCallback] = None, cancel: Optional[CancellationToken] = None):
+        """
+        Write the timeline through every (emitter, sink) pair
+        progress receives (clips written, total clips); cancel is checked after every block
+        """
+        reporter = ProgressReporter(progress, cancel, timeline.clip_count)
+        for emitter, sink in targets:
+            sink.write(emitter.header(timeline))
+
+        blocks = [[] for _ in targets]
+        done = 0
+        pending = 0
+        for clip in timeline.clips:
+            for block, (emitter, _) in zip(blocks, targets):
+                block.append(emitter.clip(timeline, *clip))
+            pending += 1
+            if pending >= self.chunk_clips:
+                self._flush(blocks, targets)
+                done += pending
+                pending = 0
+                reporter.update(done)
+        self._flush(blocks, targets)
+
+        for emitter, sink in targets:
+            for chunk in emitter.footer(timeline):
+                sink.write(chunk)
+        reporter.finish(done + pending)
+
+    def iter_chunks(self, timeline: Timeline, emitter: TimelineEmitter,
+                    progress: Optional[ProgressCallback] = None,
+                    cancel: Optional[CancellationToken] = None) -> Iterator[str]:
+        """Render a timeline with one emitter as a sequence of text chunks"""
+        reporter = ProgressReporter(progress, cancel, timeline.clip_count)
+        yield emitter.header(timeline)
+
+        block = []
+        done = 0
+        for clip in timeline.clips:
+            block.append(emitter.clip(timeline, *clip))
+            if len(block) >= self.chunk_clips:
+                done += len(block)
+                yield ''.join(block)
+                block = []
+                reporter.update(done)
+        done += len(block)
+        yield ''.join(block)
+
+        yield from emitter.footer(timeline)
+        reporter.finish(done)
+
+    def export_files(self, timeline: Timeline, formats: List[str], base_path: str,
+                     id_strategy: str = "uuid4", compound: Optional[ChunkLimits] = None,
+                     progress: Optional[ProgressCallback] = None,
+                     cancel: Optional[CancellationToken] = None) -> List[str]:
+        """
+        Write one file per format as base_path plus the format's extension
+        Returns the paths of the written files; a cancelled export removes them
+        """
+        emitters = [create_emitter(name, id_strategy, compound) for name in dict.fromkeys(formats)]
+        paths = [base_path + emitter.extension for emitter in emitters]
+
+        sinks = []
+        try:
+            for path in paths:
+                sinks.append(open(path, "w", encoding='utf-8'))
+            self.export(timeline, list(zip(emitters, sinks)), progress, cancel)
+        except OperationCancelled:
+            for sink in sinks:
+                sink.close()
+            for path in paths[:len(sinks)]:
+                os.remove(path)
+            raise
+        finally:
+            for sink in sinks:
+                sink.close()
+        return paths
+
+    def export_parts(self, timeline: Timeline, formats: List[str], base_path: str,
+                     limits: ChunkLimits, id_strategy: str = "uuid4",
+                     progress: Optional[ProgressCallback] = None,
+                     cancel: Optional[CancellationToken] = None) -> List[str]:
+        """
+        Split the timeline within limits and write each part in every format,
+        as base_path plus "_part001" and so on. The parts line up end to end.
+        Progress counts clips across all parts.
+        """
+        paths = []
+        written = 0
+        for number, part in enumerate(timeline.split(limits), 1):
+            part_progress = None
+            if progress is not None:
+                part_progress = lambda done, total, before=written: progress(before + done, timeline.clip_count)
+            paths += self.export_files(part, formats, f"{base_path}_part{number:03d}", id_strategy,
+                                       progress=part_progress, cancel=cancel)
+            written += part.clip_count
+        return paths
+
+    def _flush(self, blocks: List[List[str]], targets: List[Tuple[TimelineEmitter, TextIO]]):
+        for block, (_, sink) in zip(blocks, targets):
+            if block:
+                sink.write(''.join(block))
+                block.clear()
@@ -0,0 +1,456 @@
+"""
+Transcript search
+Word-level inverted indexes of timestamped transcripts, cached on disk, used to
+turn keyword and phrase queries into cut lists
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Iterator, Iterable, Optional, Any
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, lookups and merging fall back to pure Python
+    np = None
+
+from utils.file_helpers import FileManager
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken
+from .timecode_parser import TimecodeParser
+
+
+# magic, index version, word count, vocabulary size, vocabulary bytes, source key
+HEADER = struct.Struct('<8sHIIQ16s')
+MAGIC = b'FCPXTRAN'
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+VTT_TIMING = re.compile(r'^\s*(\S+)\s+-->\s+(\S+)')
+VTT_INLINE_TIME = re.compile(r'<(\d{1,2}:\d{2}(?::\d{2})?[.,]\d{3})>')
+VTT_TAG = re.compile(r'<[^>]*>')
+
+_timecode_parser = TimecodeParser()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of a transcript or query, without punctuation"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def read_words(path: str) -> Iterator[Tuple[str, float, float]]:
+    """
+    Yield (text, start, end) for every timed word of a transcript
+    WebVTT cues with inline word timestamps (<00:00:01.250>) give one entry per word;
+    cues without them give one entry for the whole cue. JSON is searched for "words"
+    lists as written by Whisper, WhisperX and Deepgram, or may be a plain list of words.
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        head = f.read(64)
+        f.seek(0)
+        if path.lower().endswith('.vtt') or head.lstrip().startswith('WEBVTT'):
+            yield from _read_vtt_words(f)
+        else:
+            yield from _read_json_words(json.load(f))
+
+
+def _read_json_words(node: Any) -> Iterator[Tuple[str, float, float]]:
+    if isinstance(node, dict):
+        words = node.get('words')
+        if isinstance(words, list):
+            yield from _read_json_words(words)
+            return
+        for key, value in node.items():
+            if key == 'alternatives' and isinstance(value, list):
+                value = value[:1]  # Only the best recognition result
+            yield from _read_json_words(value)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, dict) and 'start' in item and 'words' not in item:
+                text = item.get('punctuated_word') or item.get('word') or item.get('text')
+                try:
+                    start, end = float(item['start']), float(item.get('end', item['start']))
+                except (TypeError, ValueError):
+                    continue  # Words without timestamps cannot be cut on
+                if text:
+                    yield text, start, end
+            else:
+                yield from _read_json_words(item)
+
+
+def _read_vtt_words(stream) -> Iterator[Tuple[str, float, float]]:
+    cue = None
+    lines = []
+    previous_text = None
+    for line in stream:
+        line = line.rstrip('\n')
+        timing = VTT_TIMING.match(line)
+        if timing:
+            cue = (_timecode_parser.timecode_to_seconds(timing.group(1)),
+                   _timecode_parser.timecode_to_seconds(timing.group(2)))
+            lines = []
+        elif line.strip():
+            if cue:
+                lines.append(line)
+        elif cue:
+            previous_text = yield from _cue_words(cue, lines, previous_text)
+            cue = None
+    if cue:
+        yield from _cue_words(cue, lines, previous_text)
+
+
+def _cue_words(cue: Tuple[float, float], lines: List[str], previous_text: Optional[str]):
+    """Words of one cue; returns the cue's text so repeated rolling captions can be skipped"""
+    # Rolling captions repeat the previous line above the new, word-timed one
+    timed = [line for line in lines if VTT_INLINE_TIME.search(line)]
+    if timed:
+        lines = timed
+    text = ' '.join(VTT_TAG.sub('', line) for line in lines).strip()
+    if not timed and text == previous_text:
+        return text
+
+    cue_start, cue_end = cue
+    for line in lines:
+        # Alternating text and timestamps: "first<00:00:01.200><c> second</c>..."
+        parts = VTT_INLINE_TIME.split(line)
+        times = [cue_start] + [_timecode_parser.timecode_to_seconds(value) for value in parts[1::2]]
+        for i, segment in enumerate(parts[0::2]):
+            segment = VTT_TAG.sub('', segment).strip()
+            if segment:
+                end = times[i + 1] if i + 1 < len(times) else cue_end
+                yield segment, times[i], max(end, times[i])
+    return text
+
+
+class TranscriptIndex:
+    """
+    Inverted index of one transcript
+    Every token of the transcript has a position with the start and end time of its
+    word; each vocabulary entry points to the sorted positions where it occurs.
+    """
+
+    def __init__(self, vocabulary: List[str], starts: array, ends: array,
+                 offsets: array, positions: array):
+        # Sorted tokens; token i occurs at positions[offsets[i]:offsets[i + 1]]
+        self.vocabulary = vocabulary
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.positions = positions
+
+    @property
+    def word_count(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def build(cls, path: str) -> 'TranscriptIndex':
+        """Read a transcript and index its words"""
+        starts = array('d')
+        ends = array('d')
+        tokens = []
+        for text, start, end in read_words(path):
+            # Words such as "well-known" become several tokens with the same times
+            for token in tokenize(text):
+                tokens.append(token)
+                starts.append(start)
+                ends.append(end)
+
+        vocabulary = sorted(set(tokens))
+        token_ids = {token: i for i, token in enumerate(vocabulary)}
+        ids = array('I', [token_ids[token] for token in tokens])
+
+        if np is not None:
+            # A stable sort of positions by token keeps each token's positions in order
+            id_values = np.frombuffer(ids, dtype=np.uint32)
+            counts = np.bincount(id_values, minlength=len(vocabulary))
+            offsets = array('I', [0])
+            offsets.frombytes(np.cumsum(counts, dtype=np.uint32).tobytes())
+            positions = array('I')
+            positions.frombytes(np.argsort(id_values, kind='stable').astype(np.uint32).tobytes())
+            return cls(vocabulary, starts, ends, offsets, positions)
+
+        # Counting sort of positions by token keeps each token's positions in order
+        offsets = array('I', [0]) * (len(vocabulary) + 1)
+        for token_id in ids:
+            offsets[token_id + 1] += 1
+        for i in range(len(vocabulary)):
+            offsets[i + 1] += offsets[i]
+
+        fill = offsets[:-1]
+        positions = array('I', [0]) * len(ids)
+        for position, token_id in enumerate(ids):
+            positions[fill[token_id]] = position
+            fill[token_id] += 1
+
+        return cls(vocabulary, starts, ends, offsets, positions)
+
+    def save(self, cache_path: str, source_key: bytes):
+        """Write the index atomically"""
+        vocabulary = '\n'.join(self.vocabulary).encode('utf-8')
+        header = HEADER.pack(MAGIC, INDEX_VERSION, self.word_count, len(self.vocabulary),
+                             len(vocabulary), source_key)
+        with FileManager().atomic_write(cache_path) as f:
+            f.write(header)
+            f.write(vocabulary)
+            f.write(b'\0' * (-(HEADER.size + len(vocabulary)) % 8))
+            for values in (self.starts, self.ends, self.offsets, self.positions):
+                if sys.byteorder != 'little':
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+
+    @classmethod
+    def load(cls, cache_path: str, source_key: bytes) -> Optional['TranscriptIndex']:
+        """Read a saved index; None if it is missing, damaged or for another version of the source"""
+        try:
+            with open(cache_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if len(data) < HEADER.size:
+                    return None
+                magic, version, words, vocabulary_size, vocabulary_bytes, stored_key = \
+                    HEADER.unpack_from(data, 0)
+                if (magic, version, stored_key) != (MAGIC, INDEX_VERSION, source_key):
+                    return None
+
+                position = HEADER.size
+                vocabulary = data[position:position + vocabulary_bytes].decode('utf-8').split('\n')
+                position += vocabulary_bytes + (-(HEADER.size + vocabulary_bytes) % 8)
+                arrays = []
+                for typecode, count in (('d', words), ('d', words), ('I', vocabulary_size + 1), ('I', words)):
+                    values = array(typecode)
+                    size = count * values.itemsize
+                    values.frombytes(data[position:position + size])
+                    if len(values) != count:
+                        return None  # Truncated
+                    if sys.byteorder != 'little':
+                        values.byteswap()
+                    arrays.append(values)
+                    position += size
+        except (OSError, ValueError, UnicodeDecodeError):
+            return None
+
+        if not vocabulary_bytes:
+            vocabulary = []
+        return cls(vocabulary, *arrays)
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int]]:
+        """(first, last) positions of every occurrence of a phrase of tokens"""
+        spans = self._spans(tokens)
+        if not spans:
+            return []
+        if np is not None:
+            return [(first, first + len(tokens) - 1) for first in self._find_array(spans).tolist()]
+
+        # Walk the rarest token's positions and look the others up by bisection
+        anchor = min(range(len(spans)), key=lambda k: spans[k][1] - spans[k][0])
+        low, high = spans[anchor]
+        matches = []
+        for position in self.positions[low:high]:
+            first = position - anchor
+            if first < 0:
+                continue
+            for k, (lo, hi) in enumerate(spans):
+                if k == anchor:
+                    continue
+                wanted = first + k
+                found = bisect_left(self.positions, wanted, lo, hi)
+                if found == hi or self.positions[found] != wanted:
+                    break
+            else:
+                matches.append((first, first + len(tokens) - 1))
+        return matches
+
+    def times(self, tokens: List[str], padding: float = 0.0) -> Tuple[Any, Any]:
+        """
+        Start and end times of every occurrence of a phrase, widened by padding seconds
+        Returned as NumPy arrays when NumPy is available, lists otherwise
+        """
+        spans = self._spans(tokens)
+        if np is not None:
+            firsts = self._find_array(spans) if spans else np.empty(0, dtype=np.int64)
+            starts = np.frombuffer(self.starts, dtype=np.float64)[firsts]
+            ends = np.frombuffer(self.ends, dtype=np.float64)[firsts + (len(tokens) - 1)]
+            return np.maximum(starts - padding, 0.0), ends + padding
+
+        matches = self.find(tokens) if spans else []
+        return ([max(0.0, self.starts[first] - padding) for first, _ in matches],
+                [self.ends[last] + padding for _, last in matches])
+
+    def _spans(self, tokens: List[str]) -> List[Tuple[int, int]]:
+        """Range of positions of each token; empty if any token never occurs"""
+        spans = []
+        for token in tokens:
+            i = bisect_left(self.vocabulary, token)
+            if i == len(self.vocabulary) or self.vocabulary[i] != token:
+                return []
+            spans.append((self.offsets[i], self.offsets[i + 1]))
+        return spans
+
+    def _find_array(self, spans: List[Tuple[int, int]]):
+        """First positions of a phrase, checking all occurrences of the rarest token at once"""
+        positions = np.frombuffer(self.positions, dtype=np.uint32)
+        anchor = min(range(len(spans)), key=lambda k: spans[k][1] - spans[k][0])
+        low, high = spans[anchor]
+        firsts = positions[low:high].astype(np.int64) - anchor
+        firsts = firsts[firsts >= 0]
+        for k, (lo, hi) in enumerate(spans):
+            if k == anchor or not len(firsts):
+                continue
+            occurrences = positions[lo:hi]
+            wanted = firsts + k
+            found = np.minimum(np.searchsorted(occurrences, wanted), hi - lo - 1)
+            firsts = firsts[occurrences[found] == wanted]
+        return firsts
+
+
+def _build_index(task: Tuple[str, str, bytes]) -> int:
+    """Worker: index a transcript and save it to the cache; returns its word count"""
+    path, cache_path, source_key = task
+    index = TranscriptIndex.build(path)
+    index.save(cache_path, source_key)
+    return index.word_count
+
+
+class TranscriptSearch:
+    """
+    Keyword and phrase search over many transcripts
+    Indexes are built once per version of a transcript (in parallel for new files)
+    and kept in the user cache folder; loaded ones stay in memory between queries.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.cache_dir = cache_dir or FileManager().get_cache_directory('transcripts')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.workers = workers
+        self._indexes = {}
+
+    def index(self, paths: Iterable[str], progress: Optional[ProgressCallback] = None,
+              cancel: Optional[CancellationToken] = None) -> Dict[str, TranscriptIndex]:
+        """
+        Load the index of every transcript, building those that are missing or stale
+        progress receives (transcripts ready, number of transcripts)
+        """
+        paths = list(dict.fromkeys(paths))
+        reporter = ProgressReporter(progress, cancel, len(paths))
+        indexes = {}
+        stale = []
+        for path in paths:
+            source_key = self._source_key(path)
+            cached = self._indexes.get(path)
+            if cached and cached[0] == source_key:
+                indexes[path] = cached[1]
+                continue
+            index = TranscriptIndex.load(self._cache_path(path), source_key)
+            if index is None:
+                stale.append((path, self._cache_path(path), source_key))
+            else:
+                self._indexes[path] = (source_key, index)
+                indexes[path] = index
+        reporter.update(len(indexes))
+
+        if len(stale) > 1 and self.workers != 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                for count, _ in enumerate(executor.map(_build_index, stale), len(indexes) + 1):
+                    reporter.update(count)
+            finally:
+                executor.shutdown(cancel_futures=True)
+        else:
+            for count, task in enumerate(stale, len(indexes) + 1):
+                _build_index(task)
+                reporter.update(count)
+
+        for path, cache_path, source_key in stale:
+            index = TranscriptIndex.load(cache_path, source_key)
+            if index is None:
+                raise ValueError(f"Could not index transcript: {path}")
+            self._indexes[path] = (source_key, index)
+            indexes[path] = index
+
+        reporter.finish(len(paths))
+        return {path: indexes[path] for path in paths}
+
+    def parse_query(self, query: str) -> List[List[str]]:
+        """Split a query into terms: "quoted phrases" and single keywords"""
+        terms = []
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            tokens = tokenize(phrase if phrase else word)
+            if phrase:
+                if tokens:
+                    terms.append(tokens)
+            else:
+                terms.extend([token] for token in tokens)
+        return terms
+
+    def search(self, query: str, paths: Iterable[str], padding: float = 0.25,
+               merge_gap: float = 0.0) -> Dict[str, List[Dict]]:
+        """
+        Cut lists of the places where any term of the query is spoken, per transcript
+        Each hit is widened by padding seconds on both sides, and hits that overlap or
+        are less than merge_gap apart become one cut. Transcripts without hits are left out.
+        """
+        terms = self.parse_query(query)
+        results = {}
+        for path, index in self.index(paths).items():
+            starts = []
+            ends = []
+            for tokens in terms:
+                term_starts, term_ends = index.times(tokens, padding)
+                starts.append(term_starts)
+                ends.append(term_ends)
+            cuts = self._merge(starts, ends, merge_gap)
+            if cuts:
+                results[path] = cuts
+        return results
+
+    def cuts(self, query: str, path: str, padding: float = 0.25, merge_gap: float = 0.0) -> List[Dict]:
+        """Cut list for one transcript, ready for FCPXMLBuilder"""
+        return self.search(query, [path], padding, merge_gap).get(path, [])
+
+    def _merge(self, starts: List[Any], ends: List[Any], merge_gap: float) -> List[Dict]:
+        """Sort the hits of all terms and join those that overlap or are within merge_gap"""
+        if np is not None:
+            if not starts:
+                return []
+            starts = np.concatenate(starts)
+            ends = np.concatenate(ends)
+            if not len(starts):
+                return []
+            order = np.argsort(starts, kind='stable')
+            starts = starts[order]
+            ends = ends[order]
+            # A hit opens a new cut when it starts after everything before it has ended
+            reach = np.maximum.accumulate(ends)
+            opens = np.empty(len(starts), dtype=bool)
+            opens[0] = True
+            opens[1:] = starts[1:] > reach[:-1] + merge_gap
+            first = np.flatnonzero(opens)
+            cut_starts = np.round(starts[first], 3).tolist()
+            cut_ends = np.round(np.maximum.reduceat(ends, first), 3).tolist()
+            return [{'start': start, 'end': end} for start, end in zip(cut_starts, cut_ends)]
+
+        ranges = sorted(zip((s for part in starts for s in part), (e for part in ends for e in part)))
+        cuts = []
+        for start, end in ranges:
+            if cuts and start <= cuts[-1]['end'] + merge_gap:
+                cuts[-1]['end'] = max(cuts[-1]['end'], end)
+            else:
+                cuts.append({'start': round(start, 3), 'end': end})
+        for cut in cuts:
+            cut['end'] = round(cut['end'], 3)
+        return cuts
+
+    def _source_key(self, path: str) -> bytes:
+        key = FileManager().get_cache_key(path)
+        if key is None:
+            raise FileNotFoundError(f"Transcript not found: {path}")
+        return key
+
+    def _cache_path(self, path: str) -> str:
+        name = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.tidx")
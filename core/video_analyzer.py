@@ -6,32 +6,268 @@ Handles FPS detection and video file validation
 import subprocess
 import json
 import os
-from typing import Optional, Dict, Any
+from concurrent.futures import Executor
+from typing import Optional, Dict, Any, List
+
+from utils.progress import ProgressCallback, ProgressReporter, CancellationToken, OperationCancelled, run_blocking
+from .probe_cache import ProbeCache
 
 
 class VideoAnalyzer:
     """Analyzes video files for metadata like frame rate"""
     
-    def __init__(self):
+    def __init__(self, probe_cache: Optional[ProbeCache] = None):
         self.common_frame_rates = [23.976, 24, 25, 29.97, 30, 50, 59.94, 60]
+        self.probe_cache = probe_cache or ProbeCache()
+        # Variable frame rate detection reads this many windows of this many seconds
+        self.vfr_windows = 4
+        self.vfr_window_seconds = 5.0
+        # Share of frame intervals that may stray from the typical one in a constant-rate file
+        self.vfr_tolerance = 0.05
     
-    def detect_fps(self, video_path: str) -> Optional[str]:
+    def detect_fps(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                   cancel: Optional[CancellationToken] = None) -> Optional[str]:
         """
         Detect frame rate from video file using ffprobe
         Returns string representation of FPS or None if detection fails
+        Use detect_frame_rate to also learn whether the source has a variable frame rate
+        """
+        return self.detect_frame_rate(video_path, progress, cancel)['fps']
+    
+    def detect_frame_rate(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                          cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Detect the frame rate to use for a source and whether it varies
+        Returns {'fps': string or None, 'vfr': detect_vfr() result or None, 'warning': text or None}
+        For variable frame rate sources the measured average rate is used, since the
+        nominal rate in the header can be far from the real one, and the warning says
+        that cuts on the source will not be frame accurate
+        progress and cancel are passed on to detect_vfr
         """
         try:
-            return self._ffprobe_fps(video_path)
+            fps = self._ffprobe_fps(video_path)
+            # Checked even without a usable nominal rate: VFR headers often report 1000 or 90000
+            vfr = self.detect_vfr(video_path, progress, cancel)
+        except OperationCancelled:
+            raise
         except Exception:
             # If ffprobe fails, try alternative methods
-            return self._fallback_fps_detection(video_path)
+            return {'fps': self._fallback_fps_detection(video_path), 'vfr': None, 'warning': None}
+        
+        if vfr and vfr['vfr'] and vfr['average_fps']:
+            average = self._round_to_common_fps(vfr['average_fps'])
+            warning = (f"{os.path.basename(video_path)}: variable frame rate "
+                       f"({vfr['irregular']:.0%} of frame intervals irregular), using the measured "
+                       f"average of {average} fps; cuts will not be frame accurate")
+            return {'fps': average, 'vfr': vfr, 'warning': warning}
+        return {'fps': fps, 'vfr': vfr, 'warning': None}
     
-    def _ffprobe_fps(self, video_path: str) -> Optional[str]:
-        """Use ffprobe to detect frame rate"""
+    def probe(self, video_path: str, progress: Optional[ProgressCallback] = None,
+              cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Get frame rate and duration of a video file with a single ffprobe call
+        Results are cached with the file's metadata, so each file is probed once
+        """
+        reporter = ProgressReporter(progress, cancel, 1)
+        cached = self.probe_cache.get(video_path)
+        if cached is not None and 'duration' in cached:
+            reporter.finish(1)
+            return cached
+        
+        reporter.update(0)
+        metadata = self._ffprobe_metadata(video_path)
+        reporter.finish(1)
+        if metadata is None:
+            # Not cached: ffprobe may be installed later
+            return {'fps': None, 'duration': None}
+        
+        return self.probe_cache.update(video_path, **metadata)
+    
+    async def probe_async(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                          cancel: Optional[CancellationToken] = None,
+                          executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """probe() run in an executor"""
+        return await run_blocking(self.probe, video_path, progress=progress, cancel=cancel, executor=executor)
+    
+    async def detect_fps_async(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                               cancel: Optional[CancellationToken] = None,
+                               executor: Optional[Executor] = None) -> Optional[str]:
+        """detect_fps() run in an executor"""
+        return await run_blocking(self.detect_fps, video_path, progress=progress, cancel=cancel, executor=executor)
+    
+    def detect_vfr(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                   cancel: Optional[CancellationToken] = None) -> Optional[Dict[str, Any]]:
+        """
+        Check whether a source has a variable frame rate by sampling a few short
+        windows of packet timestamps instead of scanning the whole file
+        Returns {'vfr', 'average_fps', 'nominal_fps', 'irregular', 'intervals'} or None
+        The verdict is stored with the file's probe metadata, also when the timestamps
+        cannot be read, so each file is scanned once
+        progress receives (windows read, windows planned)
+        """
+        cached = self.probe_cache.get(video_path)
+        if cached is not None and 'vfr' in cached:
+            return cached['vfr']
+        
+        duration = self.probe(video_path, cancel=cancel).get('duration')
+        if not duration:
+            return None
+        
+        # The start plus windows spread evenly over the rest of the file
+        window = self.vfr_window_seconds
+        count = max(1, min(self.vfr_windows, int(duration // window)))
+        starts = [round(i * (duration - window) / max(1, count - 1), 3) for i in range(count)]
+        
+        reporter = ProgressReporter(progress, cancel, count, interval=0)
+        intervals = []
+        result = None
+        for number, start in enumerate(starts):
+            reporter.update(number)
+            timestamps = self._ffprobe_packet_times(video_path, start, window)
+            if timestamps is None:
+                result = None
+                break
+            intervals.extend(b - a for a, b in zip(timestamps, timestamps[1:]) if b > a)
+            result = self._frame_interval_stats(intervals)
+            # Clearly irregular already; the remaining windows cannot change the verdict
+            if result and result['intervals'] >= 100 and result['irregular'] > 4 * self.vfr_tolerance:
+                break
+        
+        reporter.finish(count)
+        self.probe_cache.update(video_path, vfr=result)
+        return result
+    
+    async def detect_vfr_async(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                               cancel: Optional[CancellationToken] = None,
+                               executor: Optional[Executor] = None) -> Optional[Dict[str, Any]]:
+        """detect_vfr() run in an executor"""
+        return await run_blocking(self.detect_vfr, video_path, progress=progress, cancel=cancel, executor=executor)
+    
+    def _ffprobe_packet_times(self, video_path: str, start: float, length: float) -> Optional[List[float]]:
+        """Stream the sorted packet timestamps of one read interval"""
+        cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-read_intervals', f"{start}%+{length}",
+            '-show_entries', 'packet=pts_time', '-of', 'csv=print_section=0', video_path
+        ]
+        
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        
+        timestamps = []
+        try:
+            for line in process.stdout:
+                try:
+                    timestamps.append(float(line.strip().rstrip(',')))
+                except ValueError:
+                    continue  # N/A
+        finally:
+            process.stdout.close()
+            process.wait()
+        
+        if process.returncode != 0:
+            return None
+        
+        # Packets arrive in decode order
+        return sorted(set(timestamps))
+    
+    def _frame_interval_stats(self, intervals: List[float]) -> Optional[Dict[str, Any]]:
+        """Summarize the distribution of frame intervals"""
+        if len(intervals) < 2:
+            return None
+        
+        typical = sorted(intervals)[len(intervals) // 2]
+        # Timestamps rounded to milliseconds make 29.97 fps alternate between 33 and 34 ms
+        allowed = max(0.0015, typical * 0.1)
+        irregular = sum(1 for interval in intervals if abs(interval - typical) > allowed) / len(intervals)
+        
+        return {
+            'vfr': irregular > self.vfr_tolerance,
+            'average_fps': round(len(intervals) / sum(intervals), 3),
+            'nominal_fps': round(1.0 / typical, 3),
+            'irregular': round(irregular, 4),
+            'intervals': len(intervals),
+        }
+    
+    def get_keyframes(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                      cancel: Optional[CancellationToken] = None) -> Optional[List[float]]:
+        """
+        Get the sorted keyframe times (seconds) of the first video stream
+        The index is cached as a packed array beside the file's probe metadata, so it is
+        built once per file without growing the JSON entry every probe reads
+        progress receives (packets read, None), since the packet count is not known ahead
+        """
+        cached = self.probe_cache.get_array(video_path, 'keyframes')
+        if cached is not None:
+            return cached.tolist()
+        
+        keyframes = self._ffprobe_keyframes(video_path, ProgressReporter(progress, cancel))
+        if keyframes is None:
+            return None
+        
+        self.probe_cache.put_array(video_path, 'keyframes', keyframes)
+        return keyframes
+    
+    async def get_keyframes_async(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                                  cancel: Optional[CancellationToken] = None,
+                                  executor: Optional[Executor] = None) -> Optional[List[float]]:
+        """get_keyframes() run in an executor"""
+        return await run_blocking(self.get_keyframes, video_path, progress=progress, cancel=cancel, executor=executor)
+    
+    def _ffprobe_keyframes(self, video_path: str,
+                           reporter: Optional[ProgressReporter] = None) -> Optional[List[float]]:
+        """Stream packet timestamps and flags from ffprobe as CSV, keeping keyframes only"""
+        cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,dts_time,flags', '-of', 'csv=print_section=0', video_path
+        ]
+        
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        
+        reporter = reporter or ProgressReporter()
+        keyframes = []
+        packets = 0
+        try:
+            for line in process.stdout:
+                packets += 1
+                if packets % 10000 == 0:
+                    reporter.update(packets)
+                
+                # pts_time,dts_time,flags - e.g. "12.012000,11.978633,K__"
+                fields = line.strip().split(',')
+                if len(fields) < 3 or not fields[2].startswith('K'):
+                    continue
+                for value in fields[:2]:
+                    try:
+                        keyframes.append(round(float(value), 6))
+                        break
+                    except ValueError:
+                        continue  # N/A, try the decode timestamp
+        except OperationCancelled:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+        
+        reporter.finish(packets)
+        
+        if process.returncode != 0:
+            return None
+        
+        # Packets arrive in decode order
+        return sorted(set(keyframes))
+    
+    def _ffprobe_metadata(self, video_path: str) -> Optional[Dict[str, Any]]:
+        """Run ffprobe for the first video stream and container format"""
         try:
             cmd = [
                 'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_streams', '-select_streams', 'v:0', video_path
+                '-show_streams', '-show_format', '-select_streams', 'v:0', video_path
             ]
             
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
@@ -41,36 +277,53 @@ class VideoAnalyzer:
             
             info = json.loads(result.stdout)
             
-            if not info.get('streams'):
-                return None
-            
-            stream = info['streams'][0]
-            
-            # Try to get frame rate from various fields
-            fps_candidates = []
-            
-            # r_frame_rate is usually the most accurate
-            if 'r_frame_rate' in stream:
-                fps = self._parse_fraction(stream['r_frame_rate'])
-                if fps:
-                    fps_candidates.append(fps)
-            
-            # avg_frame_rate as backup
-            if 'avg_frame_rate' in stream:
-                fps = self._parse_fraction(stream['avg_frame_rate'])
-                if fps:
-                    fps_candidates.append(fps)
-            
-            # Pick the best candidate
-            for fps in fps_candidates:
-                if 20 <= fps <= 120:  # Reasonable range
-                    return self._round_to_common_fps(fps)
-            
-            return None
-            
         except (subprocess.TimeoutExpired, subprocess.SubprocessError, 
                 json.JSONDecodeError, FileNotFoundError):
             return None
+        
+        duration = None
+        if 'format' in info and 'duration' in info['format']:
+            try:
+                duration = float(info['format']['duration'])
+            except ValueError:
+                pass
+        
+        stream = info['streams'][0] if info.get('streams') else {}
+        
+        return {
+            'fps': self._fps_from_stream(stream) if stream else None,
+            'duration': duration,
+            'width': stream.get('width'),
+            'height': stream.get('height'),
+        }
+    
+    def _ffprobe_fps(self, video_path: str) -> Optional[str]:
+        """Use ffprobe to detect frame rate"""
+        return self.probe(video_path).get('fps')
+    
+    def _fps_from_stream(self, stream: Dict[str, Any]) -> Optional[str]:
+        """Pick the frame rate from an ffprobe stream description"""
+        # Try to get frame rate from various fields
+        fps_candidates = []
+        
+        # r_frame_rate is usually the most accurate
+        if 'r_frame_rate' in stream:
+            fps = self._parse_fraction(stream['r_frame_rate'])
+            if fps:
+                fps_candidates.append(fps)
+        
+        # avg_frame_rate as backup
+        if 'avg_frame_rate' in stream:
+            fps = self._parse_fraction(stream['avg_frame_rate'])
+            if fps:
+                fps_candidates.append(fps)
+        
+        # Pick the best candidate
+        for fps in fps_candidates:
+            if 20 <= fps <= 120:  # Reasonable range
+                return self._round_to_common_fps(fps)
+        
+        return None
     
     def _parse_fraction(self, fraction_str: str) -> Optional[float]:
         """Parse fraction string like '30/1' or '30000/1001'"""
@@ -131,6 +384,7 @@ class VideoAnalyzer:
             'readable': False,
             'fps': None,
             'duration': None,
+            'vfr': None,
             'error': None
         }
         
@@ -159,6 +413,10 @@ class VideoAnalyzer:
             if duration:
                 result['duration'] = duration
             
+            vfr = self.detect_vfr(video_path)
+            if vfr:
+                result['vfr'] = vfr['vfr']
+            
             result['valid'] = True
             
         except Exception as e:
@@ -169,23 +427,7 @@ class VideoAnalyzer:
     def _get_video_duration(self, video_path: str) -> Optional[float]:
         """Get video duration in seconds using ffprobe"""
         try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', video_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                return None
-            
-            info = json.loads(result.stdout)
-            
-            if 'format' in info and 'duration' in info['format']:
-                return float(info['format']['duration'])
-            
-            return None
-            
+            return self.probe(video_path).get('duration')
         except Exception:
             return None
     
@@ -0,0 +1,264 @@
+"""
+Shared-directory work queue
+Lets worker processes on any number of hosts share batch jobs through a spool
+directory, using atomic renames as leases and file mtimes as heartbeats
+"""
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable
+
+from utils.file_helpers import FileManager
+from .batch import BatchScheduler, run_batch_job
+
+
+class WorkQueue:
+    """
+    Spool directory layout:
+        pending/<job>.json   waiting to be claimed
+        leased/<job>.json    claimed; the file's mtime is the worker's heartbeat
+        reclaim/<job>.json.* expired leases being returned to pending/
+        done/<job>.json      result of a successful job
+        failed/<job>.json    result of a failed job
+    A job is claimed by renaming it from pending/ to leased/, which succeeds for
+    exactly one worker. Leases whose heartbeat is older than lease_timeout are
+    put back into pending/, so a job may run more than once but is never lost.
+    """
+
+    STATES = ('pending', 'leased', 'done', 'failed', 'reclaim')
+
+    def __init__(self, spool_dir: str, lease_timeout: float = 120.0, max_attempts: int = 3):
+        self.spool_dir = spool_dir
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.file_manager = FileManager()
+        for state in self.STATES:
+            os.makedirs(self._dir(state), exist_ok=True)
+
+    def submit(self, job: Dict[str, Any]) -> str:
+        """Add a job (as produced by BatchScheduler.load_manifest) to the queue"""
+        job = dict(job)
+        job.setdefault('attempts', 0)
+        name = f"{self.file_manager.get_safe_filename(job['id'])}.json"
+        self._write_atomic(self._dir('pending'), name, job)
+        return name
+
+    def submit_manifest(self, manifest_path: str) -> List[str]:
+        """Add every job from a batch manifest"""
+        return [self.submit(job) for job in BatchScheduler().load_manifest(manifest_path)]
+
+    def status(self) -> Dict[str, int]:
+        """Number of jobs in each state"""
+        return {state: len(self._job_files(state)) for state in ('pending', 'leased', 'done', 'failed')}
+
+    def claim(self) -> Optional[str]:
+        """
+        Try to lease a pending job
+        Returns the lease path, or None if nothing could be claimed
+        """
+        names = self._job_files('pending')
+        # Different starting points keep many workers from racing for the same file
+        random.shuffle(names)
+
+        for name in names:
+            pending_path = os.path.join(self._dir('pending'), name)
+            lease_path = os.path.join(self._dir('leased'), name)
+            try:
+                # Dated before the rename, so the lease never shows up with a stale heartbeat
+                os.utime(pending_path, None)
+                os.rename(pending_path, lease_path)
+            except OSError:
+                continue  # Another worker got it first
+            if not self.heartbeat(lease_path):
+                # Stalled past the lease timeout between the two steps and was reclaimed
+                return None
+            return lease_path
+
+        return None
+
+    def heartbeat(self, lease_path: str) -> bool:
+        """Refresh a lease; returns False if the lease has been lost"""
+        try:
+            os.utime(lease_path, None)
+            return True
+        except OSError:
+            return False
+
+    def complete(self, lease_path: str, result: Dict[str, Any]):
+        """Publish a job's result and release its lease"""
+        state = 'done' if result.get('status') == 'done' else 'failed'
+        self._write_atomic(self._dir(state), os.path.basename(lease_path), result)
+        try:
+            os.remove(lease_path)
+        except OSError:
+            pass  # Lease expired and was reclaimed; the result stands
+
+    def reclaim_expired(self) -> int:
+        """Return leases with stale heartbeats to pending; returns how many"""
+        now = self._filesystem_now()
+        reclaimed = self._sweep_reclaims(now)
+
+        for name in self._job_files('leased'):
+            lease_path = os.path.join(self._dir('leased'), name)
+            try:
+                if now - os.stat(lease_path).st_mtime < self.lease_timeout:
+                    continue
+                # Move aside first so only one worker handles the reclaim
+                reclaim_path = os.path.join(self._dir('reclaim'), f"{name}.{self._token()}")
+                os.rename(lease_path, reclaim_path)
+                # Dates the reclaim, so one interrupted by a crash is finished later
+                os.utime(reclaim_path, None)
+            except OSError:
+                continue
+
+            self._finish_reclaim(reclaim_path, name)
+            reclaimed += 1
+
+        return reclaimed
+
+    def _sweep_reclaims(self, now: float) -> int:
+        """Finish reclaims left in reclaim/ by workers that stopped halfway through one"""
+        with os.scandir(self._dir('reclaim')) as entries:
+            names = [entry.name for entry in entries if '.json.' in entry.name]
+
+        swept = 0
+        for entry_name in names:
+            name = entry_name[:entry_name.index('.json.') + len('.json')]
+            path = os.path.join(self._dir('reclaim'), entry_name)
+            try:
+                if now - os.stat(path).st_mtime < self.lease_timeout:
+                    continue  # Possibly still being handled
+                taken = os.path.join(self._dir('reclaim'), f"{name}.{self._token()}")
+                os.rename(path, taken)
+                os.utime(taken, None)
+            except OSError:
+                continue
+
+            self._finish_reclaim(taken, name)
+            swept += 1
+        return swept
+
+    def _finish_reclaim(self, reclaim_path: str, name: str):
+        """Put a reclaimed job back into pending/, or fail it after max_attempts"""
+        with open(reclaim_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+        job['attempts'] = job.get('attempts', 0) + 1
+
+        if job['attempts'] >= self.max_attempts:
+            result = {'id': job['id'], 'status': 'failed', 'outputs': [], 'warnings': [],
+                      'error': f"Lease expired {job['attempts']} times", 'elapsed': 0}
+            self._write_atomic(self._dir('failed'), name, result)
+        else:
+            self._write_atomic(self._dir('pending'), name, job)
+        os.remove(reclaim_path)
+
+    def _filesystem_now(self) -> float:
+        """Current time as seen by the shared storage, so host clock skew does not matter"""
+        clock_path = os.path.join(self.spool_dir, f".clock.{self._token()}")
+        try:
+            with open(clock_path, 'w'):
+                pass
+            return os.stat(clock_path).st_mtime
+        except OSError:
+            return time.time()
+        finally:
+            try:
+                os.remove(clock_path)
+            except OSError:
+                pass
+
+    def _job_files(self, state: str) -> List[str]:
+        """Names of job files in a state directory"""
+        with os.scandir(self._dir(state)) as entries:
+            return [entry.name for entry in entries if entry.name.endswith('.json')]
+
+    def _write_atomic(self, directory: str, name: str, data: Dict[str, Any]):
+        """Write JSON under a temporary name, then rename it into place"""
+        temp_path = os.path.join(directory, f".{name}.{self._token()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(directory, name))
+
+    def _token(self) -> str:
+        """Name fragment unique to this host, process and thread"""
+        return f"{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}"
+
+    def _dir(self, state: str) -> str:
+        return os.path.join(self.spool_dir, state)
+
+
+class SpoolWorker:
+    """Claims jobs from a WorkQueue and runs them with the batch job runner"""
+
+    def __init__(self, queue: WorkQueue, heartbeat_interval: Optional[float] = None,
+                 poll_interval: float = 2.0):
+        self.queue = queue
+        self.heartbeat_interval = heartbeat_interval or queue.lease_timeout / 4
+        self.poll_interval = poll_interval
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False,
+            progress: Optional[Callable[[str], None]] = None) -> int:
+        """
+        Process jobs until max_jobs have run, or the queue is empty and exit_when_idle is set
+        Returns the number of jobs run
+        """
+        jobs_run = 0
+
+        while max_jobs is None or jobs_run < max_jobs:
+            self.queue.reclaim_expired()
+            lease_path = self.queue.claim()
+
+            if lease_path is None:
+                counts = self.queue.status()
+                if exit_when_idle and counts['pending'] == 0 and counts['leased'] == 0:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            result = self.run_leased_job(lease_path)
+            if result['status'] == 'lost':
+                continue  # Reclaimed by another worker before it started; it runs from pending/
+            jobs_run += 1
+            if progress:
+                progress(f"[{result['status']}] {result['id']} ({result['elapsed']}s)"
+                         + (f": {result['error']}" if result.get('error') else ""))
+
+        return jobs_run
+
+    def run_leased_job(self, lease_path: str) -> Dict[str, Any]:
+        """
+        Run one leased job while a background thread keeps its lease alive
+        A lease that was reclaimed before the job could be read gives a "lost" result
+        """
+        try:
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return {'id': os.path.splitext(os.path.basename(lease_path))[0], 'status': 'lost',
+                    'outputs': [], 'warnings': [], 'error': "Lease lost before the job started",
+                    'elapsed': 0}
+
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.heartbeat_interval):
+                if not self.queue.heartbeat(lease_path):
+                    break
+
+        heartbeat_thread = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat_thread.start()
+        try:
+            result = run_batch_job(job)
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+
+        result['worker'] = f"{socket.gethostname()}:{os.getpid()}"
+        self.queue.complete(lease_path, result)
+        return result
@@ -6,11 +6,22 @@ Handles all user interface components and interactions
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import traceback
+import threading
+import queue
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from core.fcpxml_generator import FCPXMLBuilder
 from core.timecode_parser import TimecodeParser
 from core.video_analyzer import VideoAnalyzer
+from core.cut_normalizer import CutNormalizer
+from core.ingest import ingest_registry
+from core.preflight import PreflightChecker
+from core.audio_sync import AudioSync
+from core.silence_detector import SilenceDetector
+from core.scene_detector import SceneDetector
+from core.keyframe_index import KeyframeIndex
+from core.thumbnailer import Thumbnailer
 from utils.file_helpers import FileManager
 
 
@@ -27,6 +38,12 @@ class FCPXMLGeneratorApp:
         self.fcpxml_builder = FCPXMLBuilder()
         self.parser = TimecodeParser()
         self.video_analyzer = VideoAnalyzer()
+        self.cut_normalizer = CutNormalizer()
+        self.ingest_registry = ingest_registry
+        self.preflight = PreflightChecker(self.video_analyzer)
+        self.audio_sync = AudioSync()
+        self.silence_detector = SilenceDetector()
+        self.scene_detector = SceneDetector(video_analyzer=self.video_analyzer)
         self.file_manager = FileManager()
         
         # Initialize variables
@@ -41,12 +58,20 @@ class FCPXMLGeneratorApp:
         self.fps = tk.StringVar(value="30")
         self.auto_fps = tk.BooleanVar(value=True)
         self.detected_fps = None
+        self.fps_detection_path = None
         self.source_video_path = tk.StringVar(value="")
         self.fcpxml_filename = tk.StringVar(value="")
-        self.input_type = tk.StringVar(value="json")
+        self.input_type = tk.StringVar(value="auto")
         self.include_audio = tk.BooleanVar(value=True)
         self.multi_video_mode = tk.BooleanVar(value=False)
+        self.normalize_cuts = tk.BooleanVar(value=False)
+        self.sync_audio = tk.BooleanVar(value=False)
+        self.snap_keyframes = tk.BooleanVar(value=False)
         self.video_files = []
+        self.video_checks = queue.Queue()
+        self.video_checks_pending = 0
+        self.video_check_poll_id = None
+        self.video_check_executor = ThreadPoolExecutor(max_workers=4)
         self.cuts_data = []
         self.status_label = None
     
@@ -107,10 +132,11 @@ No more reel name confusion - uses direct file references!"""
         step1_frame = ttk.LabelFrame(parent, text="Step 1: Choose Input Type", padding="10")
         step1_frame.pack(fill="x", pady=(0, 10))
         
-        ttk.Radiobutton(step1_frame, text="JSON file", 
-                       variable=self.input_type, value="json").pack(anchor="w")
-        ttk.Radiobutton(step1_frame, text="Text file with timecodes", 
-                       variable=self.input_type, value="text").pack(anchor="w")
+        ttk.Radiobutton(step1_frame, text="Auto-detect from file contents", 
+                       variable=self.input_type, value="auto").pack(anchor="w")
+        for plugin in self.ingest_registry.plugins():
+            ttk.Radiobutton(step1_frame, text=plugin.label, 
+                           variable=self.input_type, value=plugin.name).pack(anchor="w")
     
     def _create_file_selection(self, parent):
         """Create cut list file selection"""
@@ -125,6 +151,21 @@ No more reel name confusion - uses direct file references!"""
         
         select_cuts_button = ttk.Button(cuts_file_frame, text="Browse Cut List", command=self.select_cuts_file)
         select_cuts_button.pack(side="right")
+        
+        silence_button = ttk.Button(cuts_file_frame, text="Detect from Silence", command=self.detect_silence_cuts)
+        silence_button.pack(side="right", padx=(0, 5))
+        
+        scenes_button = ttk.Button(cuts_file_frame, text="Detect Scenes", command=self.detect_scene_cuts)
+        scenes_button.pack(side="right", padx=(0, 5))
+        self.detector_buttons = [silence_button, scenes_button]
+        
+        normalize_check = ttk.Checkbutton(step2_frame, text="Clean up cuts (snap to frames, merge overlaps)", 
+                                        variable=self.normalize_cuts)
+        normalize_check.pack(anchor="w", pady=(10, 0))
+        
+        keyframes_check = ttk.Checkbutton(step2_frame, text="Snap cut starts to nearby keyframes (long-GOP camera files)", 
+                                        variable=self.snap_keyframes)
+        keyframes_check.pack(anchor="w")
     
     def _create_video_selection(self, parent):
         """Create video selection section"""
@@ -158,16 +199,38 @@ No more reel name confusion - uses direct file references!"""
         multi_buttons_frame = ttk.Frame(self.multi_video_frame)
         multi_buttons_frame.pack(fill="x")
         
-        add_video_button = ttk.Button(multi_buttons_frame, text="Add Video File", command=self.add_video_file)
+        add_video_button = ttk.Button(multi_buttons_frame, text="Add Video Files", command=self.add_video_file)
         add_video_button.pack(side="left", padx=(0, 10))
         
+        add_folder_button = ttk.Button(multi_buttons_frame, text="Add Folder", command=self.add_video_folder)
+        add_folder_button.pack(side="left", padx=(0, 10))
+        
+        remove_videos_button = ttk.Button(multi_buttons_frame, text="Remove Selected", command=self.remove_selected_videos)
+        remove_videos_button.pack(side="left", padx=(0, 10))
+        
         clear_videos_button = ttk.Button(multi_buttons_frame, text="Clear All", command=self.clear_video_files)
         clear_videos_button.pack(side="left")
         
-        # Video list
+        sync_check = ttk.Checkbutton(self.multi_video_frame, text="Sync angles by audio (cameras started at different times)",
+                                   variable=self.sync_audio)
+        sync_check.pack(anchor="w", pady=(10, 0))
+        
+        # Video list; rows are filled in as background checks finish
         self.video_list_frame = ttk.Frame(self.multi_video_frame)
         self.video_list_frame.pack(fill="x", pady=(10, 0))
         
+        video_scrollbar = ttk.Scrollbar(self.video_list_frame)
+        video_scrollbar.pack(side="right", fill="y")
+        
+        self.video_tree = ttk.Treeview(self.video_list_frame, columns=("name", "status", "fps", "duration"),
+                                       show="headings", height=6, yscrollcommand=video_scrollbar.set)
+        for column, title, width in (("name", "File", 220), ("status", "Status", 110),
+                                     ("fps", "FPS", 50), ("duration", "Duration", 70)):
+            self.video_tree.heading(column, text=title)
+            self.video_tree.column(column, width=width, stretch=(column == "name"))
+        self.video_tree.pack(side="left", fill="x", expand=True)
+        video_scrollbar.config(command=self.video_tree.yview)
+        
         help_label = ttk.Label(step3_frame, text="💡 Multi-camera mode creates separate FCPXML files with identical cuts!", 
                               foreground="blue", font=("Arial", 9))
         help_label.pack(anchor="w", pady=(10, 0))
@@ -245,8 +308,8 @@ No more reel name confusion - uses direct file references!"""
     
     def _create_action_buttons(self, parent):
         """Create main action buttons"""
-        generate_button = ttk.Button(parent, text="Generate FCPXML File", command=self.generate_fcpxml)
-        generate_button.pack(pady=(20, 10))
+        self.generate_button = ttk.Button(parent, text="Generate FCPXML File", command=self.generate_fcpxml)
+        self.generate_button.pack(pady=(20, 10))
     
     def _create_status_section(self, parent):
         """Create status display section"""
@@ -281,10 +344,13 @@ No more reel name confusion - uses direct file references!"""
     
     def select_cuts_file(self):
         """Handle cut list file selection"""
-        if self.input_type.get() == "json":
-            filetypes = [("JSON files", "*.json"), ("All files", "*.*")]
+        plugin = self.ingest_registry.get(self.input_type.get())
+        if plugin:
+            patterns = " ".join(f"*{ext}" for ext in plugin.extensions)
+            filetypes = [(plugin.label, patterns), ("All files", "*.*")]
         else:
-            filetypes = [("Text files", "*.txt"), ("All files", "*.*")]
+            patterns = " ".join(f"*{ext}" for ext in self.ingest_registry.get_extensions())
+            filetypes = [("Cut lists", patterns), ("All files", "*.*")]
         
         file_path = filedialog.askopenfilename(
             title="Select your cut list file",
@@ -309,6 +375,90 @@ No more reel name confusion - uses direct file references!"""
                 base_name = os.path.splitext(filename)[0]
                 self.fcpxml_filename.set(f"{base_name}_timeline")
     
+    def detect_silence_cuts(self):
+        """Build a cut list that removes the silent parts of a recording"""
+        file_path = filedialog.askopenfilename(
+            title="Select the recording to remove silence from",
+            filetypes=[
+                ("Media files", "*.mp4 *.mov *.avi *.mkv *.mxf *.m4v *.wav *.mp3 *.m4a *.aac"),
+                ("All files", "*.*")
+            ]
+        )
+        if file_path:
+            self.run_cut_detector(file_path, self.silence_detector.detect_cuts, "Detecting silence in",
+                                  "Silence removed", "No sound found above the silence threshold.")
+    
+    def detect_scene_cuts(self):
+        """Build a cut list with one cut per scene of a video"""
+        file_path = filedialog.askopenfilename(
+            title="Select the video to split into scenes",
+            filetypes=[
+                ("Video files", "*.mp4 *.mov *.avi *.mkv *.mxf *.prores *.m4v"),
+                ("All files", "*.*")
+            ]
+        )
+        if file_path:
+            self.run_cut_detector(file_path, self.scene_detector.detect_cuts, "Detecting scenes in",
+                                  "Scenes", "No scenes found.")
+    
+    def run_cut_detector(self, file_path, detect_cuts, busy_text, done_text, empty_text):
+        """Run an automatic cut generator on a background thread and use its cuts"""
+        filename = os.path.basename(file_path)
+        for button in self.detector_buttons:
+            button.config(state="disabled")
+        self.status_label.config(text=f"{busy_text} {filename}...", foreground="blue")
+        
+        def finish(outcome):
+            for button in self.detector_buttons:
+                button.config(state="normal")
+            if 'error' in outcome:
+                self.status_label.config(text=f"Detection failed: {outcome['error']}", foreground="red")
+                return
+            if not outcome['result']:
+                self.status_label.config(text=empty_text, foreground="orange")
+                return
+            
+            self.input_file = file_path
+            self.cuts_data = outcome['result']
+            self.cuts_file_label.config(text=f"{done_text}: {filename} ({len(self.cuts_data)} cuts)", foreground="black")
+            self.reorder_button.config(state="normal")
+            
+            # The analyzed file is usually also the source video
+            if not self.multi_video_mode.get() and not self.source_video_path.get():
+                self.source_video_path.set(file_path)
+                self.video_file_label.config(text=f"Selected: {filename}", foreground="black")
+                self.update_fps_from_video(file_path)
+            if not self.fcpxml_filename.get():
+                self.fcpxml_filename.set(f"{os.path.splitext(filename)[0]}_timeline")
+            self.update_status()
+        
+        # Decoding a long recording takes a while, so keep Tk responsive
+        self.run_in_background(lambda: detect_cuts(file_path), finish)
+    
+    def run_in_background(self, work, done):
+        """
+        Run work() on a background thread and pass its outcome to done() on the Tk thread
+        The outcome dict holds 'result', or 'error' if work raised
+        """
+        outcome = {}
+        
+        def target():
+            try:
+                outcome['result'] = work()
+            except Exception as e:
+                outcome['error'] = e
+        
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        
+        def poll():
+            if worker.is_alive():
+                self.root.after(100, poll)
+                return
+            done(outcome)
+        
+        self.root.after(100, poll)
+    
     def select_video_file(self):
         """Handle single video file selection"""
         filetypes = [
@@ -331,69 +481,146 @@ No more reel name confusion - uses direct file references!"""
             self.update_status()
     
     def add_video_file(self):
-        """Add a video file to the multi-video list"""
+        """Add one or more video files to the multi-video list"""
         filetypes = [
             ("Video files", "*.mp4 *.mov *.avi *.mkv *.mxf *.prores *.m4v"),
             ("All files", "*.*")
         ]
         
-        file_path = filedialog.askopenfilename(
-            title="Select video file to add",
+        file_paths = filedialog.askopenfilenames(
+            title="Select video files to add",
             filetypes=filetypes
         )
         
-        if file_path and file_path not in self.video_files:
+        if file_paths:
+            self.add_video_files(file_paths)
+    
+    def add_video_folder(self):
+        """Add every supported video file in a folder and its subfolders"""
+        folder = filedialog.askdirectory(title="Select a folder of camera angles")
+        if not folder:
+            return
+        
+        file_paths = []
+        for directory, subdirectories, filenames in os.walk(folder):
+            subdirectories.sort()
+            file_paths.extend(os.path.join(directory, filename) for filename in sorted(filenames)
+                              if self.video_analyzer.is_supported_format(filename))
+        
+        if file_paths:
+            self.add_video_files(file_paths)
+        else:
+            self.status_label.config(text="No supported video files found in that folder.", foreground="orange")
+    
+    def add_video_files(self, file_paths):
+        """Append new rows right away and check the files in the background"""
+        known = set(self.video_files)
+        for file_path in file_paths:
+            if file_path in known:
+                continue
+            known.add(file_path)
             self.video_files.append(file_path)
+            self.video_tree.insert("", "end", iid=file_path,
+                                   values=(os.path.basename(file_path), "Checking...", "", ""))
+            future = self.video_check_executor.submit(self.check_video_file, file_path)
+            future.add_done_callback(lambda f, fp=file_path: self.video_checks.put((fp, f.result())))
+            self.video_checks_pending += 1
+        
+        if self.video_checks_pending and not self.video_check_poll_id:
+            self.video_check_poll_id = self.root.after(100, self.poll_video_checks)
+        self.update_status()
+    
+    def check_video_file(self, file_path):
+        """Worker: validate a video file (runs on the check pool)"""
+        if not self.video_analyzer.is_supported_format(file_path):
+            return {'status': "Unsupported format"}
+        
+        try:
+            result = self.video_analyzer.validate_video_file(file_path)
+        except Exception as e:
+            return {'status': f"Error: {e}"}
+        
+        if not result['valid']:
+            return {'status': result['error'] or "Invalid"}
+        return {
+            'status': "Variable FPS" if result['vfr'] else "OK",
+            'fps': result['fps'] or "?",
+            'duration': self.parser.seconds_to_display_timecode(result['duration']) if result['duration'] else "?",
+        }
+    
+    def poll_video_checks(self):
+        """Fill in rows whose checks have finished; only those rows are touched"""
+        self.video_check_poll_id = None
+        while True:
+            try:
+                file_path, check = self.video_checks.get_nowait()
+            except queue.Empty:
+                break
+            self.video_checks_pending -= 1
+            if not self.video_tree.exists(file_path):
+                continue  # Removed while it was being checked
+            self.video_tree.set(file_path, "status", check['status'])
+            self.video_tree.set(file_path, "fps", check.get('fps', ""))
+            self.video_tree.set(file_path, "duration", check.get('duration', ""))
             
-            # Auto-detect FPS from first video if enabled
-            if len(self.video_files) == 1:
+            # Auto-detect FPS from the first video; its probe is cached by now
+            if self.video_files and file_path == self.video_files[0] and 'fps' in check:
                 self.update_fps_from_video(file_path)
-            
-            self.refresh_video_list()
-            self.update_status()
+        
+        if self.video_checks_pending > 0:
+            self.video_check_poll_id = self.root.after(100, self.poll_video_checks)
     
     def clear_video_files(self):
         """Clear all video files"""
         self.video_files = []
-        self.refresh_video_list()
+        self.video_tree.delete(*self.video_tree.get_children())
         self.update_status()
     
-    def remove_video_file(self, file_path):
-        """Remove a specific video file"""
-        if file_path in self.video_files:
-            self.video_files.remove(file_path)
-            self.refresh_video_list()
-            self.update_status()
-    
-    def refresh_video_list(self):
-        """Refresh the display of video files"""
-        # Clear existing widgets
-        for widget in self.video_list_frame.winfo_children():
-            widget.destroy()
+    def remove_selected_videos(self):
+        """Remove the selected rows from the multi-video list"""
+        selected = set(self.video_tree.selection())
+        if not selected:
+            return
         
-        if not self.video_files:
-            no_files_label = ttk.Label(self.video_list_frame, text="No video files added", foreground="gray")
-            no_files_label.pack(anchor="w")
-        else:
-            for i, file_path in enumerate(self.video_files, 1):
-                file_frame = ttk.Frame(self.video_list_frame)
-                file_frame.pack(fill="x", pady=2)
-                
-                filename = os.path.basename(file_path)
-                file_label = ttk.Label(file_frame, text=f"{i}. {filename}")
-                file_label.pack(side="left", fill="x", expand=True)
-                
-                remove_button = ttk.Button(file_frame, text="Remove", 
-                                         command=lambda fp=file_path: self.remove_video_file(fp))
-                remove_button.pack(side="right")
+        self.video_files = [file_path for file_path in self.video_files if file_path not in selected]
+        self.video_tree.delete(*selected)
+        self.update_status()
     
     def update_fps_from_video(self, video_path):
-        """Update FPS based on video file"""
+        """Detect the frame rate of a video on a worker thread and show it when ready"""
+        if not self.auto_fps.get():
+            return
+        
+        self.fps_detection_path = video_path
+        self.fps_status_label.config(text=f"🔍 Detecting frame rate of {os.path.basename(video_path)}...", foreground="blue")
+        # A cold detection probes the file and scans windows of its frame timestamps
+        future = self.video_check_executor.submit(self.video_analyzer.detect_frame_rate, video_path)
+        
+        def finish():
+            if not future.done():
+                self.root.after(100, finish)
+                return
+            if self.fps_detection_path != video_path or not self.auto_fps.get():
+                return  # Another video was picked, or auto-detection turned off, in the meantime
+            try:
+                detection = future.result()
+            except Exception:
+                detection = {'fps': None, 'warning': None}
+            self.show_detected_fps(detection)
+        
+        self.root.after(100, finish)
+    
+    def show_detected_fps(self, detection):
+        """Use a frame rate detection result and show it next to the FPS options"""
         if self.auto_fps.get():
-            detected_fps = self.video_analyzer.detect_fps(video_path)
+            detected_fps = detection['fps']
             if detected_fps:
                 self.detected_fps = detected_fps
-                self.fps_status_label.config(text=f"✅ Detected: {detected_fps} fps from video", foreground="green")
+                if detection['warning']:
+                    self.fps_status_label.config(
+                        text=f"⚠️ Variable frame rate: using the measured average of {detected_fps} fps", foreground="orange")
+                else:
+                    self.fps_status_label.config(text=f"✅ Detected: {detected_fps} fps from video", foreground="green")
             else:
                 self.detected_fps = "30"  # fallback
                 self.fps_status_label.config(text="⚠️ Could not detect FPS, using 30 fps default", foreground="orange")
@@ -435,10 +662,15 @@ No more reel name confusion - uses direct file references!"""
     
     def load_cuts_data(self):
         """Load cuts data from file"""
-        if self.input_type.get() == "json":
-            return self.parser.load_from_json(self.input_file)
-        else:
-            return self.parser.load_from_text(self.input_file)
+        input_type = self.input_type.get()
+        cuts = self.ingest_registry.load(
+            self.input_file, None if input_type == "auto" else input_type, self.get_effective_fps()
+        )
+        
+        if self.normalize_cuts.get():
+            cuts = self.cut_normalizer.normalize(cuts, self.get_effective_fps())
+        
+        return cuts
     
     def show_reorder_window(self):
         """Show cut reordering window"""
@@ -447,25 +679,49 @@ No more reel name confusion - uses direct file references!"""
             
         reorder_window = tk.Toplevel(self.root)
         reorder_window.title("Reorder Cuts")
-        reorder_window.geometry("500x400")
+        reorder_window.geometry("560x500")
         
         # Instructions
         ttk.Label(reorder_window, text="Use buttons to reorder cuts:", 
                  font=("Arial", 12)).pack(pady=10)
         
-        # Listbox frame
+        # Cut list frame
         list_frame = ttk.Frame(reorder_window)
         list_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
-        # Listbox with scrollbar
+        # Thumbnails come from the source video, or the first angle in multi-camera mode
+        if self.multi_video_mode.get():
+            self.thumbnail_video = self.video_files[0] if self.video_files else None
+        else:
+            self.thumbnail_video = self.source_video_path.get() or None
+        self.thumbnailer = Thumbnailer() if self.thumbnail_video else None
+        self.thumbnail_images = {}
+        self.thumbnail_rows = {}
+        self.thumbnail_update_id = None
+        
+        style = ttk.Style(reorder_window)
+        style.configure("Cuts.Treeview", rowheight=60 if self.thumbnailer else 20)
+        
+        # Cut list with scrollbar; only rows scrolled into view get thumbnails
         scrollbar = ttk.Scrollbar(list_frame)
         scrollbar.pack(side="right", fill="y")
         
-        self.cuts_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set)
-        self.cuts_listbox.pack(side="left", fill="both", expand=True)
-        scrollbar.config(command=self.cuts_listbox.yview)
-        
-        # Populate listbox
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.schedule_thumbnail_update()
+        
+        self.cuts_tree = ttk.Treeview(list_frame, columns=("range", "duration"), show="tree headings",
+                                      selectmode="browse", style="Cuts.Treeview", yscrollcommand=on_scroll)
+        self.cuts_tree.heading("#0", text="Cut")
+        self.cuts_tree.heading("range", text="Source range")
+        self.cuts_tree.heading("duration", text="Duration")
+        self.cuts_tree.column("#0", width=160 if self.thumbnailer else 60, stretch=False)
+        self.cuts_tree.column("range", width=200)
+        self.cuts_tree.column("duration", width=80, anchor="e")
+        self.cuts_tree.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=self.cuts_tree.yview)
+        
+        # Populate cut list
         self.refresh_cuts_list()
         
         # Buttons
@@ -480,40 +736,133 @@ No more reel name confusion - uses direct file references!"""
         ttk.Button(reorder_window, text="Apply & Close", 
                   command=lambda: self.close_reorder_window(reorder_window)).pack(pady=10)
         
+        def on_destroy(event):
+            if event.widget is reorder_window and self.thumbnailer:
+                self.thumbnailer.close()
+                self.thumbnailer = None
+        
+        reorder_window.bind("<Destroy>", on_destroy)
+        if self.thumbnailer:
+            self.root.after(50, self.poll_thumbnails)
+        
         # Store original order
         self.original_cuts = self.cuts_data.copy()
     
     def refresh_cuts_list(self):
         """Refresh the cuts display"""
-        self.cuts_listbox.delete(0, tk.END)
-        for i, cut in enumerate(self.cuts_data, 1):
-            duration = cut['end'] - cut['start']
-            start_tc = self.parser.seconds_to_display_timecode(cut['start'])
-            end_tc = self.parser.seconds_to_display_timecode(cut['end'])
-            display = f"{i:2d}. {start_tc} - {end_tc} ({duration:.1f}s)"
-            self.cuts_listbox.insert(tk.END, display)
+        self.cuts_tree.delete(*self.cuts_tree.get_children())
+        self.thumbnail_rows = {}
+        for i in range(len(self.cuts_data)):
+            self.cuts_tree.insert("", "end", iid=str(i))
+            self.fill_cut_row(i)
+        self.schedule_thumbnail_update()
+    
+    def fill_cut_row(self, index):
+        """Show a cut's details (and thumbnail, if already loaded) in its row"""
+        cut = self.cuts_data[index]
+        duration = cut['end'] - cut['start']
+        start_tc = self.parser.seconds_to_display_timecode(cut['start'])
+        end_tc = self.parser.seconds_to_display_timecode(cut['end'])
+        
+        image = self.thumbnail_images.get(self.thumbnail_key(cut), "")
+        self.cuts_tree.item(str(index), text=f"{index + 1:2d}.", image=image,
+                            values=(f"{start_tc} - {end_tc}", f"{duration:.1f}s"))
+        if image:
+            self.thumbnail_rows[str(index)] = True
+        else:
+            self.thumbnail_rows.pop(str(index), None)
+    
+    def thumbnail_key(self, cut):
+        """Video and time of the frame shown for a cut: just inside its start"""
+        return (self.thumbnail_video, round(cut['start'] + min(1.0, (cut['end'] - cut['start']) / 2), 3))
+    
+    def visible_cut_rows(self, margin=5):
+        """Range of row indices currently in view, plus a margin"""
+        first, last = self.cuts_tree.yview()
+        count = len(self.cuts_data)
+        return range(max(0, int(first * count) - margin), min(count, int(last * count) + 1 + margin))
+    
+    def schedule_thumbnail_update(self):
+        """Coalesce scroll events into one thumbnail update"""
+        if not getattr(self, 'thumbnailer', None) or self.thumbnail_update_id:
+            return
+        self.thumbnail_update_id = self.root.after(30, self.update_visible_thumbnails)
+    
+    def update_visible_thumbnails(self):
+        """Request thumbnails for visible rows and release those scrolled away"""
+        self.thumbnail_update_id = None
+        if not self.thumbnailer or not self.cuts_tree.winfo_exists():
+            return
+        
+        visible = self.visible_cut_rows()
+        wanted = {}
+        for index in visible:
+            wanted.setdefault(self.thumbnail_key(self.cuts_data[index]), []).append(index)
+        
+        # Rows out of view give up their images so memory does not grow with the list
+        for iid in [iid for iid in self.thumbnail_rows if int(iid) not in visible]:
+            self.cuts_tree.item(iid, image="")
+            del self.thumbnail_rows[iid]
+        self.thumbnail_images = {key: image for key, image in self.thumbnail_images.items() if key in wanted}
+        
+        self.thumbnailer.retain(wanted)
+        for key, indices in wanted.items():
+            if key in self.thumbnail_images:
+                for index in indices:
+                    self.fill_cut_row(index)
+            else:
+                self.thumbnailer.request(*key)
+    
+    def poll_thumbnails(self):
+        """Show thumbnails finished by the worker threads"""
+        if not self.thumbnailer:
+            return
+        
+        try:
+            visible = self.visible_cut_rows()
+            while True:
+                video_path, time, path = self.thumbnailer.results.get_nowait()
+                key = (video_path, time)
+                if not path or key in self.thumbnail_images:
+                    continue
+                rows = [index for index in visible if self.thumbnail_key(self.cuts_data[index]) == key]
+                if not rows:
+                    continue
+                self.thumbnail_images[key] = tk.PhotoImage(file=path)
+                for index in rows:
+                    self.fill_cut_row(index)
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            return  # Window closed, or an unreadable image
+        
+        self.root.after(50, self.poll_thumbnails)
     
     def move_up(self):
         """Move selected cut up"""
-        selection = self.cuts_listbox.curselection()
-        if not selection or selection[0] == 0:
+        selection = self.cuts_tree.selection()
+        if not selection or selection[0] == "0":
             return
         
-        idx = selection[0]
+        idx = int(selection[0])
         self.cuts_data[idx], self.cuts_data[idx-1] = self.cuts_data[idx-1], self.cuts_data[idx]
-        self.refresh_cuts_list()
-        self.cuts_listbox.selection_set(idx-1)
+        self.fill_cut_row(idx)
+        self.fill_cut_row(idx-1)
+        self.cuts_tree.selection_set(str(idx-1))
+        self.cuts_tree.see(str(idx-1))
     
     def move_down(self):
         """Move selected cut down"""
-        selection = self.cuts_listbox.curselection()
-        if not selection or selection[0] == len(self.cuts_data) - 1:
+        selection = self.cuts_tree.selection()
+        if not selection or int(selection[0]) == len(self.cuts_data) - 1:
             return
         
-        idx = selection[0]
+        idx = int(selection[0])
         self.cuts_data[idx], self.cuts_data[idx+1] = self.cuts_data[idx+1], self.cuts_data[idx]
-        self.refresh_cuts_list()
-        self.cuts_listbox.selection_set(idx+1)
+        self.fill_cut_row(idx)
+        self.fill_cut_row(idx+1)
+        self.cuts_tree.selection_set(str(idx+1))
+        self.cuts_tree.see(str(idx+1))
     
     def reset_order(self):
         """Reset to original order"""
@@ -550,25 +899,63 @@ No more reel name confusion - uses direct file references!"""
                 cuts = self.cuts_data
             else:
                 cuts = self.load_cuts_data()
-            
             fps = self.get_effective_fps()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error generating FCPXML: {str(e)}")
+            print(f"Full error: {traceback.format_exc()}")
+            return
+        
+        if self.multi_video_mode.get() and self.sync_audio.get():
+            self.compute_sync_offsets(
+                video_sources, lambda offsets: self.write_fcpxml(cuts, video_sources, fps, offsets)
+            )
+        elif self.snap_keyframes.get() and not self.multi_video_mode.get():
+            # Multi-camera angles have their own GOPs, so only a single source is snapped
+            self.snap_to_keyframes(
+                cuts, video_sources[0], lambda snapped: self.write_fcpxml(snapped, video_sources, fps, None)
+            )
+        else:
+            self.write_fcpxml(cuts, video_sources, fps, None)
+    
+    def write_fcpxml(self, cuts, video_sources, fps, offsets):
+        """Check the cuts of every angle, then write the FCPXML and debug files"""
+        try:
             is_multi_cam = self.multi_video_mode.get()
             
+            # Check cut bounds against the real source durations before writing anything,
+            # with each angle's cuts shifted by its sync offset
+            angles = [(self.fcpxml_builder.shift_cuts(cuts, (offsets or {}).get(path)), path)
+                      for path in video_sources]
+            preflight = self.preflight.check_angles(angles, fps)
+            if preflight['out_of_range']:
+                proceed = messagebox.askyesno(
+                    "Cuts Past End of Video",
+                    "Some cuts end after their source video:\n\n"
+                    f"{self.preflight.format_report(preflight)}\n\nGenerate anyway?"
+                )
+                if not proceed:
+                    self.status_label.config(text="Generation cancelled: cuts out of range.", foreground="orange")
+                    return
+            source_durations = preflight['durations']
+            
             # Generate FCPXML files
             if is_multi_cam:
                 results = self.fcpxml_builder.generate_multi_fcpxml(
-                    cuts, video_sources, fps, self.include_audio.get()
+                    cuts, video_sources, fps, self.include_audio.get(),
+                    source_durations=source_durations, offsets=offsets
                 )
                 generated_files = self.file_manager.save_multiple_fcpxml(
                     results, self.input_file
                 )
             else:
-                fcpxml_content = self.fcpxml_builder.generate_single_fcpxml(
+                # Written as it is generated rather than joined into one string first
+                fcpxml_chunks = self.fcpxml_builder.iter_single_fcpxml(
                     cuts, video_sources[0], fps, self.include_audio.get(),
-                    self.fcpxml_filename.get() or 'Timeline'
+                    self.fcpxml_filename.get() or 'Timeline',
+                    source_duration=source_durations.get(video_sources[0])
                 )
-                generated_files = [self.file_manager.save_single_fcpxml(
-                    fcpxml_content, self.input_file, self.fcpxml_filename.get()
+                generated_files = [self.file_manager.save_single_fcpxml_stream(
+                    fcpxml_chunks, self.input_file, self.fcpxml_filename.get()
                 )]
             
             # Create debug file
@@ -584,6 +971,55 @@ No more reel name confusion - uses direct file references!"""
             messagebox.showerror("Error", f"Error generating FCPXML: {str(e)}")
             print(f"Full error: {traceback.format_exc()}")
     
+    def snap_to_keyframes(self, cuts, video_path, done):
+        """Move cut starts onto nearby keyframes, reading the index on a background thread"""
+        self.generate_button.config(state="disabled")
+        self.status_label.config(text="Reading keyframes...", foreground="blue")
+        
+        def finish(outcome):
+            self.generate_button.config(state="normal")
+            index = outcome.get('result')
+            if index is None:
+                messagebox.showwarning("Keyframes Unknown", "Could not read keyframes (is ffprobe installed?). Cuts were not snapped.")
+                done(cuts)
+            else:
+                done(index.snap_cuts(cuts))
+        
+        # Indexing reads every packet of the file, so keep Tk responsive
+        self.run_in_background(lambda: KeyframeIndex.for_video(video_path, self.video_analyzer), finish)
+    
+    def compute_sync_offsets(self, video_sources, done):
+        """
+        Find each angle's start offset from its audio on a background thread
+        done receives {video_path: offset}; it is not called if sync fails or the user cancels
+        """
+        self.generate_button.config(state="disabled")
+        self.status_label.config(text="Syncing angles by audio...", foreground="blue")
+        
+        def finish(outcome):
+            self.generate_button.config(state="normal")
+            if 'error' in outcome:
+                messagebox.showerror("Error", f"Audio sync failed: {outcome['error']}")
+                self.status_label.config(text="Generation cancelled: audio sync failed.", foreground="red")
+                return
+            
+            results = outcome['result']
+            unreliable = [os.path.basename(path) for path, result in results.items() if not result['reliable']]
+            if unreliable:
+                proceed = messagebox.askyesno(
+                    "Audio Sync Uncertain",
+                    "No clear audio match was found for:\n\n" + "\n".join(unreliable) +
+                    "\n\nThese angles will not be shifted. Generate anyway?"
+                )
+                if not proceed:
+                    self.status_label.config(text="Generation cancelled: audio sync uncertain.", foreground="orange")
+                    return
+            
+            done({path: result['offset'] for path, result in results.items() if result['reliable']})
+        
+        # Cross-correlating every angle's audio takes a while, so keep Tk responsive
+        self.run_in_background(lambda: self.audio_sync.compute_offsets(video_sources), finish)
+    
     def show_success_message(self, generated_files, debug_path, cuts, is_multi_cam):
         """Show success message with appropriate details"""
         audio_info = "with audio" if self.include_audio.get() else "video only"
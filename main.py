@@ -6,15 +6,158 @@ Entry point for the application
 
 import sys
 import os
+import argparse
+import multiprocessing
 
 # Add the current directory to the Python path so we can import our modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from gui.main_window import FCPXMLGeneratorApp
+def parse_args():
+    """Parse command line options; without any the GUI is started"""
+    parser = argparse.ArgumentParser(description="FCPXML Generator for DaVinci Resolve")
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help="run the jobs in a JSON/TOML batch manifest without the GUI")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default: one per core)")
+    parser.add_argument('--ledger', metavar='PATH',
+                        help="ledger file used to resume an interrupted batch")
+    parser.add_argument('--spool', metavar='DIR',
+                        help="shared spool directory: with --batch, queue the jobs there instead of running them")
+    parser.add_argument('--worker', action='store_true',
+                        help="run a worker that processes jobs from the --spool directory")
+    parser.add_argument('--exit-when-idle', action='store_true',
+                        help="stop the worker once the spool has no pending or leased jobs")
+    parser.add_argument('--cuts', metavar='FILE',
+                        help="render one cut list to FCPXML without the GUI (with --video)")
+    parser.add_argument('--video', metavar='FILE',
+                        help="source video for --cuts")
+    parser.add_argument('--fps', type=float, default=None,
+                        help="frame rate for --cuts (default: detected from the video)")
+    parser.add_argument('--input-type', default=None,
+                        help="cut list format for --cuts (default: detected)")
+    parser.add_argument('--output', metavar='NAME',
+                        help="FCPXML file name for --cuts (default: <cut list>_timeline.fcpxml)")
+    parser.add_argument('--scan-library', nargs='+', metavar='ROOT',
+                        help="add folders to the media library index and bring it up to date")
+    parser.add_argument('--find-media', metavar='QUERY',
+                        help="search the media library by name or folder words")
+    parser.add_argument('--search-transcripts', metavar='QUERY',
+                        help="print the time ranges where words or \"quoted phrases\" are spoken in --transcripts")
+    parser.add_argument('--transcripts', nargs='+', metavar='FILE', default=[],
+                        help="word-timestamped transcripts (WebVTT or Whisper/Deepgram JSON) to search")
+    parser.add_argument('--serve', action='store_true',
+                        help="run the local HTTP service that returns FCPXML on request")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address the HTTP service listens on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765,
+                        help="port the HTTP service listens on (default: 8765)")
+    return parser.parse_args()
+
+def run_batch(args):
+    """Run a batch manifest from the command line"""
+    from core.batch import BatchScheduler
+    
+    scheduler = BatchScheduler(workers=args.workers)
+    results = scheduler.run(args.batch, args.ledger, progress=print)
+    failed = [result for result in results if result['status'] != 'done']
+    print(f"Finished {len(results) - len(failed)} job(s), {len(failed)} failed")
+    return 1 if failed else 0
+
+def run_spool(args):
+    """Queue a manifest into a spool directory, or work on the queued jobs"""
+    from core.work_queue import WorkQueue, SpoolWorker
+    
+    queue = WorkQueue(args.spool)
+    if args.batch:
+        submitted = queue.submit_manifest(args.batch)
+        print(f"Queued {len(submitted)} job(s) in {args.spool}")
+        return 0
+    
+    jobs_run = SpoolWorker(queue).run(exit_when_idle=args.exit_when_idle, progress=print)
+    print(f"Worker finished after {jobs_run} job(s)")
+    return 0
+
+def run_serve(args):
+    """Run the HTTP service until interrupted"""
+    from core.http_service import run_service
+    
+    run_service(args.host, args.port, args.workers)
+    return 0
+
+def run_library(args):
+    """Update or search the media library index"""
+    from core.media_library import MediaLibrary
+    
+    library = MediaLibrary()
+    if args.scan_library:
+        for root in args.scan_library:
+            library.add_root(root)
+        library.scan(probe=True, progress=print)
+    if args.find_media:
+        for entry in library.search(args.find_media):
+            print(entry['path'])
+    library.close()
+    return 0
+
+def run_render(args):
+    """Stream one cut list from its file into an FCPXML file"""
+    from core.fcpxml_generator import FCPXMLBuilder
+    from core.ingest import ingest_registry
+    from core.video_analyzer import VideoAnalyzer
+    from utils.file_helpers import FileManager
+    
+    if not args.video:
+        print("--cuts needs --video")
+        return 2
+    fps = args.fps
+    if not fps:
+        detection = VideoAnalyzer().detect_frame_rate(args.video)
+        if detection['warning']:
+            print(f"Warning: {detection['warning']}", file=sys.stderr)
+        fps = float(detection['fps'] or 30.0)
+    # Cuts are read and the document written chunk by chunk, so long lists are never held whole
+    cuts = ingest_registry.stream(args.cuts, args.input_type, fps)
+    project_name = os.path.splitext(args.output or os.path.basename(args.cuts))[0]
+    chunks = FCPXMLBuilder().iter_single_fcpxml(cuts, args.video, fps, project_name=project_name)
+    print(FileManager().save_single_fcpxml_stream(chunks, args.cuts, args.output))
+    return 0
+
+def run_transcript_search(args):
+    """Print the matching ranges of each transcript as a text cut list"""
+    from core.transcript_index import TranscriptSearch
+    
+    def timecode(seconds):
+        minutes, secs = divmod(round(seconds, 3), 60)
+        return f"{int(minutes // 60):02d}:{int(minutes % 60):02d}:{secs:06.3f}"
+    
+    search = TranscriptSearch(workers=args.workers)
+    results = search.search(args.search_transcripts, args.transcripts)
+    for path in args.transcripts:
+        if path in results:
+            print(f"{path}:")
+            for cut in results[path]:
+                print(f"{timecode(cut['start'])}-{timecode(cut['end'])}")
+    return 0 if results else 1
 
 def main():
     """Main entry point for the application"""
+    args = parse_args()
+    if args.scan_library or args.find_media:
+        sys.exit(run_library(args))
+    if args.search_transcripts:
+        sys.exit(run_transcript_search(args))
+    if args.cuts:
+        sys.exit(run_render(args))
+    if args.serve:
+        sys.exit(run_serve(args))
+    if args.spool:
+        sys.exit(run_spool(args))
+    if args.batch:
+        sys.exit(run_batch(args))
+    
     try:
+        from gui.main_window import FCPXMLGeneratorApp
+        
         app = FCPXMLGeneratorApp()
         app.run()
     except Exception as e:
@@ -27,4 +170,6 @@ def main():
         print(f"Startup error: {e}")
 
 if __name__ == "__main__":
+    # Needed for worker processes in the frozen executable
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
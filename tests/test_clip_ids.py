@@ -0,0 +1,61 @@
+"""
+Tests for FCPXML identifier strategies
+Run with: python -m unittest discover tests
+"""
+
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fcpxml_generator import FCPXMLBuilder
+
+
+CUTS = [{'start': 1.0, 'end': 2.0}, {'start': 5.0, 'end': 7.5}]
+
+
+def asset_uid(document: str) -> str:
+    return re.search(r'<asset [^>]*uid="([^"]+)"', document).group(1)
+
+
+class CounterIdTests(unittest.TestCase):
+
+    def test_documents_get_distinct_asset_uids(self):
+        builder = FCPXMLBuilder("counter")
+        first = builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="A_Timeline")
+        second = builder.generate_single_fcpxml(CUTS, "/media/b.mov", 25, project_name="B_Timeline")
+        self.assertNotEqual(asset_uid(first), asset_uid(second))
+
+    def test_documents_from_one_source_do_not_share_ids(self):
+        builder = FCPXMLBuilder("counter")
+        first = builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 1")
+        second = builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 2")
+        ids = set(re.findall(r' id="([^"]+)"', first))
+        self.assertFalse(ids & set(re.findall(r' id="([^"]+)"', second)) - {"r1"})
+
+    def test_counter_output_is_repeatable(self):
+        builder = FCPXMLBuilder("counter")
+        self.assertEqual(builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25),
+                         builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25))
+
+
+
+class HashIdTests(unittest.TestCase):
+
+    def test_documents_from_one_source_do_not_share_ids(self):
+        builder = FCPXMLBuilder("hash")
+        first = builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 1")
+        second = builder.generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 2")
+        ids = set(re.findall(r' (?:id|uid)="([^"]+)"', first))
+        self.assertFalse(ids & set(re.findall(r' (?:id|uid)="([^"]+)"', second)) - {"r1"})
+
+    def test_hash_output_is_repeatable(self):
+        first = FCPXMLBuilder("hash").generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 1")
+        second = FCPXMLBuilder("hash").generate_single_fcpxml(CUTS, "/media/a.mov", 25, project_name="Part 1")
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
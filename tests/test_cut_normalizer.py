@@ -0,0 +1,79 @@
+"""
+Tests for cut list normalization
+Run with: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cut_normalizer import CutNormalizer, np
+
+
+FPS = 25.0
+
+
+class CutNormalizerTests(unittest.TestCase):
+
+    def normalizers(self, **options):
+        """The pure-Python normalizer, and the NumPy one when NumPy is installed"""
+        paths = [('python', CutNormalizer(use_numpy=False, **options))]
+        if np is not None:
+            paths.append(('numpy', CutNormalizer(use_numpy=True, **options)))
+        return paths
+
+    def frames(self, cuts, **options):
+        for name, normalizer in self.normalizers(**options):
+            with self.subTest(path=name):
+                starts = [cut['start'] for cut in cuts]
+                ends = [cut['end'] for cut in cuts]
+                yield normalizer.normalize_frames(starts, ends, FPS)
+
+    def test_overlapping_and_touching_cuts_merge(self):
+        cuts = [{'start': 4.0, 'end': 6.0}, {'start': 1.0, 'end': 3.0},
+                {'start': 2.0, 'end': 2.5}, {'start': 3.0, 'end': 3.5}]
+        for frames in self.frames(cuts):
+            self.assertEqual(frames, ([25, 100], [88, 150]))
+
+    def test_gaps_within_tolerance_merge(self):
+        cuts = [{'start': 1.0, 'end': 2.0}, {'start': 2.2, 'end': 3.0}, {'start': 3.5, 'end': 4.0}]
+        for frames in self.frames(cuts, merge_tolerance=0.2):
+            self.assertEqual(frames, ([25, 88], [75, 100]))
+
+    def test_short_cuts_are_dropped_after_merging(self):
+        cuts = [{'start': 1.0, 'end': 1.2}, {'start': 1.2, 'end': 1.4}, {'start': 5.0, 'end': 5.2}]
+        for frames in self.frames(cuts, min_duration=0.4):
+            # The first two only reach min_duration together
+            self.assertEqual(frames, ([25], [35]))
+
+    def test_cuts_that_round_to_nothing_are_dropped(self):
+        cuts = [{'start': 1.0, 'end': 1.01}, {'start': 2.0, 'end': 2.04}]
+        for frames in self.frames(cuts):
+            self.assertEqual(frames, ([50], [51]))
+
+    def test_numpy_and_python_paths_agree(self):
+        generator = random.Random(26)
+        cuts = []
+        for _ in range(2000):
+            start = generator.uniform(0, 600)
+            cuts.append({'start': start, 'end': start + generator.uniform(-0.1, 3)})
+        results = list(self.frames(cuts, merge_tolerance=0.3, min_duration=0.5))
+        self.assertTrue(results[0][0])
+        for frames in results[1:]:
+            self.assertEqual(frames, results[0])
+
+    def test_normalize_returns_seconds_on_the_frame_grid(self):
+        for _, normalizer in self.normalizers():
+            self.assertEqual(normalizer.normalize([{'start': 1.01, 'end': 2.03}], FPS),
+                             [{'start': 1.0, 'end': 2.04}])
+
+    def test_invalid_frame_rate(self):
+        with self.assertRaises(ValueError):
+            CutNormalizer().normalize([{'start': 0, 'end': 1}], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for cut list snapshots
+Run with: python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cut_snapshot import CutSnapshotCache
+from core.ingest import ingest_registry, IngestRegistry
+
+
+class SnapshotFidelityTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.registry = IngestRegistry(CutSnapshotCache(os.path.join(self.directory.name, 'snapshots')))
+        for plugin in ingest_registry.plugins():
+            self.registry.register(plugin)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load_twice(self, cuts):
+        path = os.path.join(self.directory.name, 'cuts.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cuts, f)
+        return self.registry.load(path, 'json', 25.0), self.registry.load(path, 'json', 25.0)
+
+    def test_int_columns_load_back_as_ints(self):
+        cold, warm = self.load_twice([{'start': 10, 'end': 12.5}, {'start': 20, 'end': 21.25}])
+        self.assertEqual(cold, warm)
+        self.assertTrue(os.listdir(os.path.join(self.directory.name, 'snapshots')))
+        self.assertEqual([type(cut['start']) for cut in warm], [int, int])
+        self.assertEqual([type(cut['end']) for cut in warm], [float, float])
+
+    def test_mixed_columns_are_not_snapshotted(self):
+        cold, warm = self.load_twice([{'start': 1, 'end': 2}, {'start': 1.5, 'end': 3}])
+        self.assertEqual([type(cut['start']) for cut in warm], [type(cut['start']) for cut in cold])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests for the out-of-core cut store
+Run with: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import cut_store
+from core.cut_normalizer import CutNormalizer
+from core.cut_store import FrameCutStore
+from utils.progress import ProgressReporter
+
+
+FPS = 25.0
+BUDGET = 1024 * 1024
+# Enough cuts for more sorted runs than one merge pass can open at this budget
+CUTS = 300000
+
+
+def stored_pairs(store):
+    """Every (start, end) frame pair of a store, in order"""
+    return [pair for block in store.iter_blocks() for pair in zip(block[0::2], block[1::2])]
+
+
+class FrameCutStoreTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        generator = random.Random(50)
+        cls.pairs = []
+        for _ in range(CUTS):
+            start = generator.randrange(0, 300000000)
+            cls.pairs.append((start, start + generator.randrange(0, 200)))
+        # Exact duplicates for unique=True to drop
+        cls.pairs += cls.pairs[:1000]
+        # Zero-length cuts are dropped when appended
+        cls.kept = [pair for pair in cls.pairs if pair[1] > pair[0]]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def store(self):
+        store = FrameCutStore(FPS, BUDGET, self.directory.name)
+        for start, end in self.pairs:
+            store.append_frames(start, end)
+        return store
+
+    def sort_paths(self):
+        """The NumPy run sort, and the pure-Python one"""
+        yield 'numpy', mock.patch.object(cut_store, 'np', cut_store.np)
+        yield 'python', mock.patch.object(cut_store, 'np', None)
+
+    def test_runs_need_more_than_one_merge_pass(self):
+        with self.store() as store:
+            fan_in = max(2, BUDGET // (cut_store.PAIR.size * 4 * 1024) - 1)
+            runs = store._write_runs(ProgressReporter())
+            for run in runs:
+                run.close()
+            self.assertGreater(len(runs), fan_in)
+
+    def test_sorted_matches_an_in_memory_sort(self):
+        expected = sorted(set(self.kept))
+        for name, patch in self.sort_paths():
+            with self.subTest(path=name), patch, self.store() as store:
+                self.assertEqual(len(store), len(self.kept))
+                with store.sorted(unique=True) as ordered:
+                    self.assertEqual(stored_pairs(ordered), expected)
+
+    def test_sorted_keeps_duplicates_on_request(self):
+        with self.store() as store, store.sorted(unique=False) as ordered:
+            self.assertEqual(len(ordered), len(store))
+            self.assertEqual(ordered.frames(0), min(self.kept))
+
+    def test_normalized_matches_the_normalizer(self):
+        normalizer = CutNormalizer(merge_tolerance=0.2, min_duration=2.0)
+        expected = normalizer.normalize_frames([start / FPS for start, _ in self.pairs],
+                                               [end / FPS for _, end in self.pairs], FPS)
+        with self.store() as store, store.normalized(0.2, 2.0) as normalized:
+            frames = stored_pairs(normalized)
+        self.assertGreater(len(frames), 1000)
+        self.assertEqual(([start for start, _ in frames], [end for _, end in frames]), expected)
+
+    def test_scratch_files_are_removed(self):
+        store = FrameCutStore(FPS, BUDGET, self.directory.name)
+        store.extend([{'start': 2.0, 'end': 3.0}, {'start': 1.0, 'end': 2.0}])
+        path = store.path
+        store.sorted().close()
+        store.close()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_budget_must_fit_a_block(self):
+        with self.assertRaises(ValueError):
+            FrameCutStore(FPS, 1024, self.directory.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
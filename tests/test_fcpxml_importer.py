@@ -0,0 +1,86 @@
+"""
+Tests for FCPXML import
+Run with: python -m unittest discover tests
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fcpxml_generator import FCPXMLBuilder
+from core.fcpxml_importer import FCPXMLImporter
+from core.timeline import ChunkLimits
+
+
+NESTED = '''<?xml version="1.0" encoding="UTF-8"?>
+<fcpxml version="1.10">
+    <resources>
+        <format id="r1" frameDuration="1/25s" width="1920" height="1080"/>
+        <asset id="r2" name="a" src="file:///media/a.mov" start="0s" duration="100s" format="r1"/>
+        <media id="m1" name="Compound">
+            <sequence format="r1" duration="8s">
+                <spine>
+                    <asset-clip name="M1" ref="r2" offset="0s" start="10s" duration="4s"/>
+                    <asset-clip name="M2" ref="r2" offset="4s" start="20s" duration="4s"/>
+                </spine>
+            </sequence>
+        </media>
+    </resources>
+    <library>
+        <event name="Event">
+            <project name="Project">
+                <sequence format="r1" duration="9s">
+                    <spine>
+                        <asset-clip name="A" ref="r2" offset="0s" start="1s" duration="2s"/>
+                        <gap offset="2s" start="0s" duration="1s">
+                            <asset-clip name="Connected" ref="r2" lane="1" offset="0s" start="50s" duration="1s"/>
+                        </gap>
+                        <clip name="C" offset="3s" start="5s" duration="2s">
+                            <video ref="r2" offset="5s" start="30s" duration="3s"/>
+                            <audio ref="r2" lane="-1" offset="5s" start="60s" duration="3s"/>
+                        </clip>
+                        <ref-clip name="R" ref="m1" offset="5s" start="2s" duration="4s"/>
+                    </spine>
+                </sequence>
+            </project>
+        </event>
+    </library>
+</fcpxml>
+'''
+
+
+class NestedClipTests(unittest.TestCase):
+
+    def setUp(self):
+        self.importer = FCPXMLImporter()
+
+    def import_text(self, text):
+        return [(cut['start'], cut['end'], cut['name'])
+                for cut in self.importer.iter_cuts(io.StringIO(text))]
+
+    def test_containers_are_expanded_and_trimmed(self):
+        self.assertEqual(self.import_text(NESTED),
+                         [(1.0, 3.0, 'A'), (30.0, 32.0, 'C'), (12.0, 14.0, 'M1'), (20.0, 22.0, 'M2')])
+
+    def test_compound_output_imports_like_flat_output(self):
+        cuts = [{'start': index * 3 + 0.5, 'end': index * 3 + 2.25} for index in range(10)]
+        builder = FCPXMLBuilder()
+        flat = builder.generate_single_fcpxml(cuts, "/media/a b.mov", 25)
+        compound = builder.generate_single_fcpxml(cuts, "/media/a b.mov", 25,
+                                                  compound=ChunkLimits(max_clips=3))
+        self.assertIn('<ref-clip', compound)
+        imported = list(self.importer.iter_cuts(io.StringIO(flat)))
+        self.assertEqual(len(imported), 10)
+        self.assertEqual(list(self.importer.iter_cuts(io.StringIO(compound))), imported)
+
+    def test_multicam_clips_are_rejected(self):
+        text = NESTED.replace('<clip name="C"', '<mc-clip name="C"').replace('</clip>', '</mc-clip>')
+        with self.assertRaises(ValueError):
+            self.import_text(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Tests for the local HTTP service
+Run with: python -m unittest discover tests
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.http_service import FCPXMLService
+from core.video_analyzer import VideoAnalyzer
+
+
+class BlockingAnalyzer(VideoAnalyzer):
+    """Probe that waits until the test releases it, to keep a request admitted"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def probe(self, video_path, progress=None, cancel=None):
+        self.release.wait(30)
+        return {'fps': 25.0, 'duration': 60.0}
+
+
+class ServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.directory.name, 'cache')
+        self.video_path = os.path.join(self.directory.name, 'source.mov')
+        with open(self.video_path, 'wb') as f:
+            f.write(b'\0' * 16)
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.service.stop(), self.loop).result(10)
+        asyncio.run_coroutine_threadsafe(self.finish_connections(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+        self.loop.close()
+        if self.cache_home is None:
+            os.environ.pop('XDG_CACHE_HOME', None)
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.cache_home
+        self.directory.cleanup()
+
+    async def finish_connections(self):
+        """Cancel connection handlers still waiting for their sockets to close"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start_service(self, **options):
+        self.service = FCPXMLService(port=0, **options)
+        asyncio.run_coroutine_threadsafe(self.service.start(), self.loop).result(10)
+
+    def post(self, payload):
+        """POST a render request and return (status, headers, body)"""
+        connection = http.client.HTTPConnection(self.service.host, self.service.port, timeout=30)
+        try:
+            connection.request('POST', '/fcpxml', json.dumps(payload),
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def render_request(self, **fields):
+        request = {'cuts': [{'start': 1, 'end': 2}, {'start': 5, 'end': 8}],
+                   'video_path': self.video_path, 'fps': 25}
+        request.update(fields)
+        return request
+
+
+class RenderTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.start_service(workers=2)
+
+    def test_render_is_streamed_with_timings(self):
+        status, headers, body = self.post(self.render_request())
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Transfer-Encoding'], 'chunked')
+        self.assertIn('parse;dur=', headers['Server-Timing'])
+        self.assertIn('probe;dur=', headers['Server-Timing'])
+        self.assertEqual(headers['X-Cut-Count'], '2')
+        self.assertEqual(ET.fromstring(body).tag, 'fcpxml')
+
+    def test_end_before_start_is_rejected(self):
+        status, _, body = self.post(self.render_request(cuts=[{'start': 5, 'end': 5}]))
+        self.assertEqual(status, 400)
+        self.assertIn("'end' must be after 'start'", json.loads(body)['error'])
+
+    def test_missing_video_is_rejected_before_rendering(self):
+        missing = os.path.join(self.directory.name, 'missing.mov')
+        status, headers, body = self.post(self.render_request(video_path=missing))
+        self.assertEqual(status, 404)
+        self.assertNotIn('Transfer-Encoding', headers)
+        self.assertIn('missing.mov', json.loads(body)['error'])
+
+
+class SaturationTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.analyzer = BlockingAnalyzer()
+        self.start_service(workers=1, max_pending=0, video_analyzer=self.analyzer)
+
+    def tearDown(self):
+        self.analyzer.release.set()
+        super().tearDown()
+
+    def test_requests_beyond_capacity_get_503(self):
+        first = {}
+        worker = threading.Thread(target=lambda: first.update(result=self.post(self.render_request())))
+        worker.start()
+
+        deadline = time.monotonic() + 10
+        while self.service._admitted < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.service._admitted, 1)
+
+        status, headers, _ = self.post(self.render_request())
+        self.assertEqual(status, 503)
+        self.assertEqual(headers['Retry-After'], '1')
+
+        self.analyzer.release.set()
+        worker.join(30)
+        self.assertEqual(first['result'][0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
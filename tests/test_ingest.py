@@ -0,0 +1,98 @@
+"""
+Tests for cut list format detection and streaming ingest
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ingest import ingest_registry, IngestRegistry, JsonIngest
+
+
+SAMPLES = {
+    'fcpxml': '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fcpxml>\n<fcpxml version="1.10">'
+              '<resources/></fcpxml>\n',
+    'json': '[{"start": 1, "end": 2}, {"start": 5, "end": 8}]\n',
+    'vtt': 'WEBVTT\n\n00:00:01.000 --> 00:00:02.000 align:start\nHello\n\n'
+           '00:00:05.000 --> 00:00:08.000\nWorld\n',
+    'srt': '1\n00:00:01,000 --> 00:00:02,000\nHello\n\n2\n00:00:05,000 --> 00:00:08,000\nWorld\n',
+    'edl': 'TITLE: Cuts\nFCM: NON-DROP FRAME\n\n'
+           '001  AX       V     C        00:00:01:00 00:00:02:00 00:00:00:00 00:00:01:00\n'
+           '001  AX       AA    C        00:00:01:00 00:00:02:00 00:00:00:00 00:00:01:00\n'
+           '002  AX       V     C        00:00:05:00 00:00:08:00 00:00:01:00 00:00:04:00\n',
+    'csv': 'Name,Source In,Source Out\nA,1,2\nB,00:00:05:00,00:00:08:00\n',
+    'text': 'Intro 00:01-00:02\nOutro 00:05-00:08\n',
+}
+
+
+class IngestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # No snapshot cache, so every load parses the file
+        self.registry = IngestRegistry()
+        for plugin in ingest_registry.plugins():
+            self.registry.register(plugin)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+
+class SniffingTests(IngestTestCase):
+
+    def test_content_wins_over_the_extension(self):
+        for name, text in SAMPLES.items():
+            with self.subTest(format=name):
+                self.assertEqual(self.registry.detect(self.write('cuts.txt', text)).name, name)
+
+    def test_byte_order_mark_is_ignored(self):
+        path = self.write('cuts.dat', '\ufeff' + SAMPLES['vtt'])
+        self.assertEqual(self.registry.detect(path).name, 'vtt')
+
+    def test_extension_decides_when_content_is_inconclusive(self):
+        # No header row, so only the extension identifies it as CSV
+        self.assertEqual(self.registry.detect(self.write('cuts.csv', '1,2\n5,8\n')).name, 'csv')
+
+    def test_unknown_content_falls_back_to_text(self):
+        self.assertEqual(self.registry.detect(self.write('cuts.dat', 'nothing here\n')).name, 'text')
+
+    def test_forced_plugin_must_exist(self):
+        with self.assertRaises(ValueError):
+            self.registry.open(self.write('cuts.txt', SAMPLES['text']), 'nope')
+
+
+class LoadTests(IngestTestCase):
+
+    def test_every_format_reads_the_same_cuts(self):
+        for name, text in SAMPLES.items():
+            if name == 'fcpxml':
+                continue
+            with self.subTest(format=name):
+                cuts = self.registry.load(self.write('cuts.in', text), fps=25.0)
+                self.assertEqual([(cut['start'], cut['end']) for cut in cuts], [(1, 2), (5, 8)])
+
+    def test_json_objects_split_across_reads(self):
+        plugin = JsonIngest()
+        plugin.read_size = 7
+        cuts = [{'start': number, 'end': number + 0.5, 'label': 'x' * number} for number in range(20)]
+        text = '[' + ', '.join(f'{{"start": {cut["start"]}, "end": {cut["end"]}, "label": "{cut["label"]}"}}'
+                               for cut in cuts) + ']'
+        self.assertEqual(plugin.load(self.write('cuts.json', text), 25.0), cuts)
+
+    def test_truncated_json_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.registry.load(self.write('cuts.json', '[{"start": 1, "end": 2}, {"start": 5'))
+
+
+if __name__ == '__main__':
+    unittest.main()
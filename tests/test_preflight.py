@@ -0,0 +1,107 @@
+"""
+Tests for cut bound checks against source durations
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cut_store import FrameCutStore
+from core.preflight import PreflightChecker, np
+from core.probe_cache import ProbeCache
+from core.video_analyzer import VideoAnalyzer
+
+
+FPS = 25.0
+# The third cut ends within half a frame of the end, the fourth and sixth past it
+CUTS = [{'start': 0.0, 'end': 5.0}, {'start': 1.0, 'end': 2.0}, {'start': 8.0, 'end': 10.01},
+        {'start': 9.0, 'end': 10.08}, {'start': 3.0, 'end': 4.0}, {'start': 20.0, 'end': 30.0}]
+
+
+class PreflightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.directory.name, 'a.mov')
+        analyzer = VideoAnalyzer(ProbeCache(os.path.join(self.directory.name, 'probes')))
+        self.checker = PreflightChecker(analyzer)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cuts_past_the_end_are_reported(self):
+        report = self.checker.check(CUTS, [self.video_path], FPS, {self.video_path: 10.0})
+        self.assertEqual(report['out_of_range'], {self.video_path: [(4, 9.0, 10.08), (6, 20.0, 30.0)]})
+        self.assertEqual(report['out_of_range_counts'], {self.video_path: 2})
+        self.assertEqual(report['unknown'], [])
+
+    def test_python_fallback_matches(self):
+        expected = {self.video_path: [3, 5], 'b.mov': [5]}
+        durations = {self.video_path: 10.0, 'b.mov': 25.0}
+        self.assertEqual(self.checker._find_out_of_range_python(CUTS, durations, 0.5 / FPS), expected)
+        if np is not None:
+            self.assertEqual(self.checker._find_out_of_range_numpy(CUTS, durations, 0.5 / FPS), expected)
+
+    def test_streams_and_stores_are_counted_like_lists(self):
+        durations = {self.video_path: 10.0}
+        streamed = self.checker.check(iter(CUTS), [self.video_path], FPS, durations)
+        self.assertEqual(streamed['out_of_range_counts'], {self.video_path: 2})
+        self.assertEqual(streamed['out_of_range'][self.video_path][0], (4, 9.0, 10.08))
+
+        with FrameCutStore.from_cuts(CUTS, FPS, directory=self.directory.name) as store:
+            stored = self.checker.check(store, [self.video_path], FPS, durations)
+        self.assertEqual(stored['out_of_range_counts'], {self.video_path: 2})
+        self.assertEqual([cut[0] for cut in stored['out_of_range'][self.video_path]], [4, 6])
+
+    def test_listing_stops_at_max_listed(self):
+        self.checker.max_listed = 1
+        report = self.checker.check(iter(CUTS), [self.video_path], FPS, {self.video_path: 1.0})
+        self.assertEqual(report['out_of_range_counts'], {self.video_path: 6})
+        self.assertEqual(len(report['out_of_range'][self.video_path]), 1)
+
+    def test_each_angle_is_checked_against_its_own_cuts(self):
+        other = os.path.join(self.directory.name, 'b.mov')
+        report = self.checker.check_angles([(CUTS, self.video_path), (CUTS[:3], other)], FPS,
+                                           {self.video_path: 10.0, other: 9.0})
+        self.assertEqual(report['out_of_range_counts'], {self.video_path: 2, other: 1})
+
+    def test_unknown_durations_are_not_checked(self):
+        # The file does not exist, so probing finds no duration
+        report = self.checker.check(CUTS, [self.video_path], FPS)
+        self.assertEqual(report['unknown'], [self.video_path])
+        self.assertEqual(report['out_of_range'], {})
+
+
+class ProbeCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'probes')
+        self.video_path = os.path.join(self.directory.name, 'a.mov')
+        with open(self.video_path, 'wb') as f:
+            f.write(b'\0' * 16)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_probe_results_persist_across_instances(self):
+        ProbeCache(self.cache_dir).update(self.video_path, fps=25.0, duration=12.5)
+        analyzer = VideoAnalyzer(ProbeCache(self.cache_dir))
+        # Answered from the cache, without running ffprobe
+        self.assertEqual(analyzer.probe(self.video_path)['duration'], 12.5)
+
+    def test_changed_file_is_not_read_from_the_cache(self):
+        cache = ProbeCache(self.cache_dir)
+        cache.update(self.video_path, fps=25.0, duration=12.5)
+        with open(self.video_path, 'ab') as f:
+            f.write(b'\0')
+        self.assertIsNone(ProbeCache(self.cache_dir).get(self.video_path))
+        self.assertIsNone(cache.get(self.video_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
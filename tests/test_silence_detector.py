@@ -0,0 +1,103 @@
+"""
+Tests for silence detection on synthetic WAV recordings
+Run with: python -m unittest discover tests
+"""
+
+import math
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_decoder import AudioDecoder
+from core.silence_detector import SilenceDetector
+
+
+RATE = 8000
+# 16 samples per cycle, so every 20 ms analysis window holds whole cycles
+FREQUENCY = 500
+
+
+def level(db: float) -> float:
+    """Amplitude of a sine whose mean square power is db dBFS"""
+    return math.sqrt(2 * 10.0 ** (db / 10.0))
+
+
+TONE = level(-9.0)
+# Between the -40 dB threshold and the -36 dB level that ends a silence
+HOVER = level(-38.0)
+
+
+class SilenceDetectorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_wav(self, sections):
+        """Write (seconds, amplitude) sections as 16-bit mono PCM"""
+        path = os.path.join(self.directory.name, 'take.wav')
+        samples = []
+        for seconds, amplitude in sections:
+            for index in range(int(round(seconds * RATE))):
+                value = amplitude * math.sin(2 * math.pi * FREQUENCY * index / RATE)
+                samples.append(int(round(value * 32767)))
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(RATE)
+            f.writeframes(struct.pack(f'<{len(samples)}h', *samples))
+        return path
+
+    def detect(self, sections, **options):
+        detector = SilenceDetector(decoder=AudioDecoder(sample_rate=RATE), **options)
+        path = self.write_wav(sections)
+        return list(detector.iter_silences(path)), detector.detect_cuts(path)
+
+    def test_silence_between_tones_is_cut_with_padding(self):
+        silences, cuts = self.detect([(1.0, TONE), (1.0, 0.0), (1.0, TONE)])
+        self.assertEqual(silences, [(1.0, 2.0)])
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 1.1}, {'start': 1.9, 'end': 3.0}])
+
+    def test_trailing_silence_is_dropped_without_padding(self):
+        silences, cuts = self.detect([(1.0, TONE), (1.0, 0.0)])
+        self.assertEqual(silences, [(1.0, 2.0)])
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 1.1}])
+
+    def test_silences_shorter_than_min_silence_are_not_cut(self):
+        silences, cuts = self.detect([(1.0, TONE), (0.48, 0.0), (1.0, TONE)])
+        self.assertEqual(silences, [])
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 2.48}])
+
+    def test_silences_just_over_min_silence_are_cut(self):
+        silences, cuts = self.detect([(1.0, TONE), (0.52, 0.0), (1.0, TONE)])
+        self.assertEqual(silences, [(1.0, 1.52)])
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 1.1}, {'start': 1.42, 'end': 2.52}])
+
+    def test_level_inside_hysteresis_band_extends_a_silence(self):
+        silences, _ = self.detect([(1.0, TONE), (1.0, 0.0), (1.0, HOVER), (1.0, TONE)])
+        self.assertEqual(silences, [(1.0, 3.0)])
+
+    def test_level_inside_hysteresis_band_does_not_start_a_silence(self):
+        silences, cuts = self.detect([(1.0, TONE), (1.0, HOVER), (1.0, TONE)])
+        self.assertEqual(silences, [])
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 3.0}])
+
+    def test_windows_spanning_decoder_blocks(self):
+        sections = [(1.0, TONE), (0.7, 0.0), (1.0, TONE), (0.6, 0.0), (0.5, TONE)]
+        expected = self.detect(sections)
+        # Blocks that do not hold a whole number of windows
+        detector = SilenceDetector(decoder=AudioDecoder(sample_rate=RATE, block_size=1000))
+        path = self.write_wav(sections)
+        self.assertEqual((list(detector.iter_silences(path)), detector.detect_cuts(path)), expected)
+        self.assertEqual(expected[0], [(1.0, 1.7), (2.7, 3.3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
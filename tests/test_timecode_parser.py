@@ -0,0 +1,91 @@
+"""
+Tests for timecode parsing
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.timecode_parser import TimecodeParser
+
+
+class RangeSeparatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = TimecodeParser()
+
+    def test_comma_separated_minute_ranges(self):
+        self.assertEqual(self.parser.parse_timecodes_from_text('00:10-00:20,00:30-00:40'),
+                         [{'start': 10, 'end': 20}, {'start': 30, 'end': 40}])
+
+    def test_comma_separated_hour_ranges(self):
+        self.assertEqual(self.parser.parse_timecodes_from_text('01:00:10-01:00:20,01:00:30-01:00:40'),
+                         [{'start': 3610, 'end': 3620}, {'start': 3630, 'end': 3640}])
+
+    def test_decimal_comma_is_still_a_fraction(self):
+        self.assertEqual(self.parser.parse_timecodes_from_text('00:10,5-00:20,25'),
+                         [{'start': 10.5, 'end': 20.25}])
+
+    def test_comma_separated_ranges_in_a_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cuts.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('00:10-00:20,00:30-00:40\n01:00:10-01:00:20,01:00:30-01:00:40\n')
+            expected = [{'start': 10, 'end': 20}, {'start': 30, 'end': 40},
+                        {'start': 3610, 'end': 3620}, {'start': 3630, 'end': 3640}]
+            self.assertEqual(self.parser.load_from_text(path), expected)
+            self.assertEqual(self.parser.load_from_text_parallel(path, workers=1), expected)
+
+
+
+class ParallelLoadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = TimecodeParser()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.txt')
+        lines = []
+        for number in range(1200):
+            start, end = number * 2, number * 2 + 1
+            if number % 3 == 0:
+                ranges = f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+            elif number % 3 == 1:
+                ranges = f"00:{start // 60:02d}:{start % 60:02d}.250-00:{end // 60:02d}:{end % 60:02d}.500"
+            else:
+                ranges = f"00:{start // 60:02d}:{start % 60:02d}:12-00:{end // 60:02d}:{end % 60:02d}:00"
+            # Multi-byte text and uneven line lengths move the chunk boundaries around
+            lines.append(f"take {number} – é{'x' * (number % 37)} {ranges}")
+        lines.append('long line ' + ' '.join('01:00:0{0}-01:00:0{1}'.format(n, n + 1) for n in range(8)) * 20)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_chunks_end_after_a_newline(self):
+        chunks = self.parser._split_at_newlines(self.path, 1000)
+        size = os.path.getsize(self.path)
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], size)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for (_, end), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_parallel_load_matches_sequential_load(self):
+        expected = self.parser.load_from_text(self.path)
+        self.assertEqual(len(expected), 1208)
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.parser.load_from_text_parallel(self.path, chunk_size=1000, workers=workers),
+                                 expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Tests for writing one timeline in several formats
+Run with: python -m unittest discover tests
+"""
+
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fcpxml_generator import FCPXMLBuilder
+from core.timeline import ChunkLimits
+from core.timeline_export import TimelineExporter, create_emitter, EMITTERS
+
+
+FPS = 25
+CUTS = [{'start': 1.0, 'end': 2.5}, {'start': 10.02, 'end': 13.0}, {'start': 3600.5, 'end': 3601.04},
+        {'start': 7.0, 'end': 7.04}, {'start': 20.0, 'end': 80.0}]
+
+
+def fcpxml_frames(value: str) -> int:
+    numerator, _, denominator = value[:-1].partition('/')
+    assert int(denominator or 1) == FPS
+    return int(numerator)
+
+
+def timecode_frames(value: str) -> int:
+    hours, minutes, seconds, frames = (int(part) for part in value.split(':'))
+    return ((hours * 60 + minutes) * 60 + seconds) * FPS + frames
+
+
+class ExportConsistencyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = FCPXMLBuilder("counter")
+        self.expected = [clip[1:] for clip in self.timeline().clips]
+
+    def timeline(self, include_audio=True):
+        return self.builder.build_timeline(CUTS, "/media/take one.mov", FPS, include_audio,
+                                           "Consistency", source_duration=4000.0)
+
+    def export(self, include_audio=True):
+        """Every format written in one pass, as {name: text}"""
+        sinks = {name: io.StringIO() for name in EMITTERS}
+        targets = [(create_emitter(name, "counter"), sink) for name, sink in sinks.items()]
+        TimelineExporter(chunk_clips=2).export(self.timeline(include_audio), targets)
+        return {name: sink.getvalue() for name, sink in sinks.items()}
+
+    def test_every_format_places_the_same_frames(self):
+        self.assertEqual([duration for _, _, duration in self.expected], [38, 75, 13, 1, 1500])
+        documents = self.export()
+
+        spine = ET.fromstring(documents['fcpxml']).find('.//project/sequence/spine')
+        fcpxml = [tuple(fcpxml_frames(clip.get(name)) for name in ('offset', 'start', 'duration'))
+                  for clip in spine.findall('asset-clip')]
+        self.assertEqual(fcpxml, self.expected)
+
+        edl = []
+        for line in documents['edl'].splitlines():
+            timecodes = re.findall(r'\d{2}:\d{2}:\d{2}:\d{2}', line)
+            if len(timecodes) == 4:
+                source_in, source_out, record_in, record_out = (timecode_frames(tc) for tc in timecodes)
+                self.assertEqual(record_out - record_in, source_out - source_in)
+                edl.append((record_in, source_in, source_out - source_in))
+        self.assertEqual(edl, self.expected)
+
+        tracks = json.loads(documents['otio'])['tracks']['children']
+        self.assertEqual([track['kind'] for track in tracks], ['Video', 'Audio'])
+        for track in tracks:
+            offset = 0
+            otio = []
+            for clip in track['children']:
+                start = int(clip['source_range']['start_time']['value'])
+                duration = int(clip['source_range']['duration']['value'])
+                otio.append((offset, start, duration))
+                offset += duration
+            self.assertEqual(otio, self.expected)
+
+        media = ET.fromstring(documents['xml']).find('sequence/media')
+        for kind in ('video', 'audio'):
+            items = media.findall(f'{kind}/track/clipitem')
+            xmeml = [(int(item.findtext('start')), int(item.findtext('in')),
+                      int(item.findtext('out')) - int(item.findtext('in'))) for item in items]
+            self.assertEqual(xmeml, self.expected)
+            for item in items:
+                self.assertEqual(int(item.findtext('end')) - int(item.findtext('start')),
+                                 int(item.findtext('out')) - int(item.findtext('in')))
+
+    def test_video_only_export_has_no_audio_tracks(self):
+        documents = self.export(include_audio=False)
+        self.assertEqual([track['kind'] for track in json.loads(documents['otio'])['tracks']['children']],
+                         ['Video'])
+        self.assertIsNone(ET.fromstring(documents['xml']).find('sequence/media/audio'))
+        self.assertNotIn(' AA/V ', documents['edl'])
+
+    def test_exporter_matches_the_builder(self):
+        document = self.builder.generate_single_fcpxml(CUTS, "/media/take one.mov", FPS,
+                                                       project_name="Consistency", source_duration=4000.0)
+        self.assertEqual(self.export()['fcpxml'], document)
+
+
+
+class ChunkedTimelineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = FCPXMLBuilder("counter")
+        self.cuts = [{'start': number * 4.0, 'end': number * 4.0 + 1 + (number % 5) * 0.52}
+                     for number in range(23)]
+        self.flat = list(self.timeline().clips)
+
+    def timeline(self):
+        return self.builder.build_timeline(self.cuts, "/media/a.mov", FPS, project_name="Long")
+
+    def test_split_parts_line_up_end_to_end(self):
+        for limits in (ChunkLimits(max_clips=4), ChunkLimits(max_seconds=10), ChunkLimits(5, 6)):
+            with self.subTest(clips=limits.max_clips, seconds=limits.max_seconds):
+                parts = list(self.timeline().split(limits))
+                self.assertGreater(len(parts), 2)
+                clips = []
+                position = 0
+                for number, part in enumerate(parts, 1):
+                    part_clips = list(part.clips)
+                    self.assertEqual(part.project_name, f"Long (part {number})")
+                    self.assertEqual(part.start, position)
+                    self.assertEqual(part.clip_count, len(part_clips))
+                    self.assertEqual(part.duration, sum(clip[3] for clip in part_clips))
+                    if limits.max_clips:
+                        self.assertLessEqual(len(part_clips), limits.max_clips)
+                    position += part.duration
+                    clips += part_clips
+                self.assertEqual(clips, self.flat)
+
+    def test_exported_parts_keep_their_timeline_position(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = TimelineExporter().export_parts(self.timeline(), ['fcpxml'], os.path.join(directory, 'long'),
+                                                    ChunkLimits(max_clips=4))
+            self.assertEqual(len(paths), 6)
+            clips = []
+            for path in paths:
+                sequence = ET.parse(path).find('.//project/sequence')
+                start = fcpxml_frames(sequence.get('tcStart', '0/25s'))
+                offsets = []
+                for clip in sequence.find('spine').findall('asset-clip'):
+                    offsets.append(fcpxml_frames(clip.get('offset')))
+                    clips.append(tuple(fcpxml_frames(clip.get(name)) for name in ('offset', 'start', 'duration')))
+                self.assertEqual(offsets[0], start)
+        self.assertEqual(clips, [clip[1:] for clip in self.flat])
+
+    def test_compound_clips_flatten_to_the_flat_spine(self):
+        document = self.builder.generate_single_fcpxml(self.cuts, "/media/a.mov", FPS, project_name="Long",
+                                                       compound=ChunkLimits(max_clips=4))
+        root = ET.fromstring(document)
+        media = {element.get('id'): element for element in root.iter('media')}
+        clips = []
+        position = 0
+        for ref_clip in root.find('.//project/sequence/spine').findall('ref-clip'):
+            offset = fcpxml_frames(ref_clip.get('offset'))
+            duration = fcpxml_frames(ref_clip.get('duration'))
+            self.assertEqual(offset, position)
+            sequence = media[ref_clip.get('ref')].find('sequence')
+            self.assertEqual(fcpxml_frames(sequence.get('duration')), duration)
+            inner = [tuple(fcpxml_frames(clip.get(name)) for name in ('offset', 'start', 'duration'))
+                     for clip in sequence.find('spine').findall('asset-clip')]
+            self.assertLessEqual(len(inner), 4)
+            self.assertEqual(sum(clip[2] for clip in inner), duration)
+            clips += [(offset + inner_offset, start, length) for inner_offset, start, length in inner]
+            position += duration
+        self.assertEqual(clips, [clip[1:] for clip in self.flat])
+
+
+if __name__ == '__main__':
+    unittest.main()
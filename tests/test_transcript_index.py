@@ -0,0 +1,116 @@
+"""
+Tests for transcript indexing and phrase search
+Run with: python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import transcript_index
+from core.transcript_index import TranscriptIndex, TranscriptSearch, read_words
+
+
+WORDS = "The quick brown fox jumps. Then the quick red fox, and the QUICK brown dog; quick brown!".split()
+
+
+def as_lists(index):
+    return (index.vocabulary, list(index.starts), list(index.ends),
+            list(index.offsets), list(index.positions))
+
+
+class TranscriptTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'take.json')
+        # Whisper layout: segments holding timed words, one second per word
+        words = [{'word': word, 'start': number, 'end': number + 0.5} for number, word in enumerate(WORDS)]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': [{'text': '...', 'words': words[:7]}, {'text': '...', 'words': words[7:]}]}, f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class TranscriptIndexTests(TranscriptTestCase):
+
+    def build_without_numpy(self):
+        with mock.patch.object(transcript_index, 'np', None):
+            return TranscriptIndex.build(self.path)
+
+    def test_phrases_are_found_in_order_and_case_insensitively(self):
+        index = TranscriptIndex.build(self.path)
+        self.assertEqual(index.find(['quick', 'brown']), [(1, 2), (12, 13), (15, 16)])
+        self.assertEqual(index.find(['quick', 'brown', 'dog']), [(12, 14)])
+        self.assertEqual(index.find(['brown', 'quick']), [])
+        self.assertEqual(index.find(['missing']), [])
+
+    def test_pure_python_path_matches_numpy(self):
+        if transcript_index.np is None:
+            self.skipTest("NumPy is not installed")
+        index = TranscriptIndex.build(self.path)
+        fallback = self.build_without_numpy()
+        self.assertEqual(as_lists(fallback), as_lists(index))
+
+        for phrase in (['quick'], ['quick', 'brown'], ['the', 'quick'], ['fox', 'and']):
+            with self.subTest(phrase=phrase):
+                starts, ends = index.times(phrase, padding=0.25)
+                with mock.patch.object(transcript_index, 'np', None):
+                    self.assertEqual(fallback.find(phrase), index.find(phrase))
+                    self.assertEqual(fallback.times(phrase, padding=0.25), (starts.tolist(), ends.tolist()))
+
+    def test_saved_index_loads_back_from_either_path(self):
+        cache_path = os.path.join(self.directory.name, 'take.tidx')
+        key = b'k' * 16
+        for name, index in (('numpy', TranscriptIndex.build(self.path)), ('python', self.build_without_numpy())):
+            with self.subTest(path=name):
+                index.save(cache_path, key)
+                self.assertEqual(as_lists(TranscriptIndex.load(cache_path, key)), as_lists(index))
+                # Stale or damaged caches are rebuilt rather than trusted
+                self.assertIsNone(TranscriptIndex.load(cache_path, b'x' * 16))
+                with open(cache_path, 'r+b') as f:
+                    f.truncate(os.path.getsize(cache_path) - 4)
+                self.assertIsNone(TranscriptIndex.load(cache_path, key))
+
+    def test_vtt_inline_timestamps_time_each_word(self):
+        path = os.path.join(self.directory.name, 'take.vtt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("WEBVTT\n\n00:00:01.000 --> 00:00:03.000\n"
+                    "quick<00:00:01.500><c> brown</c><00:00:02.000><c> fox</c>\n\n")
+        self.assertEqual(list(read_words(path)), [('quick', 1.0, 1.5), ('brown', 1.5, 2.0), ('fox', 2.0, 3.0)])
+
+
+class TranscriptSearchTests(TranscriptTestCase):
+
+    def search(self, query, **options):
+        search = TranscriptSearch(os.path.join(self.directory.name, 'cache'), workers=1)
+        return search.cuts(query, self.path, **options)
+
+    def test_terms_become_padded_merged_cuts(self):
+        self.assertEqual(self.search('"quick brown" dog', padding=0.2),
+                         [{'start': 0.8, 'end': 2.7}, {'start': 11.8, 'end': 13.7},
+                          {'start': 13.8, 'end': 14.7}, {'start': 14.8, 'end': 16.7}])
+        self.assertEqual(self.search('"quick brown" dog', padding=0.2, merge_gap=0.5),
+                         [{'start': 0.8, 'end': 2.7}, {'start': 11.8, 'end': 16.7}])
+
+    def test_merging_matches_without_numpy(self):
+        expected = self.search('quick "red fox" jumps', padding=0.6)
+        with mock.patch.object(transcript_index, 'np', None):
+            self.assertEqual(self.search('quick "red fox" jumps', padding=0.6), expected)
+
+    def test_index_is_reused_from_the_cache(self):
+        self.search('fox')
+        cache_files = os.listdir(os.path.join(self.directory.name, 'cache'))
+        self.assertEqual(len(cache_files), 1)
+        with mock.patch.object(TranscriptIndex, 'build', side_effect=AssertionError("rebuilt")):
+            self.assertEqual(self.search('fox', padding=0), [{'start': 3.0, 'end': 3.5}, {'start': 9.0, 'end': 9.5}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Tests for the shared-directory work queue
+Run with: python -m unittest discover tests
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.batch import BatchScheduler
+from core.work_queue import WorkQueue, SpoolWorker
+
+
+JOBS = 12
+WORKERS = 4
+
+
+def run_worker(spool_dir: str, results):
+    """Worker process: drain the queue and report how many jobs it ran"""
+    queue = WorkQueue(spool_dir, lease_timeout=2.0)
+    results.put(SpoolWorker(queue, poll_interval=0.05).run(exit_when_idle=True))
+
+
+class SpoolWorkerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.directory.name, 'cache')
+
+        with open(os.path.join(self.directory.name, 'cuts.txt'), 'w', encoding='utf-8') as f:
+            f.write("00:01-00:02\n00:05-00:08\n")
+        manifest = {
+            'defaults': {'cuts': 'cuts.txt', 'video': 'source.mov', 'fps': 25},
+            'jobs': [{'id': f"job-{number}"} for number in range(JOBS)],
+        }
+        manifest_path = os.path.join(self.directory.name, 'manifest.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        self.spool_dir = os.path.join(self.directory.name, 'spool')
+        self.queue = WorkQueue(self.spool_dir, lease_timeout=2.0)
+        self.queue.submit_manifest(manifest_path)
+
+    def tearDown(self):
+        if self.cache_home is None:
+            os.environ.pop('XDG_CACHE_HOME', None)
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.cache_home
+        self.directory.cleanup()
+
+    def test_each_job_completes_once_across_processes(self):
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_worker, args=(self.spool_dir, results))
+                   for _ in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        runs = [results.get(timeout=120) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=30)
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(sum(runs), JOBS)
+        self.assertEqual(self.queue.status(), {'pending': 0, 'leased': 0, 'done': JOBS, 'failed': 0})
+        self.assertEqual(os.listdir(os.path.join(self.spool_dir, 'reclaim')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,5 +3,6 @@ Utility functions for FCPXML Generator
 """
 
 from .file_helpers import FileManager
+from .progress import CancellationToken, OperationCancelled, ProgressReporter
 
-__all__ = ['FileManager']
\ No newline at end of file
+__all__ = ['FileManager', 'CancellationToken', 'OperationCancelled', 'ProgressReporter']
\ No newline at end of file
@@ -3,8 +3,14 @@ File management utilities
 Handles file operations for saving FCPXML and debug files
 """
 
+import hashlib
 import os
-from typing import List, Tuple
+import threading
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import List, Tuple, Iterable, Iterator, Optional, IO
+
+from .progress import ProgressCallback, ProgressReporter, CancellationToken, OperationCancelled, run_blocking
 
 
 class FileManager:
@@ -17,34 +23,78 @@ class FileManager:
         ]
     
     def save_single_fcpxml(self, fcpxml_content: str, reference_file: str, 
-                          custom_filename: str = None) -> str:
+                          custom_filename: str = None, progress: Optional[ProgressCallback] = None,
+                          cancel: Optional[CancellationToken] = None) -> str:
         """
         Save a single FCPXML file
         Returns the path of the saved file
         """
+        return self.save_single_fcpxml_stream([fcpxml_content], reference_file, custom_filename,
+                                              progress, cancel)
+    
+    def save_single_fcpxml_stream(self, fcpxml_chunks: Iterable[str], reference_file: str, 
+                                 custom_filename: str = None, progress: Optional[ProgressCallback] = None,
+                                 cancel: Optional[CancellationToken] = None) -> str:
+        """
+        Save a single FCPXML file from chunks of text as they are produced
+        Returns the path of the saved file
+        progress receives (bytes written, None); a cancelled save removes the partial file
+        """
+        fcpxml_path = self.get_single_fcpxml_path(reference_file, custom_filename)
+        reporter = ProgressReporter(progress, cancel)
+        written = 0
+        
+        try:
+            with open(fcpxml_path, "w", encoding='utf-8') as f:
+                for chunk in fcpxml_chunks:
+                    reporter.update(written)
+                    f.write(chunk)
+                    if progress is not None:
+                        written += len(chunk.encode('utf-8'))
+        except OperationCancelled:
+            os.remove(fcpxml_path)
+            raise
+        
+        reporter.finish(written)
+        return fcpxml_path
+    
+    async def save_single_fcpxml_stream_async(self, fcpxml_chunks: Iterable[str], reference_file: str,
+                                              custom_filename: str = None,
+                                              progress: Optional[ProgressCallback] = None,
+                                              cancel: Optional[CancellationToken] = None,
+                                              executor: Optional[Executor] = None) -> str:
+        """
+        save_single_fcpxml_stream() run in an executor
+        Chunks are produced in the executor thread too, so a lazy FCPXML generator
+        is built there as well
+        """
+        return await run_blocking(self.save_single_fcpxml_stream, fcpxml_chunks, reference_file,
+                                  custom_filename, progress=progress, cancel=cancel, executor=executor)
+    
+    def get_single_fcpxml_path(self, reference_file: str, custom_filename: str = None) -> str:
+        """Output path for a single FCPXML file next to the reference file"""
         if custom_filename and custom_filename.strip():
             filename = custom_filename.strip()
             if not filename.lower().endswith('.fcpxml'):
                 filename += '.fcpxml'
-            fcpxml_path = os.path.join(os.path.dirname(reference_file), filename)
-        else:
-            base_name = os.path.splitext(reference_file)[0]
-            fcpxml_path = f"{base_name}_timeline.fcpxml"
+            return os.path.join(os.path.dirname(reference_file), filename)
         
-        with open(fcpxml_path, "w", encoding='utf-8') as f:
-            f.write(fcpxml_content)
-        
-        return fcpxml_path
+        base_name = os.path.splitext(reference_file)[0]
+        return f"{base_name}_timeline.fcpxml"
     
     def save_multiple_fcpxml(self, fcpxml_results: List[Tuple[str, str]], 
-                           reference_file: str) -> List[str]:
+                           reference_file: str, progress: Optional[ProgressCallback] = None,
+                           cancel: Optional[CancellationToken] = None) -> List[str]:
         """
         Save multiple FCPXML files for multi-camera workflow
         Returns list of paths to saved files
+        progress receives (files saved, number of files); cancel is checked between files
         """
         saved_files = []
+        reporter = ProgressReporter(progress, cancel, len(fcpxml_results), interval=0)
         
         for fcpxml_content, source_filename in fcpxml_results:
+            reporter.update(len(saved_files))
             # Generate filename based on source video
             base_name = os.path.splitext(source_filename)[0]
             fcpxml_filename = f"{base_name}_timeline.fcpxml"
@@ -55,8 +105,17 @@ class FileManager:
             
             saved_files.append(fcpxml_path)
         
+        reporter.finish(len(saved_files))
         return saved_files
     
+    async def save_multiple_fcpxml_async(self, fcpxml_results: List[Tuple[str, str]], reference_file: str,
+                                         progress: Optional[ProgressCallback] = None,
+                                         cancel: Optional[CancellationToken] = None,
+                                         executor: Optional[Executor] = None) -> List[str]:
+        """save_multiple_fcpxml() run in an executor"""
+        return await run_blocking(self.save_multiple_fcpxml, fcpxml_results, reference_file,
+                                  progress=progress, cancel=cancel, executor=executor)
+    
     def save_debug_file(self, debug_content: str, reference_file: str) -> str:
         """
         Save debug information file
@@ -131,6 +190,52 @@ class FileManager:
         
         return safe_filename
     
+    def get_cache_directory(self, name: str) -> str:
+        """
+        Get (and create) a per-user cache directory for the application
+        Uses %LOCALAPPDATA% on Windows and $XDG_CACHE_HOME or ~/.cache elsewhere
+        """
+        base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+        if not base:
+            base = os.path.join(os.path.expanduser('~'), '.cache')
+        
+        directory = os.path.join(base, 'fcpxml_generator', name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+    
+    def get_cache_key(self, file_path: str, *extra) -> Optional[bytes]:
+        """
+        16-byte key for the current version of a file, from its path, size and mtime
+        extra values (such as a frame time) are folded into the key
+        Returns None if the file does not exist
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        
+        identity = f"{os.path.abspath(file_path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        identity += ''.join(f"\0{value}" for value in extra)
+        return hashlib.blake2b(identity.encode('utf-8'), digest_size=16).digest()
+    
+    @contextmanager
+    def atomic_write(self, file_path: str, mode: str = 'wb', encoding: Optional[str] = None) -> Iterator[IO]:
+        """
+        Write to a temporary file next to file_path and move it into place when the block ends
+        Readers see the old file or the complete new one, never a partial write
+        """
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, mode, encoding=encoding) as f:
+                yield f
+            os.replace(temp_path, file_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+    
     def ensure_directory_exists(self, file_path: str) -> bool:
         """
         Ensure the directory for a file path exists
@@ -223,4 +328,63 @@ class FileManager:
             new_path = f"{base}_{counter}{ext}"
             if not os.path.exists(new_path):
                 return new_path
-            counter += 1
\ No newline at end of file
+            counter += 1
+
+
+class CacheBudget:
+    """
+    Keeps the files with one suffix in a cache directory within max_bytes
+    Past the limit the least recently used files are removed until the directory is
+    at 80% of it; use is tracked through mtimes, which touch() updates
+    """
+    
+    def __init__(self, directory: str, suffix: str, max_bytes: int):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+    
+    def touch(self, file_path: str) -> bool:
+        """Mark a cached file as recently used; False if it does not exist"""
+        try:
+            os.utime(file_path, None)
+        except OSError:
+            return False
+        return True
+    
+    def added(self, size: int):
+        """Account for a file of size bytes just written, evicting old files past the limit"""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    def _scan_size(self) -> int:
+        """Total size of the cached files"""
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.suffix):
+                    total += entry.stat().st_size
+        return total
+    
+    def _evict(self):
+        """Remove least recently used files until the cache is 80% of its limit"""
+        with os.scandir(self.directory) as entries:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in entries if entry.name.endswith(self.suffix)]
+        
+        self._size = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.8
+        for _, size, path in sorted(files):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Progress reporting and cancellation
+Shared by long-running operations so callers can follow and stop them
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+
+# progress(done, total): items or bytes done so far, total None when unknown
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class OperationCancelled(Exception):
+    """Raised inside an operation whose cancellation token was set"""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag
+    The caller sets it from any thread; the operation checks it between units of work
+    and stops with OperationCancelled
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled("Operation cancelled")
+
+
+class ProgressReporter:
+    """
+    Forwards progress from a hot loop to an optional callback, at most every interval
+    seconds, and checks an optional cancellation token on each update
+    """
+
+    def __init__(self, progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[CancellationToken] = None,
+                 total: Optional[int] = None, interval: float = 0.1):
+        self.progress = progress
+        self.cancel = cancel
+        self.total = total
+        self.interval = interval
+        self._last_report = 0.0
+
+    def update(self, done: int):
+        """Report done items so far; raises OperationCancelled if the token is set"""
+        if self.cancel is not None:
+            self.cancel.raise_if_cancelled()
+        if self.progress is not None:
+            now = time.monotonic()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.progress(done, self.total)
+
+    def finish(self, done: int):
+        """Always report the final count"""
+        if self.progress is not None:
+            self.progress(done, self.total)
+
+
+async def run_blocking(func: Callable, *args, progress: Optional[ProgressCallback] = None,
+                       cancel: Optional[CancellationToken] = None,
+                       executor: Optional[Executor] = None, **kwargs):
+    """
+    Run a blocking call that takes progress and cancel keywords in an executor
+    Progress is delivered on the calling event loop, and cancelling the awaiting task
+    sets the token so the call stops at its next check
+    """
+    loop = asyncio.get_running_loop()
+    cancel = cancel or CancellationToken()
+    if progress is not None:
+        callback = progress
+        progress = lambda done, total: loop.call_soon_threadsafe(callback, done, total)
+
+    call = functools.partial(func, *args, progress=progress, cancel=cancel, **kwargs)
+    try:
+        return await loop.run_in_executor(executor, call)
+    except asyncio.CancelledError:
+        cancel.cancel()
+        raise
@@ -0,0 +1,44 @@
+"""
+Thumbnail cache
+Keeps extracted video frames on disk between sessions, within a size limit
+"""
+
+import os
+from typing import Optional
+
+from .file_helpers import FileManager, CacheBudget
+
+
+class ThumbnailCache:
+    """
+    Stores thumbnails as PNG files keyed by media identity (path, size, mtime) and frame time
+    When the cache grows past max_bytes the least recently used files are removed
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 200 * 1024 * 1024):
+        self.file_manager = FileManager()
+        self.cache_dir = cache_dir or self.file_manager.get_cache_directory('thumbnails')
+        self.max_bytes = max_bytes
+        self.budget = CacheBudget(self.cache_dir, '.png', max_bytes)
+
+    def get_key(self, video_path: str, time: float, width: int) -> Optional[str]:
+        """Cache key for a frame of the current version of a file"""
+        key = self.file_manager.get_cache_key(video_path, round(time, 3), width)
+        return key.hex() if key else None
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of a cached thumbnail, or None"""
+        path = self._entry_path(key)
+        # Marks the file as recently used for eviction
+        return path if self.budget.touch(path) else None
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store thumbnail bytes and return the file path"""
+        path = self._entry_path(key)
+        with self.file_manager.atomic_write(path) as f:
+            f.write(data)
+        self.budget.added(len(data))
+        return path
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")